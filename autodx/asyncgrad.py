@@ -0,0 +1,98 @@
+"""
+Asyncio-friendly gradients for serving. Evaluation is offloaded to an
+executor so the event loop never blocks, and concurrent requests against the
+same graph are coalesced: requests that arrive while a batch is being
+computed are queued and go out together as the next batched sweep of the
+flat.Graph.
+
+    y, dX = await value_and_grad(g, [2.0, 5.0])
+    dX = await agrad(g, [2.0, 5.0])
+
+g can be a flat.Graph or a forward_ast/backward_ast expression, which is
+flattened once (inputs in leaves() order) and cached for the life of the
+expression.
+"""
+
+import asyncio
+import weakref
+
+from autodx.flat import *
+
+
+class Coalescer:
+    "Queue gradient requests for one Graph and evaluate them in batches"
+    def __init__(self, g : Graph, executor=None, max_batch : int = 4096):
+        self.ref = weakref.ref(g) # coalescers are cached per Graph; don't keep it alive
+        self.executor = executor
+        self.max_batch = max_batch
+        self.pending = []
+        self.running = False
+
+    @property
+    def g(self) -> Graph:
+        return self.ref()
+
+    async def value_and_grad(self, inputs) -> (numbers.Number, np.ndarray):
+        if np.ndim(inputs) != 1 or np.size(inputs) != len(self.g.inputs):
+            raise ValueError(f"expected {len(self.g.inputs)} inputs, got {np.shape(inputs)}")
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self.pending.append((inputs, fut))
+        if not self.running:
+            self.running = True
+            loop.create_task(self.drain())
+        return await fut
+
+    def evaluate(self, X : np.ndarray) -> (np.ndarray, np.ndarray):
+        "Runs in the executor; only one batch per graph is in flight at a time"
+        y = self.g.forward(X)
+        return y, self.g.backward()
+
+    async def drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.sleep(0)  # let requests made in this loop iteration join the first batch
+            while len(self.pending) > 0:
+                batch = self.pending[:self.max_batch]
+                self.pending = self.pending[self.max_batch:]
+                try:
+                    X = np.array([inputs for inputs, _ in batch], dtype=np.float64)
+                    y, dX = await loop.run_in_executor(self.executor, self.evaluate, X)
+                except Exception as e:
+                    for _, fut in batch:
+                        if not fut.done():
+                            fut.set_exception(e)
+                    continue
+                for (_, fut), yi, dxi in zip(batch, y, dX):
+                    if not fut.done():
+                        fut.set_result((yi, dxi))
+        finally:
+            self.running = False
+
+
+_graphs = weakref.WeakKeyDictionary()      # expression -> its flattened Graph
+_coalescers = weakref.WeakKeyDictionary()  # Graph -> Coalescer
+
+
+def coalescer(g) -> Coalescer:
+    "Return the shared Coalescer for g, flattening g first if it's an expression"
+    if not isinstance(g, Graph):
+        graph = _graphs.get(g)
+        if graph is None:
+            graph = _graphs[g] = flatten(g)
+        g = graph
+    c = _coalescers.get(g)
+    if c is None:
+        c = _coalescers[g] = Coalescer(g)
+    return c
+
+
+async def value_and_grad(g, inputs) -> (numbers.Number, np.ndarray):
+    "Return (value, gradient) of g at inputs without blocking the event loop"
+    return await coalescer(g).value_and_grad(inputs)
+
+
+async def agrad(g, inputs) -> np.ndarray:
+    "Return gradient of g at inputs without blocking the event loop"
+    y, dX = await coalescer(g).value_and_grad(inputs)
+    return dX
@@ -73,6 +73,17 @@ class Expr:
     def __rtruediv__(self, other):
         return Const(other).__truediv__(self)
 
+    def __pow__(self, other):
+        if isinstance(other, numbers.Number):
+            other = Const(other)
+        return Pow(self,other)
+
+    def __rpow__(self, other):
+        return Const(other).__pow__(self)
+
+    def __abs__(self):
+        return Abs(self)
+
     def __str__(self):
         if isinstance(self.x, int):
             return f'v{self.vi}({self.x})'
@@ -147,7 +158,8 @@ class BinaryOp(Expr):
     def backward_(self, parent : Expr, dydv : numbers.Number) -> None:
         self.dydv = dydv * parent.dvdv(self) # don't need to accum subexpr adjoints (they are unique)
         self.left.backward_(self, self.dydv)
-        self.right.backward_(self, self.dydv)
+        if self.right is not self.left: # for x op x, dvdv(x) is already the sum over both operands
+            self.right.backward_(self, self.dydv)
 
     def forward_trace(self):
         return self.left.forward_trace() + self.right.forward_trace() + [f"v{self.vi} = {self.asvar()}"]
@@ -197,8 +209,8 @@ class Add(BinaryOp):
         return self.x
 
     def dvdv(self, wrt : 'Expr') -> numbers.Number:
-        # d/dx(x + y) = d/dy(x - y) = 1
-        p = 1
+        # d/dx(x + y) = d/dy(x + y) = 1
+        p = (self.left == wrt) + (self.right == wrt)
         return p
 
 
@@ -213,10 +225,7 @@ class Sub(BinaryOp):
     def dvdv(self, wrt : 'Expr') -> numbers.Number:
         # d/dx(x - y) = 1
         # d/dy(x - y) = -1
-        if self.left == wrt:
-            p = 1
-        else:
-            p = -1
+        p = (self.left == wrt) - (self.right == wrt)
         return p
 
 
@@ -229,10 +238,11 @@ class Mul(BinaryOp):
         return self.x
 
     def dvdv(self, wrt : 'Expr') -> numbers.Number:
+        p = 0
         if self.left == wrt:
-            p = self.right.x
-        else:
-            p = self.left.x
+            p += self.right.x
+        if self.right == wrt:
+            p += self.left.x
         return p
 
 
@@ -245,10 +255,12 @@ class Div(BinaryOp):
         return self.x
 
     def dvdv(self, wrt : 'Expr') -> numbers.Number:
+        # operand values were computed and saved by forward()
+        p = 0
         if self.left == wrt:
-            p = 1 / self.right.forward()
-        else:
-            p = - self.left.forward() * (1 / self.right.forward()**2)
+            p += 1 / self.right.x
+        if self.right == wrt:
+            p -= self.left.x * (1 / self.right.x**2)
         return p
 
 
@@ -262,7 +274,7 @@ class Sin(UnaryOp):
 
     def dvdv(self, wrt : 'Expr') -> numbers.Number:
         if self.opnd == wrt:
-            p = np.cos(self.opnd.forward())
+            p = np.cos(self.opnd.x)
         else:
             p = 0
         return p
@@ -281,6 +293,121 @@ class Ln(UnaryOp):
         return p
 
 
+class Pow(BinaryOp):
+    def __init__(self, left, right):
+        super().__init__(left, '^', right)
+
+    def forward(self):
+        self.x = self.left.forward() ** self.right.forward()
+        return self.x
+
+    def dvdv(self, wrt : 'Expr') -> numbers.Number:
+        # d/dx(x^y) = y x^(y-1)
+        # d/dy(x^y) = x^y ln(x), reusing x^y saved by forward()
+        p = 0
+        if self.left == wrt:
+            p += self.right.x * self.left.x**(self.right.x - 1)
+        if self.right == wrt:
+            p += self.x * np.log(self.left.x)
+        return p
+
+
+class Maximum(BinaryOp):
+    def __init__(self, left, right):
+        super().__init__(left, 'max', right)
+
+    def forward(self):
+        self.x = np.maximum(self.left.forward(), self.right.forward())
+        return self.x
+
+    def dvdv(self, wrt : 'Expr') -> numbers.Number:
+        # derivative flows through whichever operand is larger
+        p = 0
+        if self.left == wrt:
+            p += 1 if self.left.x >= self.right.x else 0
+        if self.right == wrt:
+            p += 1 if self.right.x > self.left.x else 0
+        return p
+
+
+class Exp(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('exp', opnd)
+
+    def forward(self):
+        self.x = np.exp(self.opnd.forward())
+        return self.x
+
+    def dvdv(self, wrt : 'Expr') -> numbers.Number:
+        p = self.x if self.opnd == wrt else 0 # exp' = exp
+        return p
+
+
+class Cos(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('cos', opnd)
+
+    def forward(self):
+        self.x = np.cos(self.opnd.forward())
+        return self.x
+
+    def dvdv(self, wrt : 'Expr') -> numbers.Number:
+        p = -np.sin(self.opnd.x) if self.opnd == wrt else 0
+        return p
+
+
+class Tanh(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('tanh', opnd)
+
+    def forward(self):
+        self.x = np.tanh(self.opnd.forward())
+        return self.x
+
+    def dvdv(self, wrt : 'Expr') -> numbers.Number:
+        p = 1 - self.x**2 if self.opnd == wrt else 0 # tanh' = 1 - tanh^2
+        return p
+
+
+class Sqrt(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('sqrt', opnd)
+
+    def forward(self):
+        self.x = np.sqrt(self.opnd.forward())
+        return self.x
+
+    def dvdv(self, wrt : 'Expr') -> numbers.Number:
+        p = 1 / (2 * self.x) if self.opnd == wrt else 0 # sqrt' = 1 / (2 sqrt)
+        return p
+
+
+class Log1p(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('log1p', opnd)
+
+    def forward(self):
+        self.x = np.log1p(self.opnd.forward())
+        return self.x
+
+    def dvdv(self, wrt : 'Expr') -> numbers.Number:
+        p = 1 / (1 + self.opnd.x) if self.opnd == wrt else 0
+        return p
+
+
+class Abs(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('abs', opnd)
+
+    def forward(self):
+        self.x = np.abs(self.opnd.forward())
+        return self.x
+
+    def dvdv(self, wrt : 'Expr') -> numbers.Number:
+        p = np.sign(self.opnd.x) if self.opnd == wrt else 0
+        return p
+
+
 def sin(x:Expr) -> Sin:
     if isinstance(x, numbers.Number):
         return Sin(Const(x))
@@ -291,3 +418,42 @@ def ln(x : Expr) -> Ln:
     if isinstance(x, numbers.Number):
         return Ln(Const(x))
     return Ln(x)
+
+
+def exp(x : Expr) -> Exp:
+    if isinstance(x, numbers.Number):
+        return Exp(Const(x))
+    return Exp(x)
+
+
+def cos(x : Expr) -> Cos:
+    if isinstance(x, numbers.Number):
+        return Cos(Const(x))
+    return Cos(x)
+
+
+def tanh(x : Expr) -> Tanh:
+    if isinstance(x, numbers.Number):
+        return Tanh(Const(x))
+    return Tanh(x)
+
+
+def sqrt(x : Expr) -> Sqrt:
+    if isinstance(x, numbers.Number):
+        return Sqrt(Const(x))
+    return Sqrt(x)
+
+
+def log1p(x : Expr) -> Log1p:
+    if isinstance(x, numbers.Number):
+        return Log1p(Const(x))
+    return Log1p(x)
+
+
+def maximum(a : Expr, b : Expr) -> Maximum:
+    "Elementwise max of a and b (named after np.maximum so builtin max isn't shadowed)"
+    if isinstance(a, numbers.Number):
+        a = Const(a)
+    if isinstance(b, numbers.Number):
+        b = Const(b)
+    return Maximum(a, b)
@@ -0,0 +1,62 @@
+"""
+Compute values and gradients of one flattened expression graph at many
+input vectors using a pool of worker processes. The Graph is shipped to each
+worker once, when the worker starts, and its level schedule is rebuilt there
+a single time. Input rows are split into chunks; each chunk is evaluated as
+one batched sweep of the graph.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from autodx.flat import *
+
+_graph = None  # the Graph in this worker process
+
+
+def _init(g : Graph) -> None:
+    global _graph
+    _graph = g
+
+
+def _gradient_chunk(X : np.ndarray) -> (np.ndarray, np.ndarray):
+    y = _graph.forward(X)
+    return y, _graph.backward()
+
+
+def chunked(X, chunksize : int) -> (np.ndarray, List[np.ndarray]):
+    "Return X as a 2D float64 array (a 1D X is one input per row) and its chunks of chunksize rows"
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X.reshape(-1, 1)
+    return X, [X[i:i+chunksize] for i in range(0, len(X), chunksize)]
+
+
+def map_chunks(fn, chunks : List, init, initargs : tuple = (), workers : int = None) -> List:
+    """
+    Return [fn(chunk) for chunk in chunks] computed by a pool of worker
+    processes, each set up once with init(*initargs). fn and init must be
+    module-level functions. With workers=1 everything runs in this process.
+    """
+    if workers is None:
+        workers = min(os.cpu_count(), len(chunks))
+    if workers <= 1:
+        init(*initargs)
+        return [fn(chunk) for chunk in chunks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init, initargs=initargs) as pool:
+        return list(pool.map(fn, chunks))
+
+
+def gradients(g : Graph, X, workers : int = None, chunksize : int = 1024) -> (np.ndarray, np.ndarray):
+    """
+    Evaluate g at each row of X (one row of input values per problem) and
+    return (values, gradients) where values has one entry per row and
+    gradients is len(X) x ninputs. A 1D X means one input per problem.
+    With workers=1 everything runs in this process.
+    """
+    X, chunks = chunked(X, chunksize)
+    results = map_chunks(_gradient_chunk, chunks, _init, (g,), workers)
+    if len(results) == 0:
+        return np.zeros(0), np.zeros((0, len(g.inputs)))
+    ys, dXs = zip(*results)
+    return np.concatenate(ys), np.concatenate(dXs)
@@ -0,0 +1,265 @@
+"""
+Benchmark the autodx engines on families of expressions that grow along one
+axis each, timing the gradient computation and measuring its peak memory.
+
+    python -m autodx.bench                       # print a table
+    python -m autodx.bench --save base.json      # save a baseline
+    python -m autodx.bench --compare base.json   # flag slowdowns vs baseline
+
+A family is a function f(n) returning (fn, X) where fn(*X, sin, ln) builds
+the expression from the engine's own sin/ln, so the same f works for dual
+numbers, both ASTs and plain floats for finite differences. Vector families
+instead return an f(X) that builds a forward_vec_ast expression directly.
+An engine that can't handle a family or size (e.g., RecursionError on a
+deep chain in the recursive ASTs) gets its error recorded rather than a
+time.
+"""
+
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import autodx.backward_ast
+import autodx.finite_diff
+import autodx.forward
+import autodx.forward_ast
+import autodx.forward_vec_ast as vec
+
+
+def chain(n : int):
+    "Deep chain: n nested sin/multiply/add steps over 2 inputs"
+    def fn(x1, x2, sin, ln):
+        y = x1
+        for _ in range(n):
+            y = sin(y) * x1 + x2
+        return y
+    return fn, [0.5, 1.5]
+
+
+def wide(n : int):
+    "Wide sum: n terms over 2 inputs"
+    def fn(x1, x2, sin, ln):
+        y = x1 * x2
+        for i in range(1, n):
+            y = y + sin(x1 * i) + ln(x2 + i)
+        return y
+    return fn, [0.5, 1.5]
+
+
+def shared(n : int):
+    "DAG of n levels where each level uses the one below twice; its tree unrolls to 2^n paths"
+    def fn(x1, x2, sin, ln):
+        y = x1 * x2
+        for _ in range(n):
+            y = sin(y) + y
+        return y
+    return fn, [0.5, 1.5]
+
+
+def inputs(n : int):
+    "Many inputs: sum of x_i * sin(x_i+1) over n inputs"
+    def fn(*args):
+        X, sin = args[:-2], args[-2]
+        y = X[0] * sin(X[1])
+        for i in range(1, len(X) - 1):
+            y = y + X[i] * sin(X[i + 1])
+        return y
+    return fn, [1.0 + i / n for i in range(n)]
+
+
+def vectors(n : int):
+    "Large vectors: sum(sin(a * b) + ln(b)) for vectors a, b of length n"
+    def fn(a, b):
+        return vec.VecSum(vec.Add(vec.Sin(vec.Mul(a, b)), vec.Ln(b)))
+    rng = np.random.RandomState(n)
+    return fn, [rng.uniform(0.5, 2.0, n), rng.uniform(0.5, 2.0, n)]
+
+
+families = {
+    'chain':   (chain,   [10, 100, 250]),
+    'wide':    (wide,    [10, 100, 1000]),
+    'shared':  (shared,  [4, 8, 12]),
+    'inputs':  (inputs,  [10, 50, 200]),
+    'vectors': (vectors, [1_000, 100_000, 1_000_000]),
+}
+
+vector_families = {'vectors'}
+
+
+def forward(fn, X):
+    f = lambda *args: fn(*args, autodx.forward.sin, autodx.forward.ln)
+    return lambda: autodx.forward.gradient(f, X)
+
+
+def forward_ast(fn, X):
+    m = autodx.forward_ast
+    X_ = [m.Var(x) for x in X]
+    y = fn(*X_, m.sin, m.ln)
+    return lambda: y.gradient(X_)
+
+
+def backward_ast(fn, X):
+    m = autodx.backward_ast
+    X_ = [m.Var(x) for x in X]
+    y = fn(*X_, m.sin, m.ln)
+    def run():
+        for x in X_:
+            x.dydv = 0
+        y.forward()
+        y.backward()
+        return [x.dydv for x in X_]
+    return run
+
+
+def forward_vec_ast(fn, X):
+    X_ = [vec.Var(x) for x in X]
+    y = fn(*X_, vec.sin, vec.ln)
+    return lambda: y.gradient(X_)
+
+
+def finite_diff(fn, X):
+    f = lambda *args: fn(*args, np.sin, np.log)
+    return lambda: autodx.finite_diff.gradient(f, 1e-6, list(X))
+
+
+def forward_vec_ast_vectors(fn, X):
+    X_ = [vec.Var(x) for x in X]
+    y = fn(*X_)
+    return lambda: [y.dvdx(x) for x in X_]
+
+
+engines = {
+    'forward':         forward,
+    'forward_ast':     forward_ast,
+    'backward_ast':    backward_ast,
+    'forward_vec_ast': forward_vec_ast,
+    'finite_diff':     finite_diff,
+}
+
+vector_engines = {
+    'forward_vec_ast': forward_vec_ast_vectors,
+}
+
+
+def measure(run, repeat : int = 5, max_seconds : float = 2.0) -> dict:
+    """
+    Return best-of-repeat wall time of run() and peak bytes allocated during
+    one run. Memory is measured on a separate call since tracemalloc slows
+    down allocation. Stops repeating once max_seconds have been spent.
+    """
+    best = float('inf')
+    spent = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        if spent > max_seconds:
+            break
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': best, 'peak_bytes': peak}
+
+
+def bench(family_names=None, engine_names=None, sizes : dict = None, repeat : int = 5) -> list:
+    """
+    Run every engine on every size of every family and return a list of
+    records with family, size, engine and either seconds and peak_bytes or
+    the error that stopped the engine. sizes maps family name to a list of
+    sizes overriding the defaults.
+    """
+    results = []
+    for family in family_names or families:
+        make, default_sizes = families[family]
+        table = vector_engines if family in vector_families else engines
+        for n in (sizes or {}).get(family, default_sizes):
+            for engine in engine_names or engines:
+                if engine not in table:
+                    continue
+                record = {'family': family, 'size': n, 'engine': engine}
+                fn, X = make(n)
+                try:
+                    record.update(measure(table[engine](fn, X), repeat))
+                except Exception as e: # e.g., RecursionError; record it and keep going
+                    record['error'] = type(e).__name__
+                results.append(record)
+    return results
+
+
+def save(results : list, filename : str) -> None:
+    baseline = {'python': sys.version.split()[0], 'numpy': np.__version__,
+                'machine': platform.machine(), 'results': results}
+    with open(filename, 'w') as f:
+        json.dump(baseline, f, indent=1)
+
+
+def load(filename : str) -> list:
+    with open(filename) as f:
+        return json.load(f)['results']
+
+
+def compare(results : list, baseline : list, tolerance : float = 1.5) -> list:
+    """
+    Return (record, baseline record) pairs where time or peak memory grew by
+    more than a factor of tolerance, or that now fail but didn't before.
+    """
+    key = lambda r: (r['family'], r['size'], r['engine'])
+    before = {key(r): r for r in baseline}
+    regressions = []
+    for r in results:
+        b = before.get(key(r))
+        if b is None or 'error' in b:
+            continue
+        if 'error' in r or r['seconds'] > b['seconds'] * tolerance or \
+           r['peak_bytes'] > b['peak_bytes'] * tolerance:
+            regressions.append((r, b))
+    return regressions
+
+
+def report(results : list) -> str:
+    lines = [f"{'family':<8} {'size':>8} {'engine':<16} {'time':>12} {'peak mem':>12}"]
+    for r in results:
+        if 'error' in r:
+            lines.append(f"{r['family']:<8} {r['size']:>8} {r['engine']:<16} {r['error']:>25}")
+        else:
+            lines.append(f"{r['family']:<8} {r['size']:>8} {r['engine']:<16} "
+                         f"{r['seconds']*1e3:>10.3f}ms {r['peak_bytes']/1024:>10.1f}KB")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark autodx engines")
+    parser.add_argument('--families', nargs='+', choices=list(families))
+    parser.add_argument('--engines', nargs='+', choices=list(engines))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', metavar='FILE', help="write results as a JSON baseline")
+    parser.add_argument('--compare', metavar='FILE', help="compare against a JSON baseline")
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    results = bench(args.families, args.engines, repeat=args.repeat)
+    print(report(results))
+    if args.save:
+        save(results, args.save)
+    if args.compare:
+        regressions = compare(results, load(args.compare), args.tolerance)
+        for r, b in regressions:
+            now = r.get('error') or f"{r['seconds']*1e3:.3f}ms {r['peak_bytes']/1024:.1f}KB"
+            print(f"REGRESSION {r['family']} {r['size']} {r['engine']}: "
+                  f"{b['seconds']*1e3:.3f}ms {b['peak_bytes']/1024:.1f}KB -> {now}")
+        return 1 if len(regressions) > 0 else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -23,3 +23,51 @@ def gradient(f,h,X):
         dx = (y - fx)/h
         dX.append(dx)
     return dX
+
+
+def central(f,h,X):
+    """
+    Like gradient() but with the central difference
+
+    f(x + h)-f(x - h)
+    -----------------
+           2h
+
+    whose error shrinks as h^2 rather than h, at the cost of two calls of f
+    per input.
+    """
+    X = list(X) # tweak a copy, not the caller's X
+    dX = []
+    for i in range(len(X)):
+        x = X[i]
+        X[i] = x + h
+        up = f(*X)
+        X[i] = x - h
+        down = f(*X)
+        X[i] = x   # undo the tweak for next round
+        dX.append((up - down)/(2*h))
+    return dX
+
+
+def complex_step(f,h,X):
+    """
+    Gradient from a step h along the imaginary axis:
+
+    Im f(x + ih)
+    ------------
+         h
+
+    There's no subtraction so no cancellation error and h can be tiny (e.g.,
+    1e-20), giving derivatives accurate to machine precision. f must accept
+    complex arguments (np.sin, np.log, ... do) and be analytic; abs and
+    maximum aren't.
+    """
+    X = list(X) # tweak a copy, not the caller's X
+    dX = []
+    for i in range(len(X)):
+        x = X[i]
+        X[i] = x + 1j*h
+        y = f(*X)
+        X[i] = x
+        dX.append(y.imag/h)
+    return dX
@@ -0,0 +1,303 @@
+"""
+A flattened form of forward_ast/backward_ast expression graphs that
+evaluates the graph one topological level at a time. All nodes at the same
+level with the same operator are computed by a single NumPy call over
+gathered operands (gather-compute-scatter) rather than a Python call per
+node. Because each level is a plain array operation, a leading batch of
+input vectors can be evaluated in the same sweep.
+"""
+
+from autodx.support import *
+
+# Operator codes shared by forward_ast and backward_ast node classes
+VAR   = 0
+CONST = 1
+ADD   = 2
+SUB   = 3
+MUL   = 4
+DIV   = 5
+SIN   = 6
+LN    = 7
+# forward_vec_ast only; a Graph can't evaluate these but files can hold them
+VECDOT = 8
+VECSUM = 9
+EXPAND = 10
+# elementary functions added to all engines after the vector ops
+EXP     = 11
+COS     = 12
+TANH    = 13
+SQRT    = 14
+LOG1P   = 15
+ABS     = 16
+POW     = 17
+MAXIMUM = 18
+# forward_vec_ast fused ops; vector-only like VECDOT
+SIGMOID     = 19
+LOGSUMEXP   = 20
+SOFTMAXXENT = 21
+AFFINE      = 22
+
+OPCODES = {
+    'Var'   : VAR,
+    'Const' : CONST,
+    'Add'   : ADD,
+    'Sub'   : SUB,
+    'Mul'   : MUL,
+    'Div'   : DIV,
+    'Sin'   : SIN,
+    'Ln'    : LN,
+    'VecDot': VECDOT,
+    'VecSum': VECSUM,
+    'Expand': EXPAND,
+    'Exp'   : EXP,
+    'Cos'   : COS,
+    'Tanh'  : TANH,
+    'Sqrt'  : SQRT,
+    'Log1p' : LOG1P,
+    'Abs'   : ABS,
+    'Pow'   : POW,
+    'Maximum': MAXIMUM,
+    'Sigmoid': SIGMOID,
+    'LogSumExp': LOGSUMEXP,
+    'SoftmaxXent': SOFTMAXXENT,
+    'Affine': AFFINE
+}
+
+OPNAMES = {code: name for name, code in OPCODES.items()}
+
+UNARY = {SIN, LN, VECSUM, EXPAND, EXP, COS, TANH, SQRT, LOG1P, ABS}
+
+VECTOR = {VECDOT, VECSUM, EXPAND, SIGMOID, LOGSUMEXP, SOFTMAXXENT, AFFINE}
+
+
+def _value(code, a, b):
+    "Compute the value of a group of nodes given operand values a and b"
+    if code == ADD:
+        return a + b
+    if code == SUB:
+        return a - b
+    if code == MUL:
+        return a * b
+    if code == DIV:
+        return a / b
+    if code == SIN:
+        return np.sin(a)
+    if code == LN:
+        return np.log(a)
+    if code == EXP:
+        return np.exp(a)
+    if code == COS:
+        return np.cos(a)
+    if code == TANH:
+        return np.tanh(a)
+    if code == SQRT:
+        return np.sqrt(a)
+    if code == LOG1P:
+        return np.log1p(a)
+    if code == ABS:
+        return np.abs(a)
+    if code == POW:
+        return a ** b
+    if code == MAXIMUM:
+        return np.maximum(a, b)
+    raise ValueError(f"no value rule for {OPNAMES[code]}")
+
+
+def _partials(code, a, b, v):
+    """
+    Return (dv/da, dv/db) for a group of nodes given operand values a, b
+    and the group's own values v; dv/db is None for unary ops
+    """
+    if code == ADD:
+        return 1, 1
+    if code == SUB:
+        return 1, -1
+    if code == MUL:
+        return b, a
+    if code == DIV:
+        return 1 / b, -a / b**2
+    if code == SIN:
+        return np.cos(a), None
+    if code == LN:
+        return 1 / a, None
+    if code == EXP:
+        return v, None # exp' = exp
+    if code == COS:
+        return -np.sin(a), None
+    if code == TANH:
+        return 1 - v**2, None # tanh' = 1 - tanh^2
+    if code == SQRT:
+        return 1 / (2 * v), None
+    if code == LOG1P:
+        return 1 / (1 + a), None
+    if code == ABS:
+        return np.sign(a), None
+    if code == POW:
+        with np.errstate(invalid='ignore', divide='ignore'): # ln(a) is only used if b varies
+            return b * a**(b-1), v * np.log(a)
+    if code == MAXIMUM:
+        return (a >= b).astype(a.dtype), (a < b).astype(a.dtype)
+    raise ValueError(f"no derivative rule for {OPNAMES[code]}")
+
+
+def _scatter_add(dy, idx, values, unique : bool) -> None:
+    "dy[idx] += values, accumulating repeated indices unless we know they're unique"
+    if unique:
+        dy[idx] += values
+    else:
+        np.add.at(dy, idx, values)
+
+
+class Graph:
+    """
+    A DAG flattened into parallel arrays in topological (postorder) order.
+    Node i has operator op[i] and operands left[i], right[i] (-1 if absent).
+    Leaf values live in x; inputs holds the node indices of the Vars in the
+    order callers supply input values. The last node is the root. Pass
+    level if it's already known (e.g., loaded from a file) to skip computing
+    it; the evaluation schedule is built on first use.
+    """
+    def __init__(self, op : np.ndarray, left : np.ndarray, right : np.ndarray,
+                 x : np.ndarray, inputs : np.ndarray, level : np.ndarray = None):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.x = x
+        self.inputs = inputs
+        self.level = self.levels() if level is None else level
+        self._schedule = None
+        self.v = None
+
+    def __len__(self):
+        return len(self.op)
+
+    def __getstate__(self):
+        "Pickle just the compact arrays; the schedule is rebuilt on first use"
+        return self.op, self.left, self.right, self.x, self.inputs, self.level
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def levels(self) -> np.ndarray:
+        "Leaves are level 0; an operator is 1 more than its deepest operand"
+        level = np.zeros(len(self.op), dtype=np.int32)
+        left, right = self.left.tolist(), self.right.tolist()
+        for i in range(len(level)):
+            if left[i] >= 0:
+                d = level[left[i]]
+                if right[i] >= 0:
+                    d = max(d, level[right[i]])
+                level[i] = d + 1
+        return level
+
+    @property
+    def schedule(self) -> List[tuple]:
+        if self._schedule is None:
+            self._schedule = self.groups()
+        return self._schedule
+
+    def groups(self) -> List[tuple]:
+        """
+        Return list of (opcode, node indices, left unique?, right unique?)
+        ordered by level; each group is computed with one NumPy call.
+        """
+        ops = np.nonzero(self.level > 0)[0]
+        order = ops[np.lexsort((self.op[ops], self.level[ops]))]
+        keys = self.level[order].astype(np.int64) * 256 + self.op[order]
+        bounds = np.nonzero(np.diff(keys))[0] + 1
+        schedule = []
+        for idx in np.split(order, bounds):
+            if len(idx) == 0:
+                continue
+            code = int(self.op[idx[0]])
+            lunique = len(np.unique(self.left[idx])) == len(idx)
+            runique = len(np.unique(self.right[idx])) == len(idx)
+            schedule.append((code, idx, lunique, runique))
+        return schedule
+
+    def values(self, X=None) -> np.ndarray:
+        """
+        Return initial node value array with leaves filled in. X is None
+        (use leaf values captured by flatten()), a vector with one value per
+        input, or a 2D array with one row of input values per batch element.
+        The result is n x B when batched, else length n.
+        """
+        if X is None:
+            return self.x.copy()
+        X = np.asarray(X, dtype=self.x.dtype)
+        if X.ndim == 1:
+            v = self.x.copy()
+            v[self.inputs] = X
+            return v
+        v = np.repeat(self.x[:, np.newaxis], X.shape[0], axis=1)
+        v[self.inputs] = X.T
+        return v
+
+    def forward(self, X=None) -> Union[numbers.Number, np.ndarray]:
+        "Compute all node values level by level and return the root value"
+        v = self.values(X)
+        for code, idx, _, _ in self.schedule:
+            a = v[self.left[idx]]
+            b = None if code in UNARY else v[self.right[idx]]
+            v[idx] = _value(code, a, b)
+        self.v = v
+        return v[-1]
+
+    def backward(self) -> np.ndarray:
+        """
+        Propagate adjoints from the root down, level by level, using the
+        values from the last forward(). Return dy/dx for each input
+        (B x ninputs when batched).
+        """
+        v = self.v
+        dy = np.zeros_like(v)
+        dy[-1] = 1
+        for code, idx, lunique, runique in reversed(self.schedule):
+            g = dy[idx]
+            a = v[self.left[idx]]
+            b = None if code in UNARY else v[self.right[idx]]
+            dl, dr = _partials(code, a, b, v[idx])
+            _scatter_add(dy, self.left[idx], g * dl, lunique)
+            if dr is not None:
+                _scatter_add(dy, self.right[idx], g * dr, runique)
+        self.dy = dy
+        return dy[self.inputs].T
+
+    def gradient(self, X=None) -> np.ndarray:
+        self.forward(X)
+        return self.backward()
+
+
+def flatten(t, X : List = None, dtype=np.float64) -> Graph:
+    """
+    Convert a forward_ast or backward_ast expression graph into a Graph.
+    Shared subexpressions become a single node. X is the list of Var nodes in
+    the order input values will be given; it defaults to the order of the
+    Vars in leaves(t). Values and adjoints are computed in dtype; float32
+    halves the memory traffic of large batched sweeps.
+    """
+    nodes = postorder(t)
+    index = {id(node): i for i, node in enumerate(nodes)}
+
+    n = len(nodes)
+    op = np.empty(n, dtype=np.int8)
+    left = np.full(n, -1, dtype=np.int32)
+    right = np.full(n, -1, dtype=np.int32)
+    x = np.zeros(n, dtype=dtype)
+    for i, node in enumerate(nodes):
+        name = node.__class__.__name__
+        if name not in OPCODES or OPCODES[name] in VECTOR:
+            raise ValueError(f"can't flatten node type {name}")
+        op[i] = OPCODES[name]
+        kids = node.children()
+        if len(kids) > 0:
+            left[i] = index[id(kids[0])]
+        if len(kids) > 1:
+            right[i] = index[id(kids[1])]
+        if len(kids) == 0:
+            x[i] = node.x
+
+    if X is None:
+        X = [node for node in leaves(t) if node.isvar()]
+    inputs = np.array([index[id(node)] for node in X], dtype=np.int32)
+    return Graph(op, left, right, x, inputs)
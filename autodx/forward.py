@@ -43,7 +43,23 @@ class Expr:
         return Expr(self.x / other.x, (self.dx * other.x - self.x * other.dx)/other.x**2)
 
     def __rtruediv__(self, other):
-        return Expr(other / self.x, other / self.dx)
+        return Expr(other / self.x, -other * self.dx / self.x**2) # d/dx(c / x) = -c/x^2 * dx
+
+    def __pow__(self, other):
+        if isinstance(other, numbers.Number):
+            return Expr(self.x ** other, other * self.x**(other-1) * self.dx) # d/dx(x^c) = c x^(c-1) dx
+        v = self.x ** other.x
+        dx = other.x * self.x**(other.x-1) * self.dx
+        if other.dx != 0: # skip ln(x) unless exponent varies; x may be negative
+            dx += v * np.log(self.x) * other.dx
+        return Expr(v, dx)
+
+    def __rpow__(self, other):
+        v = other ** self.x
+        return Expr(v, v * np.log(other) * self.dx) # d/dx(c^x) = c^x ln(c) dx
+
+    def __abs__(self):
+        return Expr(np.abs(self.x), np.sign(self.x) * self.dx)
 
     def __str__(self):
         return f"(x={self.x}, dx={self.dx})"
@@ -52,14 +68,137 @@ class Expr:
         return str(self)
 
 
+class HyperDual:
+    """
+    x + dx1 ε1 + dx2 ε2 + dx12 ε1ε2 with ε1² = ε2² = 0, so dx12 picks up the
+    exact second derivative along directions ε1 and ε2. The tangent parts
+    may be NumPy arrays that broadcast against each other to carry many
+    directions at once; hessian() uses this to seed all pairs (i,j) in one
+    evaluation.
+    """
+    def __init__(self, x, dx1=1, dx2=1, dx12=0):
+        self.x = x
+        self.dx1 = dx1
+        self.dx2 = dx2
+        self.dx12 = dx12
+
+    def value(self):
+        return self.x
+
+    def apply(self, fx, dfdx, d2fdx2) -> 'HyperDual':
+        "Chain rule for unary f given f(x), f'(x), f''(x)"
+        return HyperDual(fx, dfdx * self.dx1, dfdx * self.dx2,
+                         dfdx * self.dx12 + d2fdx2 * self.dx1 * self.dx2)
+
+    def __add__(self, other):
+        if isinstance(other, numbers.Number):
+            return HyperDual(self.x + other, self.dx1, self.dx2, self.dx12)
+        return HyperDual(self.x + other.x, self.dx1 + other.dx1, self.dx2 + other.dx2, self.dx12 + other.dx12)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        if isinstance(other, numbers.Number):
+            return HyperDual(self.x - other, self.dx1, self.dx2, self.dx12)
+        return HyperDual(self.x - other.x, self.dx1 - other.dx1, self.dx2 - other.dx2, self.dx12 - other.dx12)
+
+    def __rsub__(self, other):
+        return HyperDual(other - self.x, -self.dx1, -self.dx2, -self.dx12)
+
+    def __mul__(self, other):
+        if isinstance(other, numbers.Number):
+            return HyperDual(self.x * other, other * self.dx1, other * self.dx2, other * self.dx12)
+        return HyperDual(self.x * other.x,
+                         self.dx1 * other.x + self.x * other.dx1,
+                         self.dx2 * other.x + self.x * other.dx2,
+                         self.dx12 * other.x + self.dx1 * other.dx2 + self.dx2 * other.dx1 + self.x * other.dx12)
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        if isinstance(other, numbers.Number):
+            return self.__mul__(1 / other)
+        return self.__mul__(other.apply(1 / other.x, -1 / other.x**2, 2 / other.x**3))
+
+    def __rtruediv__(self, other):
+        return self.apply(other / self.x, -other / self.x**2, 2 * other / self.x**3)
+
+    def __pow__(self, other):
+        if isinstance(other, numbers.Number):
+            return self.apply(self.x**other, other * self.x**(other-1), other * (other-1) * self.x**(other-2))
+        return exp(other * ln(self))
+
+    def __rpow__(self, other):
+        v = other ** self.x
+        return self.apply(v, v * np.log(other), v * np.log(other)**2)
+
+    def __abs__(self):
+        return self.apply(np.abs(self.x), np.sign(self.x), 0)
+
+    def __str__(self):
+        return f"(x={self.x}, dx1={self.dx1}, dx2={self.dx2}, dx12={self.dx12})"
+
+    def __repr__(self):
+        return str(self)
+
+
 def sin(expr:Expr) -> Expr:
+    if isinstance(expr, HyperDual):
+        return expr.apply(np.sin(expr.x), np.cos(expr.x), -np.sin(expr.x))
     return Expr(np.sin(expr.x), np.cos(expr.x) * expr.dx)
 
 
 def ln(expr:Expr) -> Expr:
+    if isinstance(expr, HyperDual):
+        return expr.apply(np.log(expr.x), 1 / expr.x, -1 / expr.x**2)
     return Expr(np.log(expr.x), (1 / expr.x) * expr.dx)
 
 
+def exp(expr:Expr) -> Expr:
+    v = np.exp(expr.x)
+    if isinstance(expr, HyperDual):
+        return expr.apply(v, v, v)
+    return Expr(v, v * expr.dx) # exp' = exp
+
+
+def cos(expr:Expr) -> Expr:
+    if isinstance(expr, HyperDual):
+        return expr.apply(np.cos(expr.x), -np.sin(expr.x), -np.cos(expr.x))
+    return Expr(np.cos(expr.x), -np.sin(expr.x) * expr.dx)
+
+
+def tanh(expr:Expr) -> Expr:
+    v = np.tanh(expr.x)
+    if isinstance(expr, HyperDual):
+        return expr.apply(v, 1 - v**2, -2 * v * (1 - v**2))
+    return Expr(v, (1 - v**2) * expr.dx) # tanh' = 1 - tanh^2
+
+
+def sqrt(expr:Expr) -> Expr:
+    v = np.sqrt(expr.x)
+    if isinstance(expr, HyperDual):
+        return expr.apply(v, 1 / (2 * v), -1 / (4 * v**3))
+    return Expr(v, expr.dx / (2 * v)) # sqrt' = 1 / (2 sqrt)
+
+
+def log1p(expr:Expr) -> Expr:
+    if isinstance(expr, HyperDual):
+        return expr.apply(np.log1p(expr.x), 1 / (1 + expr.x), -1 / (1 + expr.x)**2)
+    return Expr(np.log1p(expr.x), expr.dx / (1 + expr.x))
+
+
+def maximum(a:Expr, b:Expr) -> Expr:
+    "Larger of a and b along with its derivative (named after np.maximum so builtin max isn't shadowed)"
+    av = a if isinstance(a, numbers.Number) else a.x
+    bv = b if isinstance(b, numbers.Number) else b.x
+    larger, smaller = (a, b) if av >= bv else (b, a)
+    if isinstance(larger, numbers.Number):
+        return 0 * smaller + larger # constant but of smaller's type, with zero derivative
+    return larger
+
+
 def gradient(f,X):
     """
     Compute gradient of f at location specified with vector X. Variables in X
@@ -72,3 +211,20 @@ def gradient(f,X):
         result = f(*X_)
         dX.append(result.dx)
     return dX
+
+
+def hessian(f,X):
+    """
+    Compute Hessian of f at location specified with vector X in a single
+    evaluation of f. Rather than looping over pairs (i,j) of inputs, input
+    X_i is seeded with ε1 tangent e_i as a column vector and ε2 tangent
+    e_i as a row vector so the ε1ε2 parts broadcast to the full n x n matrix
+    of second derivatives.
+    """
+    n = len(X)
+    I = np.eye(n)
+    X_ = [HyperDual(x, I[i].reshape(n,1), I[i].reshape(1,n), np.zeros((n,n))) for i, x in enumerate(X)]
+    result = f(*X_)
+    if isinstance(result, numbers.Number): # f doesn't depend on X
+        return np.zeros((n,n))
+    return np.broadcast_to(result.dx12, (n,n)).copy()
@@ -43,6 +43,17 @@ class Expr:
     def __rtruediv__(self, other):
         return Const(other).__truediv__(self)
 
+    def __pow__(self, other):
+        if isinstance(other, numbers.Number):
+            other = Const(other)
+        return Pow(self,other)
+
+    def __rpow__(self, other):
+        return Const(other).__pow__(self)
+
+    def __abs__(self):
+        return Abs(self)
+
     def value(self) -> numbers.Number:
         return self.x
 
@@ -197,6 +208,102 @@ class Ln(UnaryOp):
         return (1 / self.opnd.value()) * self.opnd.dvdx(wrt)
 
 
+class Pow(BinaryOp):
+    def __init__(self, left, right):
+        super().__init__(left, '^', right)
+
+    def value(self):
+        return self.left.value() ** self.right.value()
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        a, b = self.left.value(), self.right.value()
+        d = b * a**(b-1) * self.left.dvdx(wrt)
+        db = self.right.dvdx(wrt)
+        if db != 0: # skip ln(a) unless exponent varies; a may be negative
+            d += a**b * np.log(a) * db
+        return d
+
+
+class Maximum(BinaryOp):
+    def __init__(self, left, right):
+        super().__init__(left, 'max', right)
+
+    def value(self):
+        return np.maximum(self.left.value(), self.right.value())
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        # derivative flows through whichever operand is larger
+        if self.left.value() >= self.right.value():
+            return self.left.dvdx(wrt)
+        return self.right.dvdx(wrt)
+
+
+class Exp(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('exp', opnd)
+
+    def value(self):
+        return np.exp(self.opnd.value())
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        return np.exp(self.opnd.value()) * self.opnd.dvdx(wrt)
+
+
+class Cos(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('cos', opnd)
+
+    def value(self):
+        return np.cos(self.opnd.value())
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        return -np.sin(self.opnd.value()) * self.opnd.dvdx(wrt)
+
+
+class Tanh(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('tanh', opnd)
+
+    def value(self):
+        return np.tanh(self.opnd.value())
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        return (1 - np.tanh(self.opnd.value())**2) * self.opnd.dvdx(wrt)
+
+
+class Sqrt(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('sqrt', opnd)
+
+    def value(self):
+        return np.sqrt(self.opnd.value())
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        return self.opnd.dvdx(wrt) / (2 * np.sqrt(self.opnd.value()))
+
+
+class Log1p(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('log1p', opnd)
+
+    def value(self):
+        return np.log1p(self.opnd.value())
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        return self.opnd.dvdx(wrt) / (1 + self.opnd.value())
+
+
+class Abs(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('abs', opnd)
+
+    def value(self):
+        return np.abs(self.opnd.value())
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        return np.sign(self.opnd.value()) * self.opnd.dvdx(wrt)
+
+
 def sin(x:Expr) -> Sin:
     if isinstance(x, numbers.Number):
         return Sin(Const(x))
@@ -206,4 +313,43 @@ def sin(x:Expr) -> Sin:
 def ln(x:Expr) -> Ln:
     if isinstance(x, numbers.Number):
         return Ln(Const(x))
-    return Ln(x)
\ No newline at end of file
+    return Ln(x)
+
+
+def exp(x:Expr) -> Exp:
+    if isinstance(x, numbers.Number):
+        return Exp(Const(x))
+    return Exp(x)
+
+
+def cos(x:Expr) -> Cos:
+    if isinstance(x, numbers.Number):
+        return Cos(Const(x))
+    return Cos(x)
+
+
+def tanh(x:Expr) -> Tanh:
+    if isinstance(x, numbers.Number):
+        return Tanh(Const(x))
+    return Tanh(x)
+
+
+def sqrt(x:Expr) -> Sqrt:
+    if isinstance(x, numbers.Number):
+        return Sqrt(Const(x))
+    return Sqrt(x)
+
+
+def log1p(x:Expr) -> Log1p:
+    if isinstance(x, numbers.Number):
+        return Log1p(Const(x))
+    return Log1p(x)
+
+
+def maximum(a:Expr, b:Expr) -> Maximum:
+    "Elementwise max of a and b (named after np.maximum so builtin max isn't shadowed)"
+    if isinstance(a, numbers.Number):
+        a = Const(a)
+    if isinstance(b, numbers.Number):
+        b = Const(b)
+    return Maximum(a, b)
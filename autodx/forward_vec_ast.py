@@ -1,6 +1,47 @@
 """A version of forward_ast.py that supports vector addition and dot product."""
 
+import contextlib
+
 from autodx.support import *
+from autodx.sparse import SparseVec
+
+# dtype policy for new Vars and Consts. Values and derivatives are computed
+# in dtype. If storage is set (e.g., np.float16), leaf values are kept in
+# that narrower type and widened to dtype when read.
+dtype = np.float64
+storage = None
+
+
+def set_dtype(dt, storage_dt=None) -> None:
+    "Set the dtype (and optionally narrower storage dtype) of Vars and Consts created from now on"
+    global dtype, storage
+    dtype = np.dtype(dt).type
+    storage = None if storage_dt is None else np.dtype(storage_dt).type
+
+
+@contextlib.contextmanager
+def precision(dt, storage_dt=None):
+    "Build a graph with Vars and Consts of dtype dt within a with block"
+    saved = dtype, storage
+    set_dtype(dt, storage_dt)
+    try:
+        yield
+    finally:
+        set_dtype(*saved)
+
+
+def leafvalue(x, dt):
+    "Leaf values are vectors even if 1x1 (scalars); SparseVecs stay sparse"
+    if isinstance(x, SparseVec):
+        return x.astype(dt)
+    return np.asarray(x, dtype=dt)
+
+
+def zerodvdx(leaf : 'Expr', wrt : 'Expr'):
+    "Derivative of a leaf wrt another variable; sparse leaves get sparse zeros"
+    if isinstance(leaf.x, SparseVec) and wrt.x.size > 1:
+        return SparseVec.zeros(wrt.x.size, dtype=wrt.dtype)
+    return np.zeros(wrt.x.size, dtype=wrt.dtype)
 
 YELLOW = "#fefecd" # "#fbfbd0" # "#FBFEB0"
 BLUE = "#D9E6F5"
@@ -11,15 +52,20 @@ class Expr:
         self.x = x
         self.vi = -1
         self.varname = None
+        self.size = np.size(x) # number of elements in value; operators set it from their operands
+
+    def broadcast(self, other : 'Expr') -> ('Expr', 'Expr'):
+        "Return self, other with whichever is a scalar wrapped in an Expand to the other's size"
+        if other.size==1 and self.size>1:
+            return self, Expand(other, self.size)
+        elif self.size==1 and other.size>1:
+            return Expand(self, other.size), other
+        return self, other
 
     def __add__(self, other):
         if isinstance(other, numbers.Number):
             other = Const(other)
-        if other.x.size==1 and self.x.size>1:
-            return Add(self, Expand(other, self.x.size))
-        elif self.x.size==1 and other.x.size>1:
-            return Add(Expand(self, other.x.size), other)
-        return Add(self,other)
+        return Add(*self.broadcast(other))
 
     def __radd__(self, other):
         return Const(other).__add__(self) # other comes in as left operand so we flip order
@@ -27,7 +73,7 @@ class Expr:
     def __sub__(self, other):
         if isinstance(other, numbers.Number):
             other = Const(other)
-        return Sub(self,other)
+        return Sub(*self.broadcast(other))
 
     def __rsub__(self, other):
         return Const(other).__sub__(self)
@@ -35,7 +81,7 @@ class Expr:
     def __mul__(self, other: 'Expr') -> 'Expr':  # yuck. must put 'Variable' type in string
         if isinstance(other, numbers.Number):
             other = Const(other)
-        return Mul(self,other)
+        return Mul(*self.broadcast(other))
 
     def __rmul__(self, other):
         "Allows 5 * Variable(3) to invoke overloaded * operator"
@@ -44,16 +90,31 @@ class Expr:
     def __truediv__(self, other):
         if isinstance(other, numbers.Number):
             other = Const(other)
-        return Div(self,other)
+        return Div(*self.broadcast(other))
 
     def __rtruediv__(self, other):
         return Const(other).__truediv__(self)
 
+    def __pow__(self, other):
+        if isinstance(other, numbers.Number):
+            other = Const(other)
+        return Pow(*self.broadcast(other))
+
+    def __rpow__(self, other):
+        return Const(other).__pow__(self)
+
+    def __abs__(self):
+        return Abs(self)
+
     def value(self) -> Union[numbers.Number,np.ndarray]:
         return self.x
 
     def gradient(self, X):
-        return np.array([self.dvdx(x) for x in X])
+        dX = [self.dvdx(x) for x in X]
+        if len(set(np.shape(d) for d in dX)) > 1 or \
+           any(isinstance(d, SparseVec) for d in dX): # vector and scalar inputs mixed or sparse
+            return dX
+        return np.array(dX)
 
     def children(self):
         return []
@@ -68,11 +129,19 @@ class Expr:
         return str(self)
 
 class Var(Expr):
-    def __init__(self, x, varname : str = None):
-        self.x = np.array(x) # ensure all vars are vector vars even if 1x1 (scalars)
+    def __init__(self, x, varname : str = None, dt=None):
+        self.dtype = dt if dt is not None else dtype
+        self.x = leafvalue(x, storage or self.dtype)
         self.vi = -1
         self.varname = varname
 
+    @property
+    def size(self) -> int:
+        return self.x.size
+
+    def value(self) -> np.ndarray:
+        return self.x if self.x.dtype == self.dtype else self.x.astype(self.dtype)
+
     def isvar(self) -> bool:
         return True
 
@@ -81,31 +150,39 @@ class Var(Expr):
 
     def dvdx(self, wrt : 'Expr') -> Union[numbers.Number,np.ndarray]:
         if self == wrt:
-            return np.ones(wrt.x.size, dtype=int)
+            return np.ones(wrt.x.size, dtype=wrt.dtype)
         else:
             # 0 vector must be size of wrt variable!
             # d/dv of single-var for len n v is 0 vector of len n
             # d/dk of vector for single-var k is len 1 0 vector
-            return np.zeros(wrt.x.size, dtype=int)
+            return zerodvdx(self, wrt)
 
     def __str__(self):
-        if isinstance(self.x, int) or isinstance(self.x, np.ndarray):
+        if isinstance(self.x, (int, np.ndarray, SparseVec)):
             return f'Var({self.x})'
         return f'Var({self.x:.4f})'
 
 
 class Const(Expr):
-    def __init__(self, v : numbers.Number):
-        self.x = np.array(v) # ensure all consts are vector consts even if 1x1 (scalars)
+    def __init__(self, v : numbers.Number, dt=None):
+        self.dtype = dt if dt is not None else dtype
+        self.x = leafvalue(v, storage or self.dtype)
         self.vi = -1
         self.varname = None
 
+    @property
+    def size(self) -> int:
+        return self.x.size
+
+    def value(self) -> np.ndarray:
+        return self.x if self.x.dtype == self.dtype else self.x.astype(self.dtype)
+
     def isleaf(self) -> bool:
         return True
 
     def dvdx(self, wrt : 'Expr') -> numbers.Number:
         # derivative always has same size as wrt var
-        return np.zeros(wrt.x.size, dtype=int)
+        return zerodvdx(self, wrt)
 
     def __str__(self):
         if isinstance(self.x, int):
@@ -120,6 +197,7 @@ class BinaryOp(Expr):
         self.left = left
         self.op = op
         self.right = right
+        self.size = max(left.size, right.size)
 
     def children(self):
         return [self.left, self.right]
@@ -133,6 +211,7 @@ class UnaryOp(Expr):
         super().__init__()
         self.opnd = opnd
         self.op = op
+        self.size = opnd.size
 
     def children(self):
         return [self.opnd]
@@ -141,6 +220,17 @@ class UnaryOp(Expr):
         return f"{self.op}({self.opnd})"
 
 
+def sumto(d, wrt : Expr):
+    """
+    Reduce the derivative of a reduction's operand to wrt's size. Wrt a
+    vector, derivatives are elementwise and pass through; wrt a scalar, the
+    per-element derivatives (e.g., of a broadcast scalar) sum to one.
+    """
+    if wrt.x.size == 1 and np.size(d) > 1:
+        return np.sum(d).reshape(1)
+    return d
+
+
 class Add(BinaryOp):
     def __init__(self, left, right):
         super().__init__(left, '+', right)
@@ -178,6 +268,7 @@ class Mul(BinaryOp):
 class VecDot(BinaryOp):
     def __init__(self, left, right):
         super().__init__(left, 'dot', right)
+        self.size = 1
 
     def value(self) -> numbers.Number:
         return np.dot(self.left.value(), self.right.value())
@@ -185,20 +276,20 @@ class VecDot(BinaryOp):
     def dvdx(self, wrt : Expr) -> numbers.Number:
         dr = self.right.dvdx(wrt)
         dl = self.left.dvdx(wrt)
-        return self.left.value() * dr + \
-               self.right.value() * dl
+        return sumto(self.left.value() * dr + self.right.value() * dl, wrt)
 
 
 class VecSum(UnaryOp):
     def __init__(self, opnd):
         super().__init__('sum', opnd)
+        self.size = 1
 
     def value(self) -> Union[numbers.Number,np.ndarray]:
         return np.sum(self.opnd.value())
 
     def dvdx(self, wrt : Expr) -> numbers.Number:
         # d/dx of sum(expr) is just d/dx of expr (derivate op just passes through)
-        return self.opnd.dvdx(wrt)
+        return sumto(self.opnd.dvdx(wrt), wrt)
 
 
 class Div(BinaryOp):
@@ -236,15 +327,200 @@ class Ln(UnaryOp):
 
 
 class Expand(UnaryOp):
+    """
+    Broadcast a scalar to a length n vector as a read-only stride-0 view so
+    no n-length copy is made. Wrt a scalar, the derivative is broadcast the
+    same way; reductions above it (sum, dot) sum it back with sumto().
+    """
     def __init__(self, opnd, n):
         super().__init__('expand', opnd)
         self.n = n
+        self.size = n
+
+    def value(self) -> Union[numbers.Number,np.ndarray]:
+        return np.broadcast_to(self.opnd.value(), (self.n,))
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        d = self.opnd.dvdx(wrt)
+        return np.broadcast_to(d, (self.n,)) if np.size(d)==1 else d
+
+
+class Pow(BinaryOp):
+    def __init__(self, left, right):
+        super().__init__(left, '^', right)
+
+    def value(self) -> Union[numbers.Number,np.ndarray]:
+        return self.left.value() ** self.right.value()
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        a, b = self.left.value(), self.right.value()
+        d = b * a**(b-1) * self.left.dvdx(wrt)
+        db = self.right.dvdx(wrt)
+        if np.any(db != 0): # skip ln(a) unless exponent varies; a may be negative
+            d = d + a**b * np.log(a) * db
+        return d
+
+
+class Maximum(BinaryOp):
+    def __init__(self, left, right):
+        super().__init__(left, 'max', right)
+
+    def value(self) -> Union[numbers.Number,np.ndarray]:
+        return np.maximum(self.left.value(), self.right.value())
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        # derivative flows through whichever operand is larger, element by element
+        return np.where(self.left.value() >= self.right.value(), self.left.dvdx(wrt), self.right.dvdx(wrt))
+
+
+class Exp(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('exp', opnd)
+
+    def value(self) -> Union[numbers.Number,np.ndarray]:
+        return np.exp(self.opnd.value())
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        return np.exp(self.opnd.value()) * self.opnd.dvdx(wrt)
+
+
+class Cos(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('cos', opnd)
+
+    def value(self) -> Union[numbers.Number,np.ndarray]:
+        return np.cos(self.opnd.value())
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        return -np.sin(self.opnd.value()) * self.opnd.dvdx(wrt)
+
+
+class Tanh(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('tanh', opnd)
+
+    def value(self) -> Union[numbers.Number,np.ndarray]:
+        return np.tanh(self.opnd.value())
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        return (1 - np.tanh(self.opnd.value())**2) * self.opnd.dvdx(wrt)
+
+
+class Sqrt(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('sqrt', opnd)
+
+    def value(self) -> Union[numbers.Number,np.ndarray]:
+        return np.sqrt(self.opnd.value())
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        return self.opnd.dvdx(wrt) / (2 * np.sqrt(self.opnd.value()))
+
+
+class Log1p(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('log1p', opnd)
+
+    def value(self) -> Union[numbers.Number,np.ndarray]:
+        return np.log1p(self.opnd.value())
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        return self.opnd.dvdx(wrt) / (1 + self.opnd.value())
+
+
+class Abs(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('abs', opnd)
+
+    def value(self) -> Union[numbers.Number,np.ndarray]:
+        return np.abs(self.opnd.value())
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        return np.sign(self.opnd.value()) * self.opnd.dvdx(wrt)
+
+
+# Fused ops for common ML patterns. Each replaces a subgraph of several nodes
+# (and their intermediate arrays) with one node whose value and derivative are
+# computed in a numerically stable way.
+
+def stable_logsumexp(u : np.ndarray) -> (numbers.Number, np.ndarray):
+    "Return log(sum(exp(u))) and softmax(u), shifting by max(u) so exp can't overflow"
+    m = np.max(u)
+    e = np.exp(u - m)
+    total = np.sum(e)
+    e /= total # reuse the exp buffer for softmax
+    return m + np.log(total), e
+
+
+class Sigmoid(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('sigmoid', opnd)
+
+    def value(self) -> Union[numbers.Number,np.ndarray]:
+        # 1/(1+exp(-u)) computed as exp(-log(1+exp(-u))) so large |u| doesn't overflow
+        return np.exp(-np.logaddexp(0, -self.opnd.value()))
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        s = self.value()
+        return s * (1 - s) * self.opnd.dvdx(wrt) # sigmoid' = sigmoid (1 - sigmoid)
+
+
+class LogSumExp(UnaryOp):
+    def __init__(self, opnd):
+        super().__init__('logsumexp', opnd)
+        self.size = 1
+
+    def value(self) -> Union[numbers.Number,np.ndarray]:
+        return stable_logsumexp(self.opnd.value())[0]
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        # d/du log(sum(exp(u))) = softmax(u); like sum, pass elementwise derivative through
+        return sumto(stable_logsumexp(self.opnd.value())[1] * self.opnd.dvdx(wrt), wrt)
+
+
+class SoftmaxXent(BinaryOp):
+    """
+    Cross-entropy -sum(y * log(softmax(z))) of logits z (left) against target
+    distribution y (right), computed as sum(y) logsumexp(z) - dot(y, z).
+    """
+    def __init__(self, left, right):
+        super().__init__(left, 'xent', right)
+        self.size = 1
+
+    def value(self) -> Union[numbers.Number,np.ndarray]:
+        z, y = self.left.value(), self.right.value()
+        return np.sum(y) * stable_logsumexp(z)[0] - np.dot(y, z)
+
+    def dvdx(self, wrt : Expr) -> numbers.Number:
+        z, y = self.left.value(), self.right.value()
+        lse, p = stable_logsumexp(z)
+        p *= np.sum(y)
+        p -= y # dxent/dz = sum(y) softmax(z) - y
+        return sumto(p * self.left.dvdx(wrt) + (lse - z) * self.right.dvdx(wrt), wrt)
+
+
+class Affine(Expr):
+    "dot(w, x) + b as one node"
+    def __init__(self, w : Expr, x : Expr, b : Expr):
+        super().__init__()
+        self.w = w
+        self.opnd = x # self.x holds this node's value like all nodes
+        self.b = b
+        self.op = 'affine'
+        self.size = 1
+
+    def children(self):
+        return [self.w, self.opnd, self.b]
 
     def value(self) -> Union[numbers.Number,np.ndarray]:
-        return np.ones(self.n) * self.opnd.value()
+        return np.dot(self.w.value(), self.opnd.value()) + self.b.value()
 
     def dvdx(self, wrt : Expr) -> numbers.Number:
-        return self.n * self.opnd.dvdx(wrt)
+        d = self.opnd.value() * self.w.dvdx(wrt) + self.w.value() * self.opnd.dvdx(wrt)
+        return sumto(d, wrt) + self.b.dvdx(wrt)
+
+    def __str__(self):
+        return f"affine({self.w}, {self.opnd}, {self.b})"
 
 
 def sin(x:Expr) -> Sin:
@@ -259,6 +535,69 @@ def ln(x:Expr) -> Ln:
     return Ln(x)
 
 
+def exp(x:Expr) -> Exp:
+    if isinstance(x, numbers.Number):
+        return Exp(Const(x))
+    return Exp(x)
+
+
+def cos(x:Expr) -> Cos:
+    if isinstance(x, numbers.Number):
+        return Cos(Const(x))
+    return Cos(x)
+
+
+def tanh(x:Expr) -> Tanh:
+    if isinstance(x, numbers.Number):
+        return Tanh(Const(x))
+    return Tanh(x)
+
+
+def sqrt(x:Expr) -> Sqrt:
+    if isinstance(x, numbers.Number):
+        return Sqrt(Const(x))
+    return Sqrt(x)
+
+
+def log1p(x:Expr) -> Log1p:
+    if isinstance(x, numbers.Number):
+        return Log1p(Const(x))
+    return Log1p(x)
+
+
+def maximum(a:Expr, b:Expr) -> Maximum:
+    "Elementwise max of a and b (named after np.maximum so builtin max isn't shadowed)"
+    if isinstance(a, numbers.Number):
+        a = Const(a)
+    if isinstance(b, numbers.Number):
+        b = Const(b)
+    return Maximum(*a.broadcast(b))
+
+
+def sigmoid(x:Expr) -> Sigmoid:
+    if isinstance(x, numbers.Number):
+        return Sigmoid(Const(x))
+    return Sigmoid(x)
+
+
+def logsumexp(x:Expr) -> LogSumExp:
+    return LogSumExp(x)
+
+
+def softmax_xent(z:Expr, y) -> SoftmaxXent:
+    "Cross-entropy of logits z against target distribution y (an Expr or array)"
+    if not isinstance(y, Expr):
+        y = Const(y)
+    return SoftmaxXent(z, y)
+
+
+def affine(w:Expr, x:Expr, b) -> Affine:
+    "dot(w, x) + b"
+    if not isinstance(b, Expr):
+        b = Const(b)
+    return Affine(w, x, b)
+
+
 def dot(a : Expr, b : Expr) -> np.ndarray:
     return VecDot(a, b)
 
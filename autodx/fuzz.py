@@ -0,0 +1,212 @@
+"""
+Random expression DAGs for stress testing, and a differential runner that
+checks the engines against each other while timing them.
+
+random_dag() returns a Recipe: a list of operations over the inputs and
+earlier results, with shared subexpressions, of a given size, depth limit,
+fan-out limit and op mix. A Recipe is called like a bench family function,
+recipe(*X, sin, ln), and builds itself from whichever engine those sin/ln
+come from (forward, forward_ast, backward_ast, forward_vec_ast or NumPy),
+so the same graph can go to every engine, bench.measure() and
+gradcheck.check_grad().
+
+    python -m autodx.fuzz                      # random graphs of growing size
+    python -m autodx.fuzz --save base.json     # save a baseline
+    python -m autodx.fuzz --compare base.json  # flag slowdowns and mismatches
+
+Operations that could leave their domain or overflow are guarded so values
+stay finite at any depth: ln(u) is built as ln(1 + u^2), sqrt(u) as
+sqrt(1 + u^2), exp(u) as exp(sin(u)) and a / b as a / (1 + b^2).
+"""
+
+import random
+import sys
+
+import numpy as np
+
+import autodx.bench
+from autodx.gradcheck import relative_error, NAMESPACES
+
+RULES = { # op -> (arity, build from namespace m and operands)
+    'add'    : (2, lambda m, a, b: a + b),
+    'sub'    : (2, lambda m, a, b: a - b),
+    'mul'    : (2, lambda m, a, b: a * b),
+    'div'    : (2, lambda m, a, b: a / (1 + b * b)),
+    'maximum': (2, lambda m, a, b: m.maximum(a, b)),
+    'sin'    : (1, lambda m, a: m.sin(a)),
+    'cos'    : (1, lambda m, a: m.cos(a)),
+    'tanh'   : (1, lambda m, a: m.tanh(a)),
+    'ln'     : (1, lambda m, a: m.ln(1 + a * a)),
+    'sqrt'   : (1, lambda m, a: m.sqrt(1 + a * a)),
+    'exp'    : (1, lambda m, a: m.exp(m.sin(a))),
+}
+
+# maximum is left out by default since it isn't differentiable at ties
+DEFAULT_OPS = {'add': 3, 'sub': 2, 'mul': 3, 'div': 1, 'sin': 2, 'cos': 1, 'tanh': 1, 'ln': 1, 'sqrt': 1, 'exp': 1}
+
+
+class Recipe:
+    "Operations (op, operand indexes) over ninputs inputs; index i >= ninputs is the result of op i-ninputs"
+    def __init__(self, ninputs : int, ops : list):
+        self.ninputs = ninputs
+        self.ops = ops
+
+    @property
+    def size(self) -> int:
+        return len(self.ops)
+
+    def __call__(self, *args):
+        X, sin = args[:self.ninputs], args[-2]
+        m = NAMESPACES[sin]
+        v = list(X)
+        for op, operands in self.ops:
+            v.append(RULES[op][1](m, *[v[i] for i in operands]))
+        return v[-1]
+
+    def __str__(self):
+        lines = [f"x{i+1}" for i in range(self.ninputs)]
+        for op, operands in self.ops:
+            lines.append(f"{op}({', '.join(f'v{i}' for i in operands)})")
+        return "\n".join(f"v{i} = {s}" for i, s in enumerate(lines))
+
+
+def random_dag(ninputs : int = 2, size : int = 20, depth : int = 12, fanout : int = 2,
+               ops : dict = None, seed : int = 0) -> Recipe:
+    """
+    Return a Recipe of about size operations over ninputs inputs. No path
+    from an input to the result has more than depth operations (apart from
+    the adds that join leftover results at the end) and no result is used
+    by more than fanout operations. ops maps op names in RULES to relative
+    weights (default DEFAULT_OPS). Engines that walk a shared subexpression
+    once per path (forward_ast, backward_ast) take time exponential in
+    depth, so keep it modest.
+    """
+    rng = random.Random(seed)
+    ops = ops or DEFAULT_OPS
+    names, weights = list(ops), [ops[op] for op in ops]
+    depths = [0] * ninputs
+    uses = [0] * ninputs
+    recipe = []
+    for _ in range(size):
+        op = rng.choices(names, weights)[0]
+        candidates = [i for i in range(len(depths)) if uses[i] < fanout and depths[i] < depth]
+        if len(candidates) == 0:
+            break
+        operands = []
+        for _ in range(RULES[op][0]):
+            # favor the newest results so graphs grow deep, not just wide
+            i = candidates[-1] if rng.random() < 0.4 else rng.choice(candidates)
+            operands.append(i)
+        for i in operands:
+            uses[i] += 1
+        recipe.append((op, operands))
+        depths.append(1 + max(depths[i] for i in operands))
+        uses.append(0)
+    # join results nobody used so the whole DAG feeds the root
+    unused = [i for i in range(ninputs, len(depths)) if uses[i] == 0]
+    if len(unused) == 0:
+        unused = [len(depths) - 1] if len(depths) > ninputs else list(range(ninputs))
+    root = unused[0]
+    for i in unused[1:]:
+        recipe.append(('add', [root, i]))
+        root = ninputs + len(recipe) - 1
+    if len(recipe) == 0:
+        recipe.append(('add', [root, root]))
+    return Recipe(ninputs, recipe)
+
+
+def reference(recipe : Recipe, X : list) -> (float, np.ndarray):
+    """
+    Value and complex-step gradient of recipe at X computed with NumPy.
+    Recipes using maximum are rejected: np.maximum orders complex numbers
+    by real then imaginary part, so the step isn't carried through it.
+    """
+    if any(op == 'maximum' for op, _ in recipe.ops):
+        raise ValueError("maximum isn't complex-step safe; no reference gradient for this recipe")
+    def f(*args):
+        return recipe(*args, np.sin, np.log)
+    y = f(*[np.float64(x) for x in X])
+    dX = []
+    for i in range(len(X)):
+        X_ = [complex(x) for x in X]
+        X_[i] += 1e-20j
+        dX.append(f(*X_).imag / 1e-20)
+    return y, np.array(dX)
+
+
+def run(sizes : list = None, seeds : int = 3, ninputs : int = 4, engine_names : list = None,
+        repeat : int = 3, **dag_args) -> list:
+    """
+    For every size and seed, build a random DAG, run each engine on it and
+    return bench-style records with family 'random-<seed>', size, engine,
+    seconds, peak_bytes and max_error: the largest relative error of the
+    engine's gradient vs the NumPy complex-step reference. Engines that fail
+    get an error instead. dag_args go to random_dag(); ops can't include
+    maximum since reference() can't handle it.
+    """
+    results = []
+    for n in sizes or [10, 30, 100]:
+        for seed in range(seeds):
+            recipe = random_dag(ninputs, n, seed=seed, **dag_args)
+            X = list(np.random.RandomState(seed).uniform(-2, 2, ninputs))
+            _, expected = reference(recipe, X)
+            for engine in engine_names or autodx.bench.engines:
+                record = {'family': f'random-{seed}', 'size': n, 'engine': engine}
+                try:
+                    grad = autodx.bench.engines[engine](recipe, X)
+                    record['max_error'] = float(np.max(relative_error(np.ravel(grad()), expected)))
+                    record.update(autodx.bench.measure(grad, repeat))
+                except Exception as e:
+                    record['error'] = type(e).__name__
+                results.append(record)
+    return results
+
+
+def mismatches(results : list, tolerance : float = 1e-8) -> list:
+    "Records whose gradient disagrees with the reference; finite_diff is only approximate so it's skipped"
+    return [r for r in results if r['engine'] != 'finite_diff' and r.get('max_error', 0) > tolerance]
+
+
+def report(results : list) -> str:
+    header, *rows = autodx.bench.report(results).splitlines()
+    lines = [header + f" {'max error':>10}"]
+    for r, line in zip(results, rows):
+        lines.append(line + (f" {r['max_error']:>10.2g}" if 'max_error' in r else ""))
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Cross-check and time autodx engines on random graphs")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10, 30, 100])
+    parser.add_argument('--seeds', type=int, default=3)
+    parser.add_argument('--inputs', type=int, default=4)
+    parser.add_argument('--depth', type=int, default=12)
+    parser.add_argument('--fanout', type=int, default=2)
+    parser.add_argument('--engines', nargs='+', choices=list(autodx.bench.engines))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', metavar='FILE', help="write results as a JSON baseline")
+    parser.add_argument('--compare', metavar='FILE', help="compare against a JSON baseline")
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.seeds, args.inputs, args.engines, args.repeat,
+                  depth=args.depth, fanout=args.fanout)
+    print(report(results))
+    failed = False
+    for r in mismatches(results):
+        print(f"MISMATCH {r['family']} {r['size']} {r['engine']}: max relative error {r['max_error']:.3g}")
+        failed = True
+    if args.save:
+        autodx.bench.save(results, args.save)
+    if args.compare:
+        for r, b in autodx.bench.compare(results, autodx.bench.load(args.compare), args.tolerance):
+            now = r.get('error') or f"{r['seconds']*1e3:.3f}ms {r['peak_bytes']/1024:.1f}KB"
+            print(f"REGRESSION {r['family']} {r['size']} {r['engine']}: "
+                  f"{b['seconds']*1e3:.3f}ms {b['peak_bytes']/1024:.1f}KB -> {now}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
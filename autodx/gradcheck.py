@@ -0,0 +1,135 @@
+"""
+Check an engine's gradients against finite differences, no PyTorch needed.
+f follows the bench convention: f(*X, sin, ln) builds the function from
+whichever sin/ln it's given, so the same f runs on an engine and, with
+np.sin/np.log, on plain (or complex) numbers for the reference gradient.
+
+    report = check_grad('backward_ast', f, random_inputs(2, 1000))
+    print(report)
+    assert report.ok(1e-6)
+
+To check rules beyond sin and ln, pass ops=True and write f(*X, m): m is
+the engine's module (or NUMPY for the reference), so f can use m.exp,
+m.cos, m.tanh, m.sqrt, m.log1p, m.maximum, m.sigmoid (forward_vec_ast and
+NumPy only), abs() and **:
+
+    def g(x1, x2, m): return m.exp(x1) * m.tanh(x2) + x1 ** x2
+    check_grad('forward', g, random_inputs(2, 100), ops=True)
+
+abs and maximum aren't analytic, so check them with method='central'.
+
+Each row of X is one input point; rows are checked in chunks across a pool
+of worker processes, so f must be a module-level function when workers > 1.
+"""
+
+import types
+
+import numpy as np
+
+import autodx.backward_ast
+import autodx.batch
+import autodx.bench
+import autodx.finite_diff
+import autodx.forward
+import autodx.forward_ast
+import autodx.forward_vec_ast
+
+METHODS = {
+    'central':      (autodx.finite_diff.central, 1e-6),
+    'complex_step': (autodx.finite_diff.complex_step, 1e-20),
+}
+
+NUMPY = types.SimpleNamespace(sin=np.sin, ln=np.log, exp=np.exp, cos=np.cos, tanh=np.tanh, sqrt=np.sqrt,
+                              log1p=np.log1p, maximum=np.maximum, sigmoid=lambda u: 1 / (1 + np.exp(-u)))
+
+NAMESPACES = { # an engine's sin -> where to find its other functions
+    autodx.forward.sin        : autodx.forward,
+    autodx.forward_ast.sin    : autodx.forward_ast,
+    autodx.backward_ast.sin   : autodx.backward_ast,
+    autodx.forward_vec_ast.sin: autodx.forward_vec_ast,
+    np.sin                    : NUMPY,
+}
+
+
+class Report:
+    "Relative errors of an engine's gradient at every input point"
+    def __init__(self, engine : str, method : str, X : np.ndarray, errors : np.ndarray):
+        self.engine = engine
+        self.method = method
+        self.X = X
+        self.errors = errors # one row per point, one column per input
+
+    @property
+    def max_error(self) -> np.ndarray:
+        "Max relative error of each input's derivative across all points"
+        return np.max(self.errors, axis=0) if len(self.errors) > 0 else np.zeros(self.errors.shape[1])
+
+    @property
+    def worst(self) -> np.ndarray:
+        "Row of X with the max error for each input"
+        return np.argmax(self.errors, axis=0) if len(self.errors) > 0 else np.zeros(0, dtype=int)
+
+    def ok(self, tolerance : float = 1e-6) -> bool:
+        return bool(np.all(self.max_error <= tolerance))
+
+    def __str__(self):
+        lines = [f"{self.engine} vs {self.method} over {len(self.X)} points"]
+        for i, (e, row) in enumerate(zip(self.max_error, self.worst)):
+            lines.append(f"  x{i+1}: max rel error {e:.3g} at {self.X[row]}")
+        return "\n".join(lines)
+
+
+def relative_error(g, ref, floor : float = 1.0) -> np.ndarray:
+    "|g - ref| relative to the larger magnitude, or absolute when both are below floor"
+    g, ref = np.asarray(g, dtype=float), np.asarray(ref, dtype=float)
+    return np.abs(g - ref) / np.maximum(np.maximum(np.abs(g), np.abs(ref)), floor)
+
+
+def withops(f):
+    "Adapt f(*X, m) to the bench convention f(*X, sin, ln), finding m from sin"
+    return lambda *args: f(*args[:-2], NAMESPACES[args[-2]])
+
+
+_check = None # (engine, f, method, h) in this worker process
+
+
+def _init(engine : str, f, method : str, h : float, ops : bool) -> None:
+    global _check
+    _check = (engine, withops(f) if ops else f, method, h)
+
+
+def _check_chunk(X : np.ndarray) -> np.ndarray:
+    engine, f, method, h = _check
+    diff, default_h = METHODS[method]
+    reference = lambda *args: f(*args, np.sin, np.log)
+    errors = []
+    for row in X:
+        g = autodx.bench.engines[engine](f, list(row))()
+        X_ = list(row.astype(complex) if method == 'complex_step' else row)
+        ref = diff(reference, h or default_h, X_)
+        errors.append(relative_error(np.ravel(g), np.real(ref)))
+    return np.array(errors).reshape(len(X), X.shape[1])
+
+
+def check_grad(engine : str, f, X, method : str = 'complex_step', h : float = None,
+               workers : int = None, chunksize : int = 256, ops : bool = False) -> Report:
+    """
+    Compare the gradient of f from engine (a name in bench.engines) to
+    finite differences at each row of X and return a Report. method is
+    'central' or 'complex_step' (the default, exact to machine precision
+    but needs f to be analytic). ops=True means f is f(*X, m) rather than
+    f(*X, sin, ln). With workers=1 everything runs in this process.
+    """
+    if engine not in autodx.bench.engines:
+        raise ValueError(f"unknown engine {engine}; expected one of {list(autodx.bench.engines)}")
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {list(METHODS)} not {method}")
+    X, chunks = autodx.batch.chunked(X, chunksize)
+    results = autodx.batch.map_chunks(_check_chunk, chunks, _init, (engine, f, method, h, ops), workers)
+    errors = np.concatenate(results) if len(results) > 0 else np.zeros((0, X.shape[1]))
+    return Report(engine, method, X, errors)
+
+
+def random_inputs(n : int, count : int, low : float = 0.5, high : float = 2.0, seed : int = 0) -> np.ndarray:
+    "count x n uniform random input points; the default range keeps ln and / away from 0"
+    return np.random.RandomState(seed).uniform(low, high, size=(count, n))
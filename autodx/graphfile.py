@@ -0,0 +1,168 @@
+"""
+Save expression graphs to a flat binary file and load them back with
+np.memmap so nothing is copied or parsed node by node. The layout is a
+fixed header followed by column arrays, each aligned to 8 bytes:
+
+    header    magic, version, n nodes, n inputs, n pool values
+    op        int8[n]     operator code from flat.OPCODES
+    left      int32[n]    first operand index or -1
+    right     int32[n]    second operand index or -1
+    level     int32[n]    topological level (leaves are 0)
+    x         float64[n]  value of scalar leaves, else 0
+    offset    int64[n]    start of a vector leaf's values in pool, else -1
+    length    int64[n]    vector leaf length, Expand's n, Affine's third
+                          operand index, else -1
+    inputs    int32[ninputs]  node indices of the input Vars
+    pool      float64[npool]  constant pool of vector leaf values
+
+Nodes are stored in postorder so operands precede their operators and the
+last node is the root. Scalar graphs load directly into a flat.Graph;
+load_expr() rebuilds node objects for any engine module with vector leaves
+as views into the memmapped pool.
+"""
+
+import struct
+
+from autodx.flat import *
+
+MAGIC = b'ADXG'
+VERSION = 1
+HEADER = struct.Struct('<4sIqqq')
+
+
+def _columns(n : int, ninputs : int, npool : int) -> List[tuple]:
+    "Return (name, dtype, count) for each column in file order"
+    return [('op',     np.int8,    n),
+            ('left',   np.int32,   n),
+            ('right',  np.int32,   n),
+            ('level',  np.int32,   n),
+            ('x',      np.float64, n),
+            ('offset', np.int64,   n),
+            ('length', np.int64,   n),
+            ('inputs', np.int32,   ninputs),
+            ('pool',   np.float64, npool)]
+
+
+def _aligned(nbytes : int) -> int:
+    return (nbytes + 7) // 8 * 8
+
+
+def columns(t, X : List = None) -> Dict[str, np.ndarray]:
+    "Convert a Graph or an expression from any engine to the file's column arrays"
+    if isinstance(t, Graph):
+        n = len(t)
+        return dict(op=t.op, left=t.left, right=t.right, level=t.level, x=t.x,
+                    offset=np.full(n, -1, dtype=np.int64),
+                    length=np.full(n, -1, dtype=np.int64),
+                    inputs=t.inputs, pool=np.zeros(0))
+
+    nodes = postorder(t)
+    index = {id(node): i for i, node in enumerate(nodes)}
+    n = len(nodes)
+    cols = dict(op=np.empty(n, dtype=np.int8),
+                left=np.full(n, -1, dtype=np.int32),
+                right=np.full(n, -1, dtype=np.int32),
+                level=np.zeros(n, dtype=np.int32),
+                x=np.zeros(n, dtype=np.float64),
+                offset=np.full(n, -1, dtype=np.int64),
+                length=np.full(n, -1, dtype=np.int64))
+    pool = []
+    npool = 0
+    for i, node in enumerate(nodes):
+        name = node.__class__.__name__
+        if name not in OPCODES:
+            raise ValueError(f"can't save node type {name}")
+        cols['op'][i] = OPCODES[name]
+        kids = [index[id(kid)] for kid in node.children()]
+        if len(kids) > 0:
+            cols['left'][i] = kids[0]
+            cols['level'][i] = max(cols['level'][kid] for kid in kids) + 1
+        if len(kids) > 1:
+            cols['right'][i] = kids[1]
+        if len(kids) == 0:
+            value = np.asarray(node.x, dtype=np.float64)
+            if value.ndim == 0:
+                cols['x'][i] = value
+            else:
+                value = value.ravel()
+                cols['offset'][i] = npool
+                cols['length'][i] = len(value)
+                pool.append(value)
+                npool += len(value)
+        elif cols['op'][i] == EXPAND:
+            cols['length'][i] = node.n
+        elif cols['op'][i] == AFFINE:
+            cols['length'][i] = kids[2]
+
+    if X is None:
+        X = [node for node in leaves(t) if node.isvar()]
+    cols['inputs'] = np.array([index[id(node)] for node in X], dtype=np.int32)
+    cols['pool'] = np.concatenate(pool) if len(pool) > 0 else np.zeros(0)
+    return cols
+
+
+def save(t, filename : str, X : List = None) -> None:
+    """
+    Write Graph or expression t to filename. X is the list of input Vars as
+    for flatten(); it defaults to the order of the Vars in leaves(t).
+    """
+    cols = columns(t, X)
+    n, ninputs, npool = len(cols['op']), len(cols['inputs']), len(cols['pool'])
+    with open(filename, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, n, ninputs, npool))
+        f.write(bytes(_aligned(HEADER.size) - HEADER.size))
+        for name, dtype, count in _columns(n, ninputs, npool):
+            data = np.ascontiguousarray(cols[name], dtype=dtype).tobytes()
+            f.write(data)
+            f.write(bytes(_aligned(len(data)) - len(data)))
+
+
+def load_columns(filename : str) -> Dict[str, np.ndarray]:
+    "Return the column arrays of a graph file as read-only memmaps"
+    with open(filename, 'rb') as f:
+        magic, version, n, ninputs, npool = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{filename} is not an autodx graph file")
+    cols = {}
+    pos = _aligned(HEADER.size)
+    for name, dtype, count in _columns(n, ninputs, npool):
+        if count == 0:
+            cols[name] = np.zeros(0, dtype=dtype)
+        else:
+            cols[name] = np.memmap(filename, dtype=dtype, mode='r', offset=pos, shape=(count,))
+        pos += _aligned(count * np.dtype(dtype).itemsize)
+    return cols
+
+
+def load(filename : str) -> Graph:
+    "Load a scalar graph file as a flat.Graph backed by memmapped arrays"
+    cols = load_columns(filename)
+    if len(cols['pool']) > 0 or np.isin(cols['op'], list(VECTOR)).any():
+        raise ValueError(f"{filename} holds a vector graph; use load_expr()")
+    return Graph(cols['op'], cols['left'], cols['right'], cols['x'], cols['inputs'], level=cols['level'])
+
+
+def load_expr(filename : str, module) -> (object, List):
+    """
+    Rebuild the expression stored in filename using the node classes of
+    engine module (e.g., autodx.backward_ast) and return (root, inputs).
+    Vector leaf values are views into the memmapped constant pool.
+    """
+    cols = load_columns(filename)
+    op, left, right = cols['op'].tolist(), cols['left'].tolist(), cols['right'].tolist()
+    offset, length, x, pool = cols['offset'].tolist(), cols['length'].tolist(), cols['x'], cols['pool']
+    nodes = []
+    for i in range(len(op)):
+        cls = getattr(module, OPNAMES[op[i]])
+        if op[i] == VAR or op[i] == CONST:
+            value = pool[offset[i]:offset[i]+length[i]] if offset[i] >= 0 else float(x[i])
+            nodes.append(cls(value))
+        elif op[i] == EXPAND:
+            nodes.append(cls(nodes[left[i]], length[i]))
+        elif op[i] == AFFINE:
+            nodes.append(cls(nodes[left[i]], nodes[right[i]], nodes[length[i]]))
+        elif right[i] >= 0:
+            nodes.append(cls(nodes[left[i]], nodes[right[i]]))
+        else:
+            nodes.append(cls(nodes[left[i]]))
+    return nodes[-1], [nodes[i] for i in cols['inputs'].tolist()]
@@ -0,0 +1,179 @@
+"""
+Full Jacobian matrices of vector-valued forward_vec_ast expressions. Row i,
+column j of jacobian(y, X) is dy_i/dx_j where x_j runs over the elements of
+the Vars in X in order. y.gradient(X) can't do this since its derivatives
+wrt a vector are elementwise (the diagonal).
+
+Each node's local partials wrt its operands are computed once: elementwise
+ops get them from their own dvdx() rule by seeding one operand's derivative
+with 1 and the others with 0; reductions (sum, dot, ...) and Expand are
+listed in PARTIALS. Then a block of k unit directions is swept through the
+graph at once as k x size arrays:
+
+    forward: T[node] = sum over operands c of T[c] * dnode/dc   (k columns of J)
+    reverse: G[c]   += G[node] * dnode/dc                        (k rows of J)
+
+Forward sweeps cost one pass per input element, reverse sweeps one per
+output element, so jacobian() picks whichever needs fewer. Passing block
+bounds the k x size arrays when there are many inputs and outputs, and
+blocks() yields the Jacobian piece by piece, e.g., to fill a memmap.
+"""
+
+from autodx.forward_vec_ast import *
+from autodx.support import Known, standin
+
+PARTIALS = { # node class -> f(operand values) returning partials wrt each operand
+    'VecSum'     : lambda u: [1],
+    'VecDot'     : lambda l, r: [r, l],
+    'Expand'     : lambda u: [1],
+    'LogSumExp'  : lambda u: [stable_logsumexp(u)[1]],
+    'SoftmaxXent': lambda z, y: (lambda lse, p: [np.sum(y) * p - y, lse - z])(*stable_logsumexp(z)),
+    'Affine'     : lambda w, x, b: [x, w, 1],
+}
+
+
+def dtypeof(X : List[Var]):
+    return np.result_type(*[x.dtype for x in X]) if len(X) > 0 else np.float64
+
+
+def fit(g : np.ndarray, size : int) -> np.ndarray:
+    "Sum or broadcast k x m block g to k x size"
+    if g.shape[1] == size:
+        return g
+    if size == 1:
+        return np.sum(g, axis=1, keepdims=True)
+    return np.broadcast_to(g, (g.shape[0], size))
+
+
+class Sweep:
+    "Values and local partials of every distinct node in t, shared by all blocks"
+    def __init__(self, t : Expr, X : List[Var]):
+        self.t = t
+        self.X = X
+        self.nodes = postorder(t)
+        self.index = index = {id(node): i for i, node in enumerate(self.nodes)}
+        self.kids = [[index[id(kid)] for kid in node.children()] for node in self.nodes]
+        self.sizes = [node.size for node in self.nodes]
+        self.offsets = np.cumsum([0] + [x.size for x in X])
+        self.inputs = {id(x): j for j, x in enumerate(X)}
+        self.dtype = dtypeof(X)
+
+        v = []
+        self.partials = []
+        for i, node in enumerate(self.nodes):
+            if node.isleaf():
+                v.append(node.value())
+                self.partials.append([])
+                continue
+            args = [v[k] for k in self.kids[i]]
+            name = node.__class__.__name__
+            s = standin(node, [Known(a) for a in args])
+            v.append(s.value())
+            if name in PARTIALS:
+                self.partials.append(PARTIALS[name](*args))
+            else:
+                self.partials.append(self.elementwise(node, args))
+        self.v = v
+
+    def elementwise(self, node : Expr, args : List) -> List:
+        "dnode/dc for each operand c from node's dvdx() with c's derivative seeded to 1"
+        kids = node.children()
+        partials = []
+        for c in kids:
+            knowns = {}
+            for kid, a in zip(kids, args):
+                if id(kid) not in knowns:
+                    knowns[id(kid)] = Known(a, [1.0 if kid is c else 0.0], {id(None): 0})
+            partials.append(standin(node, [knowns[id(kid)] for kid in kids]).dvdx(None))
+        # a shared operand (x * x) gets its total partial once; don't count it twice
+        seen = set()
+        for j, c in enumerate(kids):
+            if id(c) in seen:
+                partials[j] = 0
+            seen.add(id(c))
+        return partials
+
+    @property
+    def nrows(self) -> int:
+        return self.sizes[-1]
+
+    @property
+    def ncols(self) -> int:
+        return int(self.offsets[-1])
+
+    def forward(self, c0 : int, c1 : int) -> np.ndarray:
+        "Columns c0..c1-1 of the Jacobian"
+        k = c1 - c0
+        T = [None] * len(self.nodes)
+        for i, node in enumerate(self.nodes):
+            if node.isleaf():
+                T[i] = np.zeros((k, self.sizes[i]), dtype=self.dtype)
+                j = self.inputs.get(id(node))
+                if j is not None: # seed unit directions falling within this input
+                    lo, hi = max(c0, self.offsets[j]), min(c1, self.offsets[j+1])
+                    cols = np.arange(lo, hi)
+                    T[i][cols - c0, cols - self.offsets[j]] = 1
+                continue
+            t = 0
+            for kid, p in zip(self.kids[i], self.partials[i]):
+                t = t + fit(T[kid] * p, self.sizes[i])
+            T[i] = t
+        return np.ascontiguousarray(T[-1].T)
+
+    def reverse(self, r0 : int, r1 : int) -> np.ndarray:
+        "Rows r0..r1-1 of the Jacobian"
+        k = r1 - r0
+        G = [None] * len(self.nodes)
+        G[-1] = np.zeros((k, self.nrows), dtype=self.dtype)
+        G[-1][np.arange(k), np.arange(r0, r1)] = 1
+        for i in reversed(range(len(self.nodes))):
+            if G[i] is None:
+                continue
+            for kid, p in zip(self.kids[i], self.partials[i]):
+                g = fit(G[i] * p, self.sizes[kid])
+                G[kid] = g if G[kid] is None else G[kid] + g
+        rows = []
+        for x in self.X:
+            i = self.index.get(id(x))
+            rows.append(np.zeros((k, x.size), dtype=self.dtype) if i is None or G[i] is None else G[i])
+        return np.hstack(rows) if len(rows) > 0 else np.zeros((k, 0), dtype=self.dtype)
+
+
+def choose(nrows : int, ncols : int) -> str:
+    "One forward sweep per input element or one reverse sweep per output element, whichever is fewer"
+    return 'forward' if ncols <= nrows else 'reverse'
+
+
+def blocks(t : Expr, X : List[Var], block : int = None, mode : str = None):
+    """
+    Yield (index, J block) pairs covering the Jacobian of t wrt X, where
+    J[index] = J block. Forward mode yields blocks of up to block columns,
+    reverse mode blocks of up to block rows; mode defaults to choose().
+    """
+    sweep = Sweep(t, X)
+    m, n = sweep.nrows, sweep.ncols
+    mode = mode or choose(m, n)
+    if mode == 'forward':
+        block = block or max(n, 1)
+        for c0 in range(0, n, block):
+            c1 = min(c0 + block, n)
+            yield np.s_[:, c0:c1], sweep.forward(c0, c1)
+    elif mode == 'reverse':
+        block = block or max(m, 1)
+        for r0 in range(0, m, block):
+            r1 = min(r0 + block, m)
+            yield np.s_[r0:r1, :], sweep.reverse(r0, r1)
+    else:
+        raise ValueError(f"mode must be 'forward' or 'reverse' not {mode}")
+
+
+def jacobian(t : Expr, X : List[Var], block : int = None, mode : str = None, out : np.ndarray = None) -> np.ndarray:
+    """
+    Return the t.size x (total size of X) Jacobian of t wrt the Vars in X,
+    filling out (e.g., a memmap) if given.
+    """
+    if out is None:
+        out = np.zeros((t.size, int(np.sum([x.size for x in X]))), dtype=dtypeof(X))
+    for index, J in blocks(t, X, block, mode):
+        out[index] = J
+    return out
@@ -0,0 +1,167 @@
+"""
+Evaluate forward_vec_ast expressions into a reusable pool of buffers. A Plan
+walks the graph once to learn each node's result shape, then does liveness
+analysis: a node's buffer is returned to the pool once its last consumer has
+run, and later nodes with the same shape and dtype reuse it (elementwise
+ufuncs may even write over their own operand). Every evaluation after that
+computes with out= ufunc arguments into the same buffers, so peak memory is
+the largest live set rather than one array per node and repeated
+evaluations allocate nothing.
+
+    plan = Plan(y)
+    plan.evaluate()   # same as y.value()
+    a.x[:] = ...      # update inputs in place
+    plan.evaluate()   # recomputes with no new arrays
+
+Node types without an out= rule (e.g., the fused ops or VecDot) are computed
+by their own value() rule and don't get a buffer; neither does Expand, whose
+value is a stride-0 view of its operand, so the operand's buffer stays
+reserved until the view's last consumer has run.
+"""
+
+import weakref
+
+from autodx.forward_vec_ast import *
+from autodx.support import Known, standin
+
+BINARY_UFUNCS = {
+    'Add'    : np.add,
+    'Sub'    : np.subtract,
+    'Mul'    : np.multiply,
+    'Div'    : np.divide,
+    'Pow'    : np.power,
+    'Maximum': np.maximum
+}
+
+UNARY_UFUNCS = {
+    'Sin'  : np.sin,
+    'Ln'   : np.log,
+    'Exp'  : np.exp,
+    'Cos'  : np.cos,
+    'Tanh' : np.tanh,
+    'Sqrt' : np.sqrt,
+    'Log1p': np.log1p,
+    'Abs'  : np.abs
+}
+
+
+def vecsum(a, out):
+    return np.sum(a, out=out)
+
+
+REDUCTIONS = {'VecSum': vecsum} # not elementwise so can't write over an operand
+
+VIEWS = {'Expand'} # results alias their operand's buffer
+
+
+class Plan:
+    def __init__(self, t : Expr):
+        self.t = t
+        self.nodes = postorder(t)
+        index = {id(node): i for i, node in enumerate(self.nodes)}
+        self.kids = [[index[id(kid)] for kid in node.children()] for node in self.nodes]
+        self.names = [node.__class__.__name__ for node in self.nodes]
+        self.leaf_shapes = None
+        self.slot = None    # node index -> buffer index or None
+        self.buffers = None
+
+    def leafshapes(self) -> tuple:
+        return tuple((np.shape(node.x), node.x.dtype) for node in self.nodes if node.isleaf())
+
+    def compute(self, i : int, v : List, out=None):
+        "Compute node i from operand values in v, into out if given"
+        name = self.names[i]
+        args = [v[k] for k in self.kids[i]]
+        if out is not None:
+            if name in BINARY_UFUNCS:
+                return BINARY_UFUNCS[name](*args, out=out)
+            if name in UNARY_UFUNCS:
+                return UNARY_UFUNCS[name](*args, out=out)
+            return REDUCTIONS[name](*args, out=out)
+        return standin(self.nodes[i], [Known(a) for a in args]).value()
+
+    def plan(self) -> None:
+        """
+        Evaluate once without buffers to learn result shapes, dropping each
+        value after its last use, then assign buffers by liveness.
+        """
+        n = len(self.nodes)
+        last_use = list(range(n))
+        for i in range(n):
+            for k in self.kids[i]:
+                last_use[k] = i
+        last_use[-1] = n # root's buffer holds the result
+        for i in reversed(range(n)): # keep a buffer reserved while a view of it is live
+            if self.names[i] in VIEWS:
+                for k in self.kids[i]:
+                    last_use[k] = max(last_use[k], last_use[i])
+
+        keys = [None] * n # (shape, dtype) of each result
+        v = [None] * n
+        for i, node in enumerate(self.nodes):
+            if node.isleaf():
+                v[i] = node.value()
+                continue
+            v[i] = self.compute(i, v)
+            keys[i] = (np.shape(v[i]), np.asarray(v[i]).dtype)
+            for k in self.kids[i]:
+                if last_use[k] == i:
+                    v[k] = None
+
+        free = defaultdict(list) # (shape, dtype) -> buffer indices
+        shapes = []
+        slot = [None] * n
+        for i, node in enumerate(self.nodes):
+            if node.isleaf():
+                continue
+            dying = [slot[k] for k in set(self.kids[i]) if last_use[k] == i and slot[k] is not None]
+            name = self.names[i]
+            elementwise = name in BINARY_UFUNCS or name in UNARY_UFUNCS
+            if elementwise: # ufuncs can safely write over an operand that dies here
+                for b in dying:
+                    free[shapes[b]].append(b)
+            if elementwise or name in REDUCTIONS:
+                if len(free[keys[i]]) > 0:
+                    slot[i] = free[keys[i]].pop()
+                else:
+                    slot[i] = len(shapes)
+                    shapes.append(keys[i])
+            if not elementwise:
+                for b in dying:
+                    free[shapes[b]].append(b)
+        self.slot = slot
+        self.buffers = [np.empty(shape, dtype=dtype) for shape, dtype in shapes]
+        self.leaf_shapes = self.leafshapes()
+
+    def evaluate(self) -> Union[numbers.Number, np.ndarray]:
+        """
+        Return the value of the expression. The result is one of the plan's
+        buffers, so it is overwritten by the next evaluate(); copy it to keep it.
+        """
+        if self.slot is None or self.leafshapes() != self.leaf_shapes:
+            self.plan() # first use, or inputs changed shape
+        v = [None] * len(self.nodes)
+        for i, node in enumerate(self.nodes):
+            if node.isleaf():
+                v[i] = node.value()
+            elif self.slot[i] is not None:
+                v[i] = self.compute(i, v, out=self.buffers[self.slot[i]])
+            else:
+                v[i] = self.compute(i, v)
+        return v[-1]
+
+    @property
+    def nbytes(self) -> int:
+        "Bytes held by the buffer pool"
+        return sum(b.nbytes for b in self.buffers) if self.buffers is not None else 0
+
+
+_plans = weakref.WeakKeyDictionary() # expression -> Plan
+
+
+def value(t : Expr) -> Union[numbers.Number, np.ndarray]:
+    "Evaluate t with a Plan cached for the life of the expression"
+    plan = _plans.get(t)
+    if plan is None:
+        plan = _plans[t] = Plan(t)
+    return plan.evaluate()
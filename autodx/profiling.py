@@ -0,0 +1,146 @@
+"""
+Opt-in profiling of the AST engines. While enabled, every value(), dvdx(),
+forward(), backward_() and dvdv() call is counted and timed per engine
+module, node class and method, along with the bytes of array results it
+returned and how many times each node was visited. Visiting the same node
+more than once means a shared subexpression was recomputed.
+
+    with profiled() as p:
+        y.gradient(X)
+    print(p.report())
+
+Enabling swaps the methods on the node classes for timing wrappers and
+disabling puts the originals back, so nothing is paid when profiling is
+off.
+"""
+
+import contextlib
+import functools
+import threading
+import time
+from collections import Counter
+
+import autodx.backward_ast
+import autodx.forward_ast
+import autodx.forward_vec_ast
+
+METHODS = ['value', 'dvdx', 'forward', 'backward_', 'dvdv']
+
+
+class OpStats:
+    "Counts for one method of one node class"
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0 # self time, excluding time spent in operands' calls
+        self.bytes = 0     # bytes of the NumPy arrays returned
+        self.visits = Counter() # id(node) -> number of calls on that node
+
+    @property
+    def nodes(self) -> int:
+        "Number of distinct nodes visited"
+        return len(self.visits)
+
+    @property
+    def repeats(self) -> int:
+        "Calls on nodes already visited, i.e., redundant recomputation"
+        return self.calls - len(self.visits)
+
+
+class Profile:
+    def __init__(self):
+        self.stats = {} # (module, class name, method) -> OpStats
+        self.local = threading.local()
+
+    def wrap(self, module : str, method : str, f):
+        @functools.wraps(f)
+        def timed(node, *args):
+            stack = getattr(self.local, 'stack', None)
+            if stack is None:
+                stack = self.local.stack = []
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                result = f(node, *args)
+            finally:
+                elapsed = time.perf_counter() - start
+                inner = stack.pop()
+                if len(stack) > 0:
+                    stack[-1] += elapsed
+                key = (module, node.__class__.__name__, method)
+                stats = self.stats.get(key)
+                if stats is None:
+                    stats = self.stats[key] = OpStats()
+                stats.calls += 1
+                stats.seconds += elapsed - inner
+                stats.visits[id(node)] += 1
+            stats.bytes += getattr(result, 'nbytes', 0)
+            return result
+        return timed
+
+    def hot(self, n : int = 10) -> list:
+        "Return the n (key, OpStats) pairs with the most self time"
+        return sorted(self.stats.items(), key=lambda kv: kv[1].seconds, reverse=True)[:n]
+
+    def redundant(self) -> list:
+        "Return (key, OpStats) pairs that visited some node more than once, most repeats first"
+        found = [(key, s) for key, s in self.stats.items() if s.repeats > 0]
+        return sorted(found, key=lambda kv: kv[1].repeats, reverse=True)
+
+    def report(self, n : int = 20) -> str:
+        total = sum(s.seconds for s in self.stats.values())
+        lines = [f"{'op':<32} {'calls':>9} {'nodes':>7} {'repeats':>9} {'self time':>12} {'%':>6} {'bytes':>12}"]
+        for (module, cls, method), s in self.hot(n):
+            pct = 100 * s.seconds / total if total > 0 else 0
+            lines.append(f"{module+'.'+cls+'.'+method:<32} {s.calls:>9} {s.nodes:>7} {s.repeats:>9} "
+                         f"{s.seconds*1e3:>10.3f}ms {pct:>5.1f}% {s.bytes:>12}")
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        self.stats.clear()
+
+
+profile = None    # Profile being recorded, if any
+patched = []      # (class, method name, original function) to restore
+
+
+def enable(modules : list = None) -> Profile:
+    """
+    Start recording into a new Profile for the node classes of the given
+    engine modules (default forward_ast, backward_ast and forward_vec_ast).
+    """
+    global profile
+    if profile is not None:
+        disable()
+    if modules is None:
+        modules = [autodx.forward_ast, autodx.backward_ast, autodx.forward_vec_ast]
+    profile = Profile()
+    for module in modules:
+        name = module.__name__.split('.')[-1]
+        for cls in vars(module).values():
+            if not isinstance(cls, type) or not issubclass(cls, module.Expr) or cls.__module__ != module.__name__:
+                continue
+            for method in METHODS:
+                if method in cls.__dict__:
+                    f = cls.__dict__[method]
+                    patched.append((cls, method, f))
+                    setattr(cls, method, profile.wrap(name, method, f))
+    return profile
+
+
+def disable() -> Profile:
+    "Stop recording, restore the original methods and return the finished Profile"
+    global profile
+    while len(patched) > 0:
+        cls, method, f = patched.pop()
+        setattr(cls, method, f)
+    p, profile = profile, None
+    return p
+
+
+@contextlib.contextmanager
+def profiled(modules : list = None):
+    p = enable(modules)
+    try:
+        yield p
+    finally:
+        disable()
@@ -0,0 +1,193 @@
+"""
+A sparse vector for forward_vec_ast values and derivatives: length n with
+sorted nonzero indexes idx and their values vals, O(nnz) storage. SparseVec
+hooks into NumPy's ufunc and array-function protocols, so the existing
+forward_vec_ast rules (l * r, np.sin(v), np.dot(l, r), np.sum(v), ...) work
+on it unchanged:
+
+    sparse * dense, sparse / dense     -> sparse (zeros stay zero)
+    sparse + sparse, sparse * sparse   -> sparse (union / intersection of idx)
+    sin, abs, sqrt, tanh, ... (f(0)=0) -> sparse
+    np.dot(sparse, v), np.sum(sparse)  -> O(nnz) scalar
+    anything else                      -> computed on the dense equivalent
+"""
+
+import numbers
+
+import numpy as np
+
+
+class SparseVec:
+    def __init__(self, n : int, idx, vals):
+        self.n = n
+        self.idx = np.asarray(idx, dtype=np.int64)
+        self.vals = np.asarray(vals)
+
+    @staticmethod
+    def fromdense(a) -> 'SparseVec':
+        a = np.asarray(a).reshape(-1)
+        idx = np.flatnonzero(a)
+        return SparseVec(len(a), idx, a[idx])
+
+    @staticmethod
+    def zeros(n : int, dtype=np.float64) -> 'SparseVec':
+        return SparseVec(n, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=dtype))
+
+    def todense(self, dtype=None) -> np.ndarray:
+        a = np.zeros(self.n, dtype=dtype or self.vals.dtype)
+        a[self.idx] = self.vals
+        return a
+
+    def __array__(self, dtype=None, copy=None):
+        return self.todense(dtype)
+
+    @property
+    def size(self) -> int:
+        return self.n
+
+    @property
+    def shape(self) -> tuple:
+        return (self.n,)
+
+    ndim = 1
+
+    @property
+    def dtype(self):
+        return self.vals.dtype
+
+    @property
+    def nnz(self) -> int:
+        return len(self.idx)
+
+    @property
+    def nbytes(self) -> int:
+        return self.idx.nbytes + self.vals.nbytes
+
+    def astype(self, dtype) -> 'SparseVec':
+        return SparseVec(self.n, self.idx, self.vals.astype(dtype))
+
+    def __len__(self):
+        return self.n
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method == '__call__' and 'out' not in kwargs:
+            if len(inputs) == 1:
+                return unary(ufunc, self)
+            rule = BINARY.get(ufunc)
+            if rule is not None:
+                result = rule(*inputs)
+                if result is not NotImplemented:
+                    return result
+        inputs = [x.todense() if isinstance(x, SparseVec) else x for x in inputs]
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        if func in FUNCTIONS:
+            return FUNCTIONS[func](*args, **kwargs)
+        args = [x.todense() if isinstance(x, SparseVec) else x for x in args]
+        return func(*args, **kwargs)
+
+    def __add__(self, other): return np.add(self, other)
+    def __radd__(self, other): return np.add(other, self)
+    def __sub__(self, other): return np.subtract(self, other)
+    def __rsub__(self, other): return np.subtract(other, self)
+    def __mul__(self, other): return np.multiply(self, other)
+    def __rmul__(self, other): return np.multiply(other, self)
+    def __truediv__(self, other): return np.divide(self, other)
+    def __rtruediv__(self, other): return np.divide(other, self)
+    def __pow__(self, other): return np.power(self, other)
+    def __neg__(self): return np.negative(self)
+    def __abs__(self): return np.abs(self)
+
+    def __str__(self):
+        return f"SparseVec(n={self.n}, idx={self.idx}, vals={self.vals})"
+
+    def __repr__(self):
+        return str(self)
+
+
+def unary(ufunc, v : SparseVec):
+    with np.errstate(all='ignore'):
+        zero = ufunc(np.zeros(1, dtype=v.dtype))[0]
+    if zero == 0: # e.g., sin, sqrt, abs, negative keep zeros zero
+        return SparseVec(v.n, v.idx, ufunc(v.vals))
+    return ufunc(v.todense())
+
+
+def gather(other, v : SparseVec):
+    "Values of dense or scalar other at v's nonzeros, or None if shapes don't match"
+    if isinstance(other, numbers.Number) or np.size(other) == 1:
+        return np.asarray(other).reshape(())
+    if np.shape(other) == v.shape:
+        return np.asarray(other)[v.idx]
+    return None
+
+
+def union(a : SparseVec, b : SparseVec, op) -> SparseVec:
+    idx = np.union1d(a.idx, b.idx)
+    va = np.zeros(len(idx), dtype=np.result_type(a.vals, b.vals))
+    vb = np.zeros_like(va)
+    va[np.searchsorted(idx, a.idx)] = a.vals
+    vb[np.searchsorted(idx, b.idx)] = b.vals
+    return SparseVec(a.n, idx, op(va, vb))
+
+
+def add(a, b, op=np.add):
+    if isinstance(a, SparseVec) and isinstance(b, SparseVec) and a.n == b.n:
+        return union(a, b, op)
+    return NotImplemented
+
+
+def subtract(a, b):
+    return add(a, b, np.subtract)
+
+
+def multiply(a, b):
+    if isinstance(a, SparseVec) and isinstance(b, SparseVec):
+        if a.n != b.n:
+            return NotImplemented
+        idx, ia, ib = np.intersect1d(a.idx, b.idx, assume_unique=True, return_indices=True)
+        return SparseVec(a.n, idx, a.vals[ia] * b.vals[ib])
+    v, other = (a, b) if isinstance(a, SparseVec) else (b, a)
+    g = gather(other, v)
+    if g is None:
+        return NotImplemented
+    return SparseVec(v.n, v.idx, v.vals * g)
+
+
+def divide(a, b):
+    if not isinstance(a, SparseVec) or isinstance(b, SparseVec):
+        return NotImplemented # dividing by a sparse vector divides by zero
+    g = gather(b, a)
+    if g is None:
+        return NotImplemented
+    return SparseVec(a.n, a.idx, a.vals / g)
+
+
+BINARY = {np.add: add, np.subtract: subtract, np.multiply: multiply, np.divide: divide}
+
+
+def dot(a, b, out=None):
+    if out is not None:
+        return np.dot(np.asarray(a), np.asarray(b), out=out)
+    if isinstance(a, SparseVec) and isinstance(b, SparseVec):
+        return np.sum(multiply(a, b).vals)
+    v, other = (a, b) if isinstance(a, SparseVec) else (b, a)
+    if np.ndim(other) == 0:
+        return v * other
+    return np.dot(v.vals, np.asarray(other)[v.idx])
+
+
+def vsum(a, axis=None, dtype=None, out=None, **kwargs):
+    if out is not None or axis not in (None, 0, -1):
+        return np.sum(a.todense(), axis=axis, dtype=dtype, out=out, **kwargs)
+    return np.sum(a.vals, dtype=dtype)
+
+
+FUNCTIONS = {
+    np.dot: dot,
+    np.sum: vsum,
+    np.size: lambda a, axis=None: a.n,
+    np.shape: lambda a: a.shape,
+    np.ndim: lambda a: 1,
+}
@@ -0,0 +1,108 @@
+"""
+Value and gradient of a loss that is a sum over data rows, computed one
+chunk of rows at a time so the data never has to fit in memory. f builds the
+forward_vec_ast loss of one chunk from that chunk's data Vars and the
+parameter Vars; per-chunk values and parameter gradients are summed.
+
+    def f(x, y, w, b):   # data Vars first, then params
+        return sum((w * x + b - y) ** 2)
+    w, b = Var(0.0), Var(0.0)
+    loss, (dw, db) = gradient(f, [w, b], rows((X, Y), 100_000))
+
+X and Y can be np.memmap arrays bigger than RAM. While one chunk is being
+differentiated, a background thread reads the next one (double buffering),
+so disk reads overlap computation. Only prefetch+2 chunks are ever live.
+"""
+
+import queue
+import threading
+
+from autodx.forward_vec_ast import *
+
+_done = object() # end-of-stream marker
+
+
+def rows(data, chunksize : int):
+    """
+    Yield chunks of chunksize rows from an array, memmap or tuple of equally
+    long arrays (yielding tuples of chunks). Slices of a memmap are views
+    that aren't read from disk until used.
+    """
+    n = len(data[0]) if isinstance(data, tuple) else len(data)
+    for i in range(0, n, chunksize):
+        if isinstance(data, tuple):
+            yield tuple(d[i:i+chunksize] for d in data)
+        else:
+            yield data[i:i+chunksize]
+
+
+def _load(chunk):
+    "Read a chunk into memory, forcing memmap pages in"
+    if isinstance(chunk, tuple):
+        return tuple(np.array(c) for c in chunk)
+    return np.array(chunk)
+
+
+def prefetched(chunks, prefetch : int = 1):
+    """
+    Yield loaded chunks from an iterable while a background thread loads up
+    to prefetch chunks ahead. Errors raised while producing chunks are
+    re-raised in the consumer.
+    """
+    if prefetch <= 0:
+        for chunk in chunks:
+            yield _load(chunk)
+        return
+    q = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def offer(item) -> bool:
+        "Put item on the queue unless the consumer quits first"
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for chunk in chunks:
+                if not offer(_load(chunk)):
+                    return
+            offer(_done)
+        except BaseException as e:
+            offer(e)
+
+    t = threading.Thread(target=produce, daemon=True)
+    t.start()
+    try:
+        while True:
+            chunk = q.get()
+            if chunk is _done:
+                return
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+    finally:
+        stop.set() # consumer quit early; let the producer finish
+        t.join()
+
+
+def gradient(f, params : List[Var], chunks, prefetch : int = 1) -> (numbers.Number, list):
+    """
+    Return the value of loss f summed over all chunks and the gradient wrt
+    each Var in params. chunks is an iterable of arrays, or of tuples of
+    arrays when f takes several data arguments; see rows(). f is called as
+    f(*data Vars, *params) on every chunk.
+    """
+    total = 0
+    grads = [0] * len(params)
+    for chunk in prefetched(chunks, prefetch):
+        data = [Var(c) for c in chunk] if isinstance(chunk, tuple) else [Var(chunk)]
+        y = f(*data, *params)
+        total = total + y.value()
+        for i, p in enumerate(params):
+            grads[i] = grads[i] + y.dvdx(p)
+    return total, grads
@@ -1,11 +1,13 @@
 from typing import List, Dict, Union
 import numbers
+import copy
+import functools
 import numpy as np
-import graphviz
-import tempfile
-from IPython.display import SVG
-from subprocess import check_call
-from collections import defaultdict
+from collections import defaultdict, deque
+
+# graphviz, IPython and subprocess are only needed to draw graphs, so they
+# are imported where used; the engines import this module and shouldn't pay
+# for them.
 
 fontsize = 13
 subscript_fontsize = 10
@@ -18,6 +20,22 @@ BLACK = "#000000"
 
 textcolor = BLACK #DARK_GREY
 
+def memoize(f):
+    """
+    Cache results of a label fragment builder. Arguments that can't be hashed
+    (e.g., lists of vector elements) just skip the cache.
+    """
+    cached = functools.lru_cache(maxsize=8192, typed=True)(f)
+    @functools.wraps(f)
+    def memoized(*args):
+        try:
+            return cached(*args)
+        except TypeError:
+            return f(*args)
+    return memoized
+
+
+@memoize
 def sub(var : str, s):
     if isinstance(s, numbers.Number):
         return f'<font face="Times-Italic" point-size="{fontsize}">{var}</font><sub><font face="Times-Italic" point-size="{subscript_fontsize}">{str(s)}</font></sub>'
@@ -25,6 +43,7 @@ def sub(var : str, s):
         return f'<font face="Times-Italic" point-size="{fontsize}">{var}</font><sub><font face="Times-Italic" point-size="{subscript_fontsize}">{s}</font></sub>'
 
 
+@memoize
 def fraction(top : str, bottom : str):
     return f"""<table BORDER="0" CELLPADDING="0" CELLBORDER="0" CELLSPACING="0">
         <tr><td cellspacing="0" cellpadding="0" border="1" sides="b">{top}</td></tr>
@@ -33,6 +52,7 @@ def fraction(top : str, bottom : str):
     """
 
 
+@memoize
 def seq(*elems : List[str]):
     col = '<td cellspacing="0" cellpadding="0" border="0">%s</td>'
     return f"""<table BORDER="0" CELLPADDING="0" CELLBORDER="0" CELLSPACING="0">
@@ -95,32 +115,154 @@ def parents_(t, parent, d) -> None:
 def leaves(t):
     """Return preorder list of nodes from ast t"""
     the_leaves = []
-    work = [t]
+    seen = set() # shared subexpressions only need to be walked once
+    work = deque([t])
     while len(work)>0:
-        node = work.pop(0)
+        node = work.popleft()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
         if len(node.children())==0:
-            if node not in the_leaves:
-                the_leaves.append(node)
+            the_leaves.append(node)
         else:
             work += node.children()
     return the_leaves
 
 
-def show(g : graphviz.files.Source):
-    fname = tempfile.mktemp('.dot')
-    dot(g, filename=fname+".svg", format='svg')
-    return SVG(filename=fname+".svg")
+def show(g : 'graphviz.Source'):
+    from IPython.display import SVG
+    return SVG(data=render(g, format='svg'))
 
 
 def dot(g, filename, format='svg', dpi=None):
-    fname = tempfile.mktemp('.dot')
-    g.save(fname)
     if not filename.endswith('.'+format):
         filename = filename + '.'+format
-    options = ['-o', filename, f'-T{format}:cairo', fname]
+    with open(filename, 'wb') as f:
+        f.write(render(g, format=format, dpi=dpi))
+
+
+def dot_options(format='svg', dpi=None) -> List[str]:
+    options = [f'-T{format}:cairo']
     if dpi:
         options.append(f'-Gdpi={dpi}')
-    check_call(['dot']+options)
+    return options
+
+
+def render(g, format='svg', dpi=None) -> bytes:
+    """
+    Pipe the DOT source of g (a graphviz.Source or a string) through dot
+    and return the image bytes; nothing touches the disk.
+    """
+    import subprocess
+    source = g if isinstance(g, str) else g.source
+    return subprocess.run(['dot']+dot_options(format, dpi), input=source.encode('utf-8'),
+               stdout=subprocess.PIPE, check=True).stdout
+
+
+# Bytes that end one image in dot's concatenated output, by format
+image_terminators = {
+    'svg': b'</svg>\n',
+    'png': b'IEND\xaeB`\x82'
+}
+
+
+def render_all(graphs : List, format='svg', dpi=None) -> List[bytes]:
+    """
+    Render a list of graphs with a single dot process. dot lays out every
+    graph it reads from stdin and writes the images back to back, so we
+    split stdout at the end of each image. Formats whose images we can't
+    split fall back to one process per graph.
+    """
+    if format not in image_terminators:
+        return [render(g, format=format, dpi=dpi) for g in graphs]
+    import subprocess
+    sources = [g if isinstance(g, str) else g.source for g in graphs]
+    out = subprocess.run(['dot']+dot_options(format, dpi), input='\n'.join(sources).encode('utf-8'),
+              stdout=subprocess.PIPE, check=True).stdout
+    end = image_terminators[format]
+    images = []
+    start = 0
+    while len(images) < len(graphs):
+        i = out.find(end, start)
+        if i < 0:
+            raise ValueError(f"dot produced {len(images)} images for {len(graphs)} graphs")
+        images.append(out[start:i+len(end)])
+        start = i+len(end)
+    return images
+
+
+def postorder(t) -> List:
+    """
+    Return list of distinct nodes from ast t with every node after its
+    children. Shared subexpressions appear once. Iterative so deep chains
+    don't hit the recursion limit.
+    """
+    all = []
+    seen = set()
+    work = [(t, False)]
+    while len(work)>0:
+        node, expanded = work.pop()
+        if id(node) in seen:
+            continue
+        kids = node.children()
+        if expanded or len(kids)==0:
+            seen.add(id(node))
+            all.append(node)
+        else:
+            work.append((node, True))
+            work += [(kid, False) for kid in reversed(kids) if id(kid) not in seen]
+    return all
+
+
+class Known:
+    """
+    Stand-in operand holding a computed value and its derivatives wrt each
+    input. Node rules only read operands through value() and dvdx(), so a
+    standin() node computes from Knowns in any engine.
+    """
+    def __init__(self, x, dx : List = None, wrt_index : Dict = None):
+        self.x = x
+        self.dx = dx
+        self.wrt_index = wrt_index
+        self.vi = -1
+        self.varname = None
+        self.size = np.size(x)
+
+    def value(self):
+        return self.x
+
+    def dvdx(self, wrt):
+        return self.dx[self.wrt_index[id(wrt)]]
+
+    def children(self) -> List:
+        return []
+
+    def isleaf(self) -> bool:
+        return True
+
+    def isvar(self) -> bool:
+        return False
+
+    def __str__(self):
+        return f'Known({self.x})'
+
+    def __repr__(self):
+        return str(self)
+
+
+def standin(t, kids : List):
+    """
+    Return shallow copy of t with each operand replaced by the matching kid.
+    Leaves are returned as is since Var.dvdx() tests identity against wrt.
+    """
+    if len(kids)==0:
+        return t
+    s = copy.copy(t)
+    replace = {id(old): new for old, new in zip(t.children(), kids)}
+    for attr, val in vars(t).items():
+        if id(val) in replace:
+            setattr(s, attr, replace[id(val)])
+    return s
 
 
 def set_var_indices(t, first_index : int = 0) -> None:
@@ -137,20 +279,9 @@ def set_var_indices(t, first_index : int = 0) -> None:
 
 
 def set_var_indices_(t, vi : int) -> int:
-    if t.vi >= 0:
-        return vi
-    if t.isvar():
-        t.vi = vi
-        return t.vi + 1
-    elif len(t.children())==0: # must be constant
-        t.vi = vi
-        return t.vi + 1
-    elif hasattr(t, 'left'): # binary op
-        vi = set_var_indices_(t.left,vi)
-        vi = set_var_indices_(t.right,vi)
-        t.vi = vi
-        return t.vi + 1
-    elif hasattr(t, 'opnd'):  # unary op
-        t.vi = set_var_indices_(t.opnd,vi)
-        return t.vi + 1
-    return vi
\ No newline at end of file
+    "Number unnumbered nodes in postorder (operands before operators) starting at vi"
+    for node in postorder(t):
+        if node.vi < 0:
+            node.vi = vi
+            vi += 1
+    return vi
@@ -0,0 +1,130 @@
+import math
+import numbers
+import numpy as np
+
+class Expr:
+    """
+    Truncated Taylor series of a value along one input direction. c[k] is
+    the k-th normalized coefficient, f^(k)(x)/k!, so c[0] is the value and
+    c[1] the first derivative. Arithmetic on series convolves coefficients,
+    O(K^2) per operation, giving all K derivatives in one forward pass.
+    """
+    def __init__(self, c):
+        self.c = np.asarray(c, dtype=float)
+
+    @staticmethod
+    def var(x, K : int, dx=1) -> 'Expr':
+        "Input x moving at rate dx: series x + dx t"
+        c = np.zeros(K+1)
+        c[0] = x
+        if K > 0:
+            c[1] = dx
+        return Expr(c)
+
+    def value(self):
+        return self.c[0]
+
+    def derivatives(self) -> np.ndarray:
+        "Return [f, f', f'', ..., f^(K)]"
+        return self.c * np.array([math.factorial(k) for k in range(len(self.c))])
+
+    def __add__(self, other):
+        if isinstance(other, numbers.Number):
+            c = self.c.copy()
+            c[0] += other
+            return Expr(c)
+        return Expr(self.c + other.c)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        if isinstance(other, numbers.Number):
+            return self.__add__(-other)
+        return Expr(self.c - other.c)
+
+    def __rsub__(self, other):
+        return (-1 * self).__add__(other)
+
+    def __mul__(self, other):
+        if isinstance(other, numbers.Number):
+            return Expr(self.c * other)
+        a, b = self.c, other.c
+        # c_k = sum_j a_j b_(k-j)
+        return Expr(np.array([np.dot(a[:k+1], b[k::-1]) for k in range(len(a))]))
+
+    def __rmul__(self, other):
+        "Allows 5 * Expr to invoke overloaded * operator"
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        if isinstance(other, numbers.Number):
+            return Expr(self.c / other)
+        a, b = self.c, other.c
+        # a = b c so a_k = sum_j b_j c_(k-j); solve for c_k
+        c = np.zeros(len(a))
+        for k in range(len(a)):
+            c[k] = (a[k] - np.dot(b[1:k+1], c[k-1::-1][:k])) / b[0]
+        return Expr(c)
+
+    def __rtruediv__(self, other):
+        return Expr.var(other, len(self.c)-1, 0).__truediv__(self)
+
+    def __str__(self):
+        return f"(c={self.c})"
+
+    def __repr__(self):
+        return str(self)
+
+
+def sincos(expr:Expr) -> (Expr, Expr):
+    """
+    sin and cos of a series, computed together since each one's recurrence
+    needs the other's coefficients: s' = cos(a) a', c' = -sin(a) a'.
+    """
+    a = expr.c
+    s, c = np.zeros(len(a)), np.zeros(len(a))
+    s[0], c[0] = np.sin(a[0]), np.cos(a[0])
+    for k in range(1, len(a)):
+        j = np.arange(1, k+1)
+        s[k] = np.dot(j * a[1:k+1], c[k-1::-1]) / k
+        c[k] = -np.dot(j * a[1:k+1], s[k-1::-1]) / k
+    return Expr(s), Expr(c)
+
+
+def sin(expr:Expr) -> Expr:
+    return sincos(expr)[0]
+
+
+def cos(expr:Expr) -> Expr:
+    return sincos(expr)[1]
+
+
+def ln(expr:Expr) -> Expr:
+    a = expr.c
+    l = np.zeros(len(a))
+    l[0] = np.log(a[0])
+    # a l' = a' so k a_0 l_k = k a_k - sum_(j=1..k-1) j l_j a_(k-j)
+    for k in range(1, len(a)):
+        j = np.arange(1, k)
+        l[k] = (a[k] - np.dot(j * l[1:k], a[k-1:0:-1]) / k) / a[0]
+    return Expr(l)
+
+
+def derivatives(f, X, i : int, K : int) -> np.ndarray:
+    """
+    Compute f and its first K derivatives wrt X[i] at location X in one
+    pass, returning [f, df/dx_i, ..., d^K f/dx_i^K]. Variables in X must be
+    in same order as args of f so we can call it with f(*X).
+    """
+    X_ = [Expr.var(x, K, dx=1 if i == j else 0) for j, x in enumerate(X)]
+    return f(*X_).derivatives()
+
+
+def directional(f, X, V, K : int) -> np.ndarray:
+    """
+    Like derivatives() but along direction V: returns d^k/dt^k f(X + t V)
+    at t=0 for k = 0..K.
+    """
+    X_ = [Expr.var(x, K, dx=v) for x, v in zip(X, V)]
+    return f(*X_).derivatives()
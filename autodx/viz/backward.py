@@ -1,18 +1,37 @@
 from typing import List
 
+import graphviz
+
 from autodx.backward_ast import *
 from autodx.support import *
 
 from autodx.support import fontsize, YELLOW, GREEN, textcolor
+from autodx.viz.lod import lodviz
+from autodx.viz.cache import RenderCache
+
+vizclasses = {} # node class -> X_viz class for node type X
+
+rendered = RenderCache()
+
+
+def vizclass(t : Expr):
+    """Return X_viz for node type X, looking up the name only once per class"""
+    cls = t.__class__
+    if cls not in vizclasses:
+        vizclasses[cls] = globals()[cls.__name__ + "_viz"]
+    return vizclasses[cls]
+
 
 def eqn(t : Expr) -> List[str]:
     """Perform a dynamic dispatch to X_viz.eqn() for node type X"""
-    vizclass = globals()[t.__class__.__name__ + "_viz"]
-    return getattr(vizclass, "eqn")(t)
+    return vizclass(t).eqn(t)
 
 
-def eqndx(t : Expr, parents : List[Expr]) -> List[str]:
-    """Perform a dynamic dispatch to X_viz.eqndx() for node type X"""
+def eqndx(t : Expr, parents : List[Expr], partials : Dict) -> List[str]:
+    """
+    Perform a dynamic dispatch to X_viz.eqndx() for node type X. partials
+    maps (id(parent), id(t)) to parent.dvdv(t), computed once per render.
+    """
     if parents is None:
         return [
             fraction("∂y", f"{'∂'+sub('v',t.vi)}"),
@@ -20,14 +39,12 @@ def eqndx(t : Expr, parents : List[Expr]) -> List[str]:
             "",
             "1"
         ]
-    vizclass = globals()[t.__class__.__name__ + "_viz"]
-    return getattr(vizclass, "eqndx")(t, parents)
+    return vizclass(t).eqndx(t, parents, partials)
 
 
-def eqndvdv(t : BinaryOp, wrt : Expr) -> List[str]:
+def eqndvdv(t : BinaryOp, wrt : Expr) -> str:
     """Give equation for dv/dv"""
-    vizclass = globals()[t.__class__.__name__ + "_viz"]
-    return getattr(vizclass, "eqndvdv")(t, wrt)
+    return vizclass(t).eqndvdv(t, wrt)
 
 
 class Var_viz:
@@ -39,15 +56,16 @@ class Var_viz:
             return [f"{sub('v',t.vi)}", "", round(t.value())]
 
     @staticmethod
-    def eqndvdv(t: Var, wrt: Expr) -> List[str]:
+    def eqndvdv(t: Var, wrt: Expr) -> str:
         return None
 
     @staticmethod
-    def eqndx(t : Var, parents : List[Expr]) -> List[str]:
-        # collect contributions from all parents
+    def eqndx(t : Var, parents : List[Expr], partials : Dict) -> List[str]:
+        # collect contributions from all parents; a parent using t twice (t * t) counts
+        # once since its dvdv(t) is already the sum over both operands
         contribs = []
         contribs_values = []
-        for p in parents:
+        for p in {id(p): p for p in parents}.values():
             if len(contribs)>0:
                 contribs.append(" + ")
             contribs.append(fraction("∂y", f"{sub('∂v',p.vi)}"))
@@ -58,7 +76,7 @@ class Var_viz:
                 contribs_values.append(" + ")
             contribs_values.append(str(round(p.dydv)))
             contribs_values.append(" &times; ")
-            contribs_values.append(str(round(p.dvdv(t))))
+            contribs_values.append(str(round(partials[id(p), id(t)])))
 
         return [fraction("∂y", f"{'∂'+t.varname}"),
                 seq(*contribs),
@@ -72,11 +90,11 @@ class Const_viz:
         return [f"{sub('v',t.vi)}", "", round(t.value())]
 
     @staticmethod
-    def eqndvdv(t: Var, wrt: Expr) -> List[str]:
+    def eqndvdv(t: Var, wrt: Expr) -> str:
         return None
 
     @staticmethod
-    def eqndx(t : Const, parents : List[Expr]) -> List[str]:
+    def eqndx(t : Const, parents : List[Expr], partials : Dict) -> List[str]:
         return [fraction("∂y", f"{sub('∂v',t.vi)}"),
                 "",
                 round(t.dydv)]
@@ -97,7 +115,7 @@ class BinaryOp_viz:
                 round(t.value())]
 
     @staticmethod
-    def eqndx(t : BinaryOp, parents : List[Expr]) -> List[str]:
+    def eqndx(t : BinaryOp, parents : List[Expr], partials : Dict) -> List[str]:
         return [
             fraction("∂y", f"{'∂'+sub('v',t.vi)}"),
             seq(fraction("∂y", f"{'∂'+sub('v',parents[0].vi)}")," &times; ",
@@ -115,7 +133,7 @@ class UnaryOp_viz:
                 round(t.value())]
 
     @staticmethod
-    def eqndx(t : UnaryOp, parents : List[Expr]) -> List[str]:
+    def eqndx(t : UnaryOp, parents : List[Expr], partials : Dict) -> List[str]:
         return [
             fraction("∂y", f"{'∂'+sub('v',t.vi)}"),
             seq(fraction("∂y", f"{'∂'+sub('v',parents[0].vi)}")," &times; ",
@@ -127,13 +145,13 @@ class UnaryOp_viz:
 
 class Add_viz(BinaryOp_viz):
     @staticmethod
-    def eqndvdv(t: Var, wrt: Expr) -> List[str]:
+    def eqndvdv(t: Var, wrt: Expr) -> str:
         return "1"
 
 
 class Sub_viz(BinaryOp_viz):
     @staticmethod
-    def eqndvdv(t: Var, wrt: Expr) -> List[str]:
+    def eqndvdv(t: Var, wrt: Expr) -> str:
         if t.left == wrt:
             return "1"
         else:
@@ -142,7 +160,7 @@ class Sub_viz(BinaryOp_viz):
 
 class Mul_viz(BinaryOp_viz):
     @staticmethod
-    def eqndvdv(t: Var, wrt: Expr) -> List[str]:
+    def eqndvdv(t: Var, wrt: Expr) -> str:
         if t.left == wrt:
             p = f"{sub('v',t.right.vi)}"
         else:
@@ -151,22 +169,107 @@ class Mul_viz(BinaryOp_viz):
 
 
 class Div_viz(BinaryOp_viz):
-    pass
+    @staticmethod
+    def eqndvdv(t: Var, wrt: Expr) -> str:
+        if t.left == wrt:
+            p = f"1 &frasl; {sub('v',t.right.vi)}"
+        else:
+            p = f"&minus;{sub('v',t.left.vi)} &frasl; {sub('v',t.right.vi)}<sup>2</sup>"
+        return p
 
 
 class Sin_viz(UnaryOp_viz):
-    pass
+    @staticmethod
+    def eqndvdv(t: Var, wrt: Expr) -> str:
+        return f"cos({sub('v',t.opnd.vi)})"
 
 
 class Ln_viz(UnaryOp_viz):
-    pass
+    @staticmethod
+    def eqndvdv(t: Var, wrt: Expr) -> str:
+        return f"1 &frasl; {sub('v',t.opnd.vi)}"
+
+class Exp_viz(UnaryOp_viz):
+    @staticmethod
+    def eqndvdv(t: Var, wrt: Expr) -> str:
+        return f"{sub('v',t.vi)}" # exp' = exp
+
+
+class Cos_viz(UnaryOp_viz):
+    @staticmethod
+    def eqndvdv(t: Var, wrt: Expr) -> str:
+        return f"&minus;sin({sub('v',t.opnd.vi)})"
+
+
+class Tanh_viz(UnaryOp_viz):
+    @staticmethod
+    def eqndvdv(t: Var, wrt: Expr) -> str:
+        return f"1 &minus; {sub('v',t.vi)}<sup>2</sup>"
+
+
+class Sqrt_viz(UnaryOp_viz):
+    @staticmethod
+    def eqndvdv(t: Var, wrt: Expr) -> str:
+        return f"1 &frasl; 2{sub('v',t.vi)}"
+
+
+class Log1p_viz(UnaryOp_viz):
+    @staticmethod
+    def eqndvdv(t: Var, wrt: Expr) -> str:
+        return f"1 &frasl; (1 + {sub('v',t.opnd.vi)})"
+
+
+class Abs_viz(UnaryOp_viz):
+    @staticmethod
+    def eqndvdv(t: Var, wrt: Expr) -> str:
+        return f"sign({sub('v',t.opnd.vi)})"
+
+
+class Pow_viz(BinaryOp_viz):
+    @staticmethod
+    def eqn(t : BinaryOp) -> List[str]:
+        return [f"{sub('v',t.vi)}", f"{sub('v',t.left.vi)}<sup>{sub('v',t.right.vi)}</sup>", round(t.value())]
+
+    @staticmethod
+    def eqndvdv(t: Var, wrt: Expr) -> str:
+        if t.left == wrt:
+            p = f"{sub('v',t.right.vi)} {sub('v',t.left.vi)}<sup>{sub('v',t.right.vi)}&minus;1</sup>"
+        else:
+            p = f"{sub('v',t.vi)} ln({sub('v',t.left.vi)})"
+        return p
+
 
-def astviz(t : Expr) -> graphviz.Source:
-    "I had to do $ brew install graphviz --with-pango to get the cairo support for <sub>"
+class Maximum_viz(BinaryOp_viz):
+    @staticmethod
+    def eqn(t : BinaryOp) -> List[str]:
+        return [f"{sub('v',t.vi)}", f"max({sub('v',t.left.vi)}, {sub('v',t.right.vi)})", round(t.value())]
+
+    @staticmethod
+    def eqndvdv(t: Var, wrt: Expr) -> str:
+        # 1 for whichever operand is larger (left on ties), else 0
+        if t.left == wrt:
+            return f"[{sub('v',t.left.vi)} &ge; {sub('v',t.right.vi)}]"
+        return f"[{sub('v',t.left.vi)} &lt; {sub('v',t.right.vi)}]"
+
+def astviz(t : Expr, budget : int = None) -> graphviz.Source:
+    """
+    I had to do $ brew install graphviz --with-pango to get the cairo support for <sub>
+
+    Call after t.forward() and t.backward(). Pass a node budget to get a
+    level-of-detail view of a large graph; see viz.lod.
+    """
+    if budget is not None:
+        all = postorder(t)
+        return lodviz(t, {id(n): n.x for n in all}, {id(n): n.dydv for n in all}, "∂y/∂v", budget)
     set_var_indices(t,1)
     the_leaves = leaves(t)
     allnodes, clusters = nodes(t)
     parentmap = parents(t)
+    partials = {} # (id(parent), id(node)) -> parent.dvdv(node), one call per edge
+    for node, ps in parentmap.items():
+        for p in ps or []:
+            if (id(p), id(node)) not in partials:
+                partials[id(p), id(node)] = p.dvdv(node)
     the_nonleaves = [n for n in allnodes if not n.isleaf()]
     cluster_nodes = [item for cluster in clusters for item in cluster]
 
@@ -185,7 +288,7 @@ def astviz(t : Expr) -> graphviz.Source:
         opnd_clusters += f"""
             subgraph cluster_opnds{i} {{
             style=invis; {{rank=same; {'->'.join([f'v{n.vi}' for n in cluster])} [style=invis]}}
-            {nltab.join([nodeviz(node,parentmap[node]) for node in cluster])}
+            {nltab.join([nodeviz(node,parentmap[node],partials) for node in cluster])}
         }}\n"""
     s = f"""
 
@@ -195,15 +298,15 @@ def astviz(t : Expr) -> graphviz.Source:
         rankdir=RL;
         node [penwidth="0.5", shape=box, width=.1, height=.1];
         // OPERATORS
-        {nltab.join([nodeviz(node,parentmap[node]) for node in the_nonleaves])}
+        {nltab.join([nodeviz(node,parentmap[node],partials) for node in the_nonleaves])}
         // CONSTANTS (not operand of binary op)
-        {nltab.join([nodeviz(node,parentmap[node]) for node in [n for n in consts if n not in cluster_nodes]])}
+        {nltab.join([nodeviz(node,parentmap[node],partials) for node in [n for n in consts if n not in cluster_nodes]])}
         // OPERAND CLUSTERS
         {opnd_clusters}
         // INPUTS (leaves)
         subgraph cluster_inputs {{
             style=invis
-            {nltab.join([nodeviz(node,parentmap[node]) for node in inputs])}
+            {nltab.join([nodeviz(node,parentmap[node],partials) for node in inputs])}
         }}
         // EDGES
         {nltab.join(connections)}
@@ -214,19 +317,33 @@ def astviz(t : Expr) -> graphviz.Source:
 
     return graphviz.Source(s)
 
-def nodeviz(t : Expr, parent : Expr) -> str:
+def nodeviz(t : Expr, parent : Expr, partials : Dict) -> str:
     color = GREEN if isinstance(t,Var) else YELLOW
-    return f'v{t.vi} [color="{DARK_GREY}", margin="0.02", fontcolor="{textcolor}", fontsize="{fontsize}" fontname="Times-Italic", style=filled, fillcolor="{color}", label=<{nodehtml(t,parent)}>];'
+    return f'v{t.vi} [color="{DARK_GREY}", margin="0.02", fontcolor="{textcolor}", fontsize="{fontsize}" fontname="Times-Italic", style=filled, fillcolor="{color}", label=<{nodehtml(t,parent,partials)}>];'
 
 
 def connviz(t : Expr, kid : Expr) -> str:
     return f'v{t.vi} -> v{kid.vi} [penwidth="0.5", color="{DARK_GREY}", arrowsize=.4]'
 
 
-def nodehtml(t : Expr, parent : Expr) -> str:
+def fingerprint(t : Expr, parent : List[Expr], partials : Dict) -> tuple:
+    "Everything nodehtml() shows for t"
+    kids = tuple(kid.vi for kid in t.children())
+    if parent is None:
+        return t.vi, t.varname, kids, t.x, t.dydv
+    return t.vi, t.varname, kids, t.x, t.dydv, \
+           tuple((p.vi, tuple(k.vi for k in p.children()), p.dydv, partials[id(p), id(t)]) for p in parent)
+
+
+def nodehtml(t : Expr, parent : List[Expr], partials : Dict) -> str:
+    "Return label for t, reusing the last one rendered for t if nothing it shows has changed"
+    return rendered.html(t, fingerprint(t, parent, partials), lambda: nodehtml_(t, parent, partials))
+
+
+def nodehtml_(t : Expr, parent : List[Expr], partials : Dict) -> str:
     rows = []
     e = eqn(t)
-    edx = eqndx(t, parent)
+    edx = eqndx(t, parent, partials)
     if isinstance(t, Const):
         rows.append(f"""<tr><td>{e[0]}</td><td> = </td><td align="left">{e[2]}</td></tr>""")
         rows.append(
@@ -0,0 +1,38 @@
+"""
+Cache of rendered node labels keyed on node identity. Each entry remembers
+a fingerprint of everything the label shows (values, derivatives, operand
+numbering), so re-rendering a graph after a small change only rebuilds the
+labels whose fingerprint changed.
+"""
+
+import weakref
+
+import numpy as np
+
+
+def same(a, b) -> bool:
+    "Compare fingerprints, which may hold NumPy arrays"
+    if isinstance(a, tuple) and isinstance(b, tuple):
+        return len(a)==len(b) and all(same(x, y) for x, y in zip(a, b))
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.shape(a)==np.shape(b) and bool(np.all(np.asarray(a)==np.asarray(b)))
+    return type(a) is type(b) and a == b # 1 and 1.0 render differently
+
+
+class RenderCache:
+    def __init__(self):
+        self.entries = weakref.WeakKeyDictionary() # node -> (fingerprint, html)
+        self.misses = 0
+
+    def html(self, t, fingerprint : tuple, render) -> str:
+        "Return cached label for t if fingerprint is unchanged else call render()"
+        hit = self.entries.get(t)
+        if hit is not None and same(hit[0], fingerprint):
+            return hit[1]
+        self.misses += 1
+        html = render()
+        self.entries[t] = (fingerprint, html)
+        return html
+
+    def clear(self) -> None:
+        self.entries.clear()
@@ -1,29 +1,60 @@
 from typing import List
 
+import graphviz
+
 from autodx.forward_ast import *
 from autodx.support import *
 from autodx.support import fontsize, YELLOW, GREEN, textcolor
+from autodx.viz.lod import lodviz, sweep_all, stacked
+from autodx.viz.cache import RenderCache
+
+vizclasses = {} # node class -> X_viz class for node type X
+
+rendered = RenderCache()
+
+swept = None # (values, {id(wrt): derivatives}) of the graph being rendered, keyed by id(node)
+
+
+def vizclass(t : Expr):
+    """Return X_viz for node type X, looking up the name only once per class"""
+    cls = t.__class__
+    if cls not in vizclasses:
+        vizclasses[cls] = globals()[cls.__name__ + "_viz"]
+    return vizclasses[cls]
+
+
+def value(t : Expr):
+    """Return t.value(), taken from the current render's sweep when possible"""
+    if swept is not None and id(t) in swept[0]:
+        return swept[0][id(t)]
+    return t.value()
+
+
+def dvdx(t : Expr, wrt : Expr):
+    """Return t.dvdx(wrt), taken from the current render's sweep when possible"""
+    derivs = swept[1].get(id(wrt)) if swept is not None else None
+    if derivs is not None and id(t) in derivs:
+        return derivs[id(t)]
+    return t.dvdx(wrt)
 
 
 def eqn(t : Expr) -> List[str]:
     """Perform a dynamic dispatch to X_viz.eqn() for node type X"""
-    vizclass = globals()[t.__class__.__name__ + "_viz"]
-    return getattr(vizclass, "eqn")(t)
+    return vizclass(t).eqn(t)
 
 
 def eqndx(t : Expr, wrt : 'Expr') -> List[str]:
     """Perform a dynamic dispatch to X_viz.eqndx() for node type X"""
-    vizclass = globals()[t.__class__.__name__ + "_viz"]
-    return getattr(vizclass, "eqndx")(t, wrt)
+    return vizclass(t).eqndx(t, wrt)
 
 
 class Var_viz:
     @staticmethod
     def eqn(t : Var) -> List[str]:
         if t.varname is not None:
-            return [f"{sub('v',t.vi)}", f"{t.varname}", round(t.value())]
+            return [f"{sub('v',t.vi)}", f"{t.varname}", round(value(t))]
         else:
-            return [f"{sub('v',t.vi)}", "", round(t.value())]
+            return [f"{sub('v',t.vi)}", "", round(value(t))]
 
     @staticmethod
     def eqndx(t : Var, wrt : 'Expr') -> List[str]:
@@ -39,7 +70,7 @@ class Var_viz:
 class Const_viz:
     @staticmethod
     def eqn(t : Const) -> List[str]:
-        return [f"{sub('v',t.vi)}", "", round(t.value())]
+        return [f"{sub('v',t.vi)}", "", round(value(t))]
 
     @staticmethod
     def eqndx(t : Const, wrt : 'Expr') -> List[str]:
@@ -62,7 +93,7 @@ class BinaryOp_viz:
             op = t.op
         return [f"{sub('v',t.vi)}",
                 f"{sub('v',t.left.vi)} {op} {sub('v',t.right.vi)}",
-                round(t.value())]
+                round(value(t))]
 
 
 
@@ -71,7 +102,7 @@ class UnaryOp_viz:
     def eqn(t : UnaryOp) -> List[str]:
         return [f"{sub('v',t.vi)}",
                 f"{t.op}({sub('v',t.opnd.vi)})" if t.op.isalnum() else f"{t.op} {sub('v',t.opnd.vi)}",
-                round(t.value())]
+                round(value(t))]
 
 
 class Add_viz(BinaryOp_viz):
@@ -80,7 +111,7 @@ class Add_viz(BinaryOp_viz):
         return [
             fraction(f"{sub('∂v',t.vi)}", f"{'∂'+wrt.varname}"),
             f"{sub('∂v',t.left.vi)} + {sub('∂v',t.right.vi)}",
-            f"{round(t.left.dvdx(wrt))} + {round(t.right.dvdx(wrt))} = {round(t.dvdx(wrt))}"
+            f"{round(dvdx(t.left, wrt))} + {round(dvdx(t.right, wrt))} = {round(dvdx(t, wrt))}"
         ]
 
 
@@ -90,7 +121,7 @@ class Sub_viz(BinaryOp_viz):
         return [#f"{sub('∂v',t.vi)}",
             fraction(f"{sub('∂v',t.vi)}", f"{'∂'+wrt.varname}"),
             f"{sub('∂v',t.left.vi)} &minus; {sub('∂v',t.right.vi)}",
-            f"{round(t.left.dvdx(wrt))} &minus; {round(t.right.dvdx(wrt))} = {round(t.dvdx(wrt))}"
+            f"{round(dvdx(t.left, wrt))} &minus; {round(dvdx(t.right, wrt))} = {round(dvdx(t, wrt))}"
         ]
 
 
@@ -100,7 +131,7 @@ class Mul_viz(BinaryOp_viz):
         return [
             fraction(f"{sub('∂v',t.vi)}", f"{'∂'+wrt.varname}"),
             f"{sub('v',t.left.vi)} &times; {sub('∂v',t.right.vi)} + {sub('v',t.right.vi)} &times; {sub('∂v',t.left.vi)}",
-            f"{round(t.left.value() * t.right.dvdx(wrt))} + {round(t.right.value() * t.left.dvdx(wrt))} = {round(t.dvdx(wrt))}"]
+            f"{round(value(t.left) * dvdx(t.right, wrt))} + {round(value(t.right) * dvdx(t.left, wrt))} = {round(dvdx(t, wrt))}"]
 
 
 class Div_viz(BinaryOp_viz):
@@ -110,9 +141,9 @@ class Div_viz(BinaryOp_viz):
             fraction(f"{sub('∂v',t.vi)}", f"{'∂'+wrt.varname}"),
             fraction(f"{sub('v',t.right.vi)} &times; {sub('∂v',t.left.vi)} &minus; {sub('v',t.left.vi)} &times; {sub('∂v',t.right.vi)}", f"{sub('v',t.right.vi)}<sup>2</sup>"),
             '<table BORDER="0" CELLPADDING="0" CELLBORDER="0" CELLSPACING="1"><tr><td>' +
-            fraction(f"{round(t.right.value())} &times; {round(t.left.dvdx(wrt))} &minus; {round(t.left.value())} &times; {round(t.right.dvdx(wrt))}", f"{round(t.right.value())}<sup>2</sup>") +
-            f"</td><td> = {round(t.dvdx(wrt))}</td></tr></table>",
-            f"{round(t.left.value() * t.right.dvdx(wrt))} + {round(t.right.value() * t.left.dvdx(wrt))} = {round(t.dvdx(wrt))}"]
+            fraction(f"{round(value(t.right))} &times; {round(dvdx(t.left, wrt))} &minus; {round(value(t.left))} &times; {round(dvdx(t.right, wrt))}", f"{round(value(t.right))}<sup>2</sup>") +
+            f"</td><td> = {round(dvdx(t, wrt))}</td></tr></table>",
+            f"{round(value(t.left) * dvdx(t.right, wrt))} + {round(value(t.right) * dvdx(t.left, wrt))} = {round(dvdx(t, wrt))}"]
 
 
 class Sin_viz(UnaryOp_viz):
@@ -121,7 +152,7 @@ class Sin_viz(UnaryOp_viz):
         return [
             fraction(f"{sub('∂v',t.vi)}", f"{'∂'+wrt.varname}"),
             f"cos({sub('v',t.opnd.vi)}) &times; {sub('∂v',t.opnd.vi)}",
-            f"cos({round(t.opnd.value())}) &times; {round(t.opnd.dvdx(wrt))} = {round(t.dvdx(wrt))}"]
+            f"cos({round(value(t.opnd))}) &times; {round(dvdx(t.opnd, wrt))} = {round(dvdx(t, wrt))}"]
 
 
 class Ln_viz(UnaryOp_viz):
@@ -130,7 +161,79 @@ class Ln_viz(UnaryOp_viz):
         return [
             fraction(f"{sub('∂v',t.vi)}", f"{'∂'+wrt.varname}"),
             f"(1 &frasl; {sub('v',t.opnd.vi)}) &times; {sub('∂v',t.opnd.vi)}",
-            f"(1 &frasl; {round(t.opnd.value())}) &times; {round(t.opnd.dvdx(wrt))} = {round(t.dvdx(wrt))}"]
+            f"(1 &frasl; {round(value(t.opnd))}) &times; {round(dvdx(t.opnd, wrt))} = {round(dvdx(t, wrt))}"]
+
+
+def unaryeqndx(t : UnaryOp, wrt : 'Expr', symbolic : str, numeric) -> List[str]:
+    "eqndx() for v = f(u): f'(u) shown symbolically and as its value, times du"
+    return [
+        fraction(f"{sub('∂v',t.vi)}", f"{'∂'+wrt.varname}"),
+        f"{symbolic} &times; {sub('∂v',t.opnd.vi)}",
+        f"{round(numeric)} &times; {round(dvdx(t.opnd, wrt))} = {round(dvdx(t, wrt))}"]
+
+
+class Exp_viz(UnaryOp_viz):
+    @staticmethod
+    def eqndx(t : UnaryOp, wrt : 'Expr') -> List[str]:
+        return unaryeqndx(t, wrt, sub('v',t.vi), value(t)) # exp' = exp
+
+
+class Cos_viz(UnaryOp_viz):
+    @staticmethod
+    def eqndx(t : UnaryOp, wrt : 'Expr') -> List[str]:
+        return unaryeqndx(t, wrt, f"&minus;sin({sub('v',t.opnd.vi)})", -np.sin(value(t.opnd)))
+
+
+class Tanh_viz(UnaryOp_viz):
+    @staticmethod
+    def eqndx(t : UnaryOp, wrt : 'Expr') -> List[str]:
+        return unaryeqndx(t, wrt, f"(1 &minus; {sub('v',t.vi)}<sup>2</sup>)", 1 - value(t)**2)
+
+
+class Sqrt_viz(UnaryOp_viz):
+    @staticmethod
+    def eqndx(t : UnaryOp, wrt : 'Expr') -> List[str]:
+        return unaryeqndx(t, wrt, f"(1 &frasl; 2{sub('v',t.vi)})", 1 / (2 * value(t)))
+
+
+class Log1p_viz(UnaryOp_viz):
+    @staticmethod
+    def eqndx(t : UnaryOp, wrt : 'Expr') -> List[str]:
+        return unaryeqndx(t, wrt, f"(1 &frasl; (1 + {sub('v',t.opnd.vi)}))", 1 / (1 + value(t.opnd)))
+
+
+class Abs_viz(UnaryOp_viz):
+    @staticmethod
+    def eqndx(t : UnaryOp, wrt : 'Expr') -> List[str]:
+        return unaryeqndx(t, wrt, f"sign({sub('v',t.opnd.vi)})", np.sign(value(t.opnd)))
+
+
+class Pow_viz(BinaryOp_viz):
+    @staticmethod
+    def eqn(t : BinaryOp) -> List[str]:
+        return [f"{sub('v',t.vi)}", f"{sub('v',t.left.vi)}<sup>{sub('v',t.right.vi)}</sup>", round(value(t))]
+
+    @staticmethod
+    def eqndx(t : BinaryOp, wrt : 'Expr') -> List[str]:
+        return [
+            fraction(f"{sub('∂v',t.vi)}", f"{'∂'+wrt.varname}"),
+            f"{sub('v',t.right.vi)} {sub('v',t.left.vi)}<sup>{sub('v',t.right.vi)}&minus;1</sup> &times; {sub('∂v',t.left.vi)} + "
+            f"{sub('v',t.vi)} ln({sub('v',t.left.vi)}) &times; {sub('∂v',t.right.vi)}",
+            f"{round(dvdx(t, wrt))}"]
+
+
+class Maximum_viz(BinaryOp_viz):
+    @staticmethod
+    def eqn(t : BinaryOp) -> List[str]:
+        return [f"{sub('v',t.vi)}", f"max({sub('v',t.left.vi)}, {sub('v',t.right.vi)})", round(value(t))]
+
+    @staticmethod
+    def eqndx(t : BinaryOp, wrt : 'Expr') -> List[str]:
+        larger = t.left if np.all(value(t.left) >= value(t.right)) else t.right
+        return [
+            fraction(f"{sub('∂v',t.vi)}", f"{'∂'+wrt.varname}"),
+            f"{sub('∂v',larger.vi)}",
+            f"{round(dvdx(t, wrt))}"]
 
 
 def nonleaves(t : Expr) -> (List[Expr], List[List[Expr]]):
@@ -149,9 +252,32 @@ def nonleaves(t : Expr) -> (List[Expr], List[List[Expr]]):
     return the_nonleaves, clusters
 
 
-def astviz(t : Expr, wrt : Expr) -> graphviz.Source:
-    "I had to do $ brew install graphviz --with-pango to get the cairo support for <sub>"
+def astviz(t : Expr, wrt : Union[Expr, List[Expr]], budget : int = None) -> graphviz.Source:
+    """
+    I had to do $ brew install graphviz --with-pango to get the cairo support for <sub>
+
+    Pass a list of inputs as wrt to show each node's derivative wrt every
+    input in one graph; all derivatives come from a single sweep.
+
+    Pass a node budget to get a level-of-detail view of a large graph; see
+    viz.lod.
+    """
+    global swept
     set_var_indices(t,1)
+    X = [] if wrt is None else list(wrt) if isinstance(wrt, (list, tuple)) else [wrt]
+    values, derivs = sweep_all(t, X)
+    if budget is not None:
+        if len(X)==1:
+            return lodviz(t, values, derivs[id(X[0])], "∂v/∂"+X[0].varname, budget)
+        return lodviz(t, values, stacked(derivs, X, values), f"∂v/∂({', '.join(x.varname for x in X)})", budget)
+    swept = (values, derivs) # labels read values and derivatives computed once per node
+    try:
+        return astviz_(t, X)
+    finally:
+        swept = None
+
+
+def astviz_(t : Expr, X : List[Expr]) -> graphviz.Source:
     the_leaves = leaves(t)
     the_nonleaves, clusters = nonleaves(t)
     cluster_nodes = [item for cluster in clusters for item in cluster]
@@ -171,7 +297,7 @@ def astviz(t : Expr, wrt : Expr) -> graphviz.Source:
         opnd_clusters += f"""
             subgraph cluster_opnds{i} {{
             style=invis; {{rank=same; {'->'.join([f'v{n.vi}' for n in cluster])} [style=invis]}}
-            {nltab.join([nodeviz(node,wrt) for node in cluster])}
+            {nltab.join([nodeviz(node,X) for node in cluster])}
         }}\n"""
     s = f"""
 
@@ -181,15 +307,15 @@ def astviz(t : Expr, wrt : Expr) -> graphviz.Source:
         rankdir=RL;
         node [penwidth="0.5", shape=box, width=.1, height=.1];
         // OPERATORS
-        {nltab.join([nodeviz(node,wrt) for node in the_nonleaves])}
+        {nltab.join([nodeviz(node,X) for node in the_nonleaves])}
         // CONSTANTS (not operand of binary op)
-        {nltab.join([nodeviz(node,wrt) for node in [n for n in consts if n not in cluster_nodes]])}
+        {nltab.join([nodeviz(node,X) for node in [n for n in consts if n not in cluster_nodes]])}
         // OPERAND CLUSTERS
         {opnd_clusters}
         // INPUTS (leaves)
         subgraph cluster_inputs {{
             style=invis
-            {nltab.join([nodeviz(node,wrt) for node in inputs])}
+            {nltab.join([nodeviz(node,X) for node in inputs])}
         }}
         // EDGES
         {nltab.join(connections)}
@@ -200,21 +326,36 @@ def astviz(t : Expr, wrt : Expr) -> graphviz.Source:
 
     return graphviz.Source(s)
 
-def nodeviz(t : Expr, wrt : Expr) -> str:
+def nodeviz(t : Expr, X : List[Expr]) -> str:
     color = GREEN if isinstance(t,Var) else YELLOW
-    return f'v{t.vi} [color="{DARK_GREY}", margin="0.02", fontcolor="{textcolor}", fontsize="{fontsize}" fontname="Times-Italic", style=filled, fillcolor="{color}", label=<{nodehtml(t,wrt)}>];'
+    return f'v{t.vi} [color="{DARK_GREY}", margin="0.02", fontcolor="{textcolor}", fontsize="{fontsize}" fontname="Times-Italic", style=filled, fillcolor="{color}", label=<{nodehtml(t,X)}>];'
 
 
 def connviz(t : Expr, kid : Expr) -> str:
     return f'v{t.vi} -> v{kid.vi} [penwidth="0.5", color="{DARK_GREY}", arrowsize=.4]'
 
 
-def nodehtml(t : Expr, wrt : Expr) -> str:
+def fingerprint(t : Expr, X : List[Expr]) -> tuple:
+    "Everything nodehtml() shows for t"
+    kids = t.children()
+    if len(X)==0:
+        return t.vi, t.varname, tuple(kid.vi for kid in kids), value(t)
+    return tuple((id(x), x.vi, x.varname) for x in X), t.vi, t.varname, value(t), \
+           tuple(dvdx(t, x) for x in X), \
+           tuple((kid.vi, value(kid), tuple(dvdx(kid, x) for x in X)) for kid in kids)
+
+
+def nodehtml(t : Expr, X : List[Expr]) -> str:
+    "Return label for t, reusing the last one rendered for t if nothing it shows has changed"
+    return rendered.html(t, fingerprint(t, X), lambda: nodehtml_(t, X))
+
+
+def nodehtml_(t : Expr, X : List[Expr]) -> str:
     rows = []
     e = eqn(t)
     if isinstance(t, Const):
         rows.append(f"""<tr><td>{e[0]}</td><td> = </td><td align="left">{e[2]}</td></tr>""")
-        if wrt is not None:
+        for wrt in X:
             edx = eqndx(t, wrt)
             rows.append(
                 f"""<tr><td>{edx[0]}</td><td> = </td><td align="left">{edx[2]}</td></tr>""")
@@ -228,7 +369,7 @@ def nodehtml(t : Expr, wrt : Expr) -> str:
             <tr><td>{e[0]}</td><td> = </td><td align="left">{e[1]}</td><td> = </td><td align="left">{e[2]}</td></tr>
             """)
 
-        if wrt is not None:
+        for wrt in X:
             edx = eqndx(t,wrt)
             if len(edx)==1:
                 rows.append(f"""
@@ -0,0 +1,258 @@
+"""
+Level-of-detail visualization for graphs too big to draw node by node.
+Nodes are expanded from the root in order of derivative magnitude until a
+node budget is used up; whatever is left becomes a summary node per
+collapsed subtree. A subgraph structurally identical to one already drawn
+becomes a reference to it, and long chains of single-operand nodes are
+elided into one summary node. The hot path, following the operand with the
+largest derivative magnitude from the root down, is always drawn and
+highlighted.
+
+Labels are compact (operation, value, derivative) and come from values and
+derivatives computed once per node by the caller rather than from the
+recursive eqn()/eqndx() labels.
+"""
+
+import heapq
+import itertools
+
+import graphviz
+
+from autodx.support import *
+from autodx.support import fontsize, YELLOW, GREEN, BLUE, DARK_GREY, textcolor
+from autodx.support import Known, standin
+
+RED = "#D62728"
+
+op_symbols = {'*': "&times;", '-': "&minus;", '/': "&frasl;"}
+
+
+def brief(x) -> str:
+    "Short string for a scalar or vector value"
+    if isinstance(x, np.ndarray) and x.size > 1:
+        return np.array2string(x, precision=4, threshold=6, edgeitems=2)
+    return str(round(x))
+
+
+def magnitude(x) -> float:
+    return float(np.max(np.abs(x))) if np.size(x) > 0 else 0.0
+
+
+def sweep(t, wrt) -> (Dict, Dict):
+    """
+    Compute value and derivative wrt wrt of every node in forward-mode ast
+    t, visiting each distinct node once. Operands are replaced with their
+    computed results so each node's own value()/dvdx() rules do the work.
+    """
+    values, derivs = sweep_all(t, [wrt])
+    return values, derivs[id(wrt)]
+
+
+def sweep_all(t, X : List) -> (Dict, Dict):
+    """
+    Like sweep() but compute the derivative of every node wrt each input in
+    X during the same pass. Return values keyed by id(node) and a dict
+    mapping id(x) for each x in X to that input's derivatives.
+    """
+    wrt_index = {id(x): i for i, x in enumerate(X)}
+    values, derivs = {}, {}
+    for node in postorder(t):
+        kids = [Known(values[id(kid)], derivs[id(kid)], wrt_index) for kid in node.children()]
+        s = standin(node, kids)
+        values[id(node)] = s.value()
+        derivs[id(node)] = [s.dvdx(x) for x in X]
+    return values, {id(x): {k: d[i] for k, d in derivs.items()} for i, x in enumerate(X)}
+
+
+def stacked(derivs : Dict, X : List, values : Dict) -> Dict:
+    "Combine each node's derivatives wrt every input in X from sweep_all() into one array"
+    return {k: np.hstack([derivs[id(x)][k] for x in X]) if len(X) > 0 else np.zeros(0) for k in values}
+
+
+def structural_keys(nodes : List) -> Dict[int, int]:
+    """
+    Map id(node) to an integer that is equal for structurally identical
+    subgraphs: same operators over the same Vars and constants. nodes
+    must be in postorder.
+    """
+    keys = {}
+    interned = {}
+    for node in nodes:
+        kids = node.children()
+        if node.isvar():
+            k = ('var', id(node))
+        elif len(kids) == 0:
+            k = ('const', np.asarray(node.x).tobytes())
+        else:
+            k = (node.__class__.__name__, getattr(node, 'n', None), tuple(keys[id(kid)] for kid in kids))
+        keys[id(node)] = interned.setdefault(k, len(interned))
+    return keys
+
+
+def hot_path(t, derivs : Dict) -> set:
+    "Return ids of nodes on the path from t following the largest derivative magnitude"
+    hot = set()
+    node = t
+    while node is not None:
+        hot.add(id(node))
+        kids = node.children()
+        node = max(kids, key=lambda kid: magnitude(derivs[id(kid)])) if len(kids) > 0 else None
+    return hot
+
+
+def chain(node, nparents : Dict) -> List:
+    """
+    Return node followed by the chain of nodes below it that each have a
+    single non-leaf operand not shared with any other parent.
+    """
+    path = [node]
+    while True:
+        kids = [kid for kid in path[-1].children() if not kid.isleaf()]
+        if len(kids) != 1 or nparents[id(kids[0])] != 1:
+            return path
+        path.append(kids[0])
+
+
+def collapsed_sizes(roots : List, drawn : Dict) -> List[int]:
+    """
+    Count the distinct undrawn nodes under each root, crediting a node shared
+    by several collapsed subtrees to the first root that reaches it.
+    """
+    seen = set(drawn) - {id(root) for root in roots}
+    sizes = []
+    for root in roots:
+        size = 0
+        work = [root]
+        while len(work) > 0:
+            node = work.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            size += 1
+            work += node.children()
+        sizes.append(size)
+    return sizes
+
+
+def opstr(t) -> str:
+    kids = t.children()
+    if t.isvar():
+        return t.varname if t.varname is not None else ""
+    if len(kids) == 0:
+        return ""
+    if len(kids) == 2:
+        return f"{sub('v',kids[0].vi)} {op_symbols.get(t.op, t.op)} {sub('v',kids[1].vi)}"
+    return f"{t.op}({', '.join(sub('v',kid.vi) for kid in kids)})"
+
+
+def nodeviz(t, value, deriv, deriv_name : str, hot : bool) -> str:
+    color = GREEN if t.isvar() else YELLOW
+    op = opstr(t)
+    eqn = f"{sub('v',t.vi)} = {op} = {brief(value)}" if op else f"{sub('v',t.vi)} = {brief(value)}"
+    label = f"""<table BORDER="0" CELLPADDING="0" CELLBORDER="0" CELLSPACING="1">
+    <tr><td align="left">{eqn}</td></tr>
+    <tr><td align="left">{deriv_name} = {brief(deriv)}</td></tr>
+    </table>"""
+    pen = f'penwidth="2", color="{RED}"' if hot else f'color="{DARK_GREY}"'
+    return f'v{t.vi} [{pen}, margin="0.02", fontcolor="{textcolor}", fontsize="{fontsize}" fontname="Times-Italic", style=filled, fillcolor="{color}", label=<{label}>];'
+
+
+def summaryviz(name : str, label : str) -> str:
+    return f'{name} [shape=box, style="filled,dashed", color="{DARK_GREY}", fillcolor="{BLUE}", fontsize="{fontsize}", fontname="Times-Italic", label=<{label}>];'
+
+
+def connviz(parent : str, kid : str, hot : bool = False, style : str = "solid") -> str:
+    if hot:
+        return f'{parent} -> {kid} [penwidth="2", color="{RED}", arrowsize=.5]'
+    return f'{parent} -> {kid} [penwidth="0.5", color="{DARK_GREY}", arrowsize=.4, style={style}]'
+
+
+def lodviz(t, values : Dict, derivs : Dict, deriv_name : str, budget : int = 150, max_chain : int = 4) -> graphviz.Source:
+    """
+    Return a graph of ast t with at most about budget drawn nodes. values
+    and derivs map id(node) to that node's value and derivative (adjoint
+    for backward mode, tangent for forward mode); deriv_name labels the
+    derivative. Chains longer than max_chain are elided.
+    """
+    set_var_indices(t, 1)
+    nodes = postorder(t)
+    keys = structural_keys(nodes)
+    nparents = defaultdict(int)
+    for node in nodes:
+        for kid in node.children():
+            nparents[id(kid)] += 1
+    hot = hot_path(t, derivs)
+
+    lines = []
+    edges = []
+    drawn = {}         # id(node) -> dot node name
+    first_by_key = {}  # structural key -> first node drawn with it
+    summaries = itertools.count()
+    order = itertools.count() # breaks heap ties so nodes are never compared
+
+    def priority(node):
+        return float('inf') if id(node) in hot else magnitude(derivs[id(node)])
+
+    work = [(-priority(t), next(order), t, None)]
+    while len(work) > 0 and len(lines) + len(work) < budget: # leave room to summarize the frontier
+        _, _, node, parent = heapq.heappop(work)
+        if id(node) in drawn: # shared node reached again
+            edges.append(connviz(parent, drawn[id(node)]))
+            continue
+        key = keys[id(node)]
+        if not node.isleaf() and key in first_by_key and id(node) not in hot:
+            name = f"s{next(summaries)}"
+            lines.append(summaryviz(name, f"same as v{first_by_key[key].vi}"))
+            edges.append(connviz(parent, name))
+            edges.append(connviz(name, f"v{first_by_key[key].vi}", style="dotted"))
+            drawn[id(node)] = name
+            continue
+        first_by_key.setdefault(key, node)
+        name = f"v{node.vi}"
+        lines.append(nodeviz(node, values[id(node)], derivs[id(node)], deriv_name, id(node) in hot))
+        drawn[id(node)] = name
+        if parent is not None:
+            edges.append(connviz(parent, name, id(node) in hot))
+
+        path = chain(node, nparents)
+        if len(path) > max_chain and not any(id(n) in hot for n in path[1:-1]):
+            elided = path[1:-1]
+            counts = defaultdict(int)
+            for n in elided:
+                counts[n.op] += 1
+            name_ = f"s{next(summaries)}"
+            ops = ", ".join(f"{op} &times;{k}" for op, k in counts.items())
+            lines.append(summaryviz(name_, f"&hellip; {len(elided)} ops ({ops})"))
+            edges.append(connviz(name, name_))
+            for n in elided:
+                drawn[id(n)] = name_
+            heapq.heappush(work, (-priority(path[-1]), next(order), path[-1], name_))
+            continue
+        for kid in node.children():
+            heapq.heappush(work, (-priority(kid), next(order), kid, name))
+
+    # Whatever didn't fit in the budget is collapsed into one node per subtree
+    collapsed = []
+    for _, _, node, parent in sorted(work, key=lambda w: w[:2]):
+        if id(node) in drawn:
+            edges.append(connviz(parent, drawn[id(node)]))
+            continue
+        name = f"s{next(summaries)}"
+        collapsed.append((node, name))
+        edges.append(connviz(parent, name, style="dashed"))
+        drawn[id(node)] = name
+    for (node, name), size in zip(collapsed, collapsed_sizes([node for node, _ in collapsed], drawn)):
+        lines.append(summaryviz(name, f"{size} nodes, max |{deriv_name}| = {round(magnitude(derivs[id(node)]))}"))
+
+    nltab = "\n\t"
+    s = f"""
+    digraph G {{
+        nodesep=.1;
+        ranksep=.3;
+        rankdir=RL;
+        node [penwidth="0.5", shape=box, width=.1, height=.1];
+        {nltab.join(lines)}
+        {nltab.join(edges)}
+    }}
+    """
+    return graphviz.Source(s)
@@ -0,0 +1,48 @@
+"""
+Per-example gradients in one pass. vmap() takes a forward_ast/backward_ast
+expression, the Vars that hold one example's data and the parameter Vars,
+and returns a function mapping a batch of examples (one row each) to every
+example's value and gradient wrt the parameters:
+
+    loss = (w * x + b - y) ** 2 ...            # one example's loss
+    f = vmap(loss, data=[x, y], params=[w, b])
+    values, dP = f(D)                          # D is B x 2, dP is B x 2
+
+The expression is flattened once into a flat.Graph and the whole batch goes
+through a single batched forward and reverse sweep, rather than one graph
+walk per example. Row i of dP is the gradient of example i's loss, which is
+what differential privacy clipping and influence functions need; its
+column sums are the gradient of the summed loss.
+"""
+
+from autodx.flat import *
+
+
+class VMap:
+    def __init__(self, t, data : List, params : List):
+        self.data = data
+        self.params = params
+        self.g = flatten(t, list(data) + list(params))
+
+    def __call__(self, D, P=None) -> (np.ndarray, np.ndarray):
+        """
+        Return (values, gradients) for each row of D: values has B entries and
+        gradients is B x len(params). D is B x len(data), or a vector when
+        there is one data Var. P gives parameter values, one row per example
+        or one row shared by all examples, and defaults to the params' current
+        values.
+        """
+        D = np.asarray(D, dtype=self.g.x.dtype)
+        if D.ndim == 1:
+            D = D.reshape(-1, 1)
+        B = len(D)
+        if P is None:
+            P = [p.x for p in self.params]
+        P = np.broadcast_to(np.asarray(P, dtype=self.g.x.dtype), (B, len(self.params)))
+        y = self.g.forward(np.hstack([D, P]))
+        return y, self.g.backward()[:, len(self.data):]
+
+
+def vmap(t, data : List, params : List) -> VMap:
+    "Return a function mapping a batch of data rows to per-example values and parameter gradients of t"
+    return VMap(t, data, params)
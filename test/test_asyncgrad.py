@@ -0,0 +1,68 @@
+import asyncio
+import gc
+import weakref
+
+import numpy as np
+
+import autodx.asyncgrad
+import autodx.backward_ast
+from test.test_flat import f5, backward_ast_eval
+from test.test_batch import graph
+
+
+def test_concurrent_requests_are_coalesced():
+    g = graph()
+    batches = []
+    forward = g.forward
+
+    def counting_forward(X=None):
+        batches.append(len(X))
+        return forward(X)
+
+    g.forward = counting_forward
+    np.random.seed(4)
+    X = np.random.uniform(0.5, 10, size=(40, 2))
+
+    async def main():
+        return await asyncio.gather(*[autodx.asyncgrad.value_and_grad(g, row) for row in X])
+
+    results = asyncio.run(main())
+    assert batches == [40]
+    for row, (y, dX) in zip(X, results):
+        expected_y, expected_dX = backward_ast_eval(row)
+        assert np.isclose(y, expected_y)
+        assert np.allclose(dX, expected_dX)
+
+
+def test_agrad_on_expression():
+    X_ = [autodx.backward_ast.Var(x) for x in [2.0, 5.0]]
+    y = f5(*X_, autodx.backward_ast.sin, autodx.backward_ast.ln)
+    order = [x for x in autodx.backward_ast.leaves(y) if x.isvar()]
+    dX = asyncio.run(autodx.asyncgrad.agrad(y, [x.x for x in order]))
+    expected = dict(zip([id(x) for x in X_], backward_ast_eval([2.0, 5.0])[1]))
+    assert np.allclose(dX, [expected[id(x)] for x in order])
+    assert autodx.asyncgrad.coalescer(y) is autodx.asyncgrad.coalescer(y)
+
+
+def test_bad_request_fails_alone():
+    g = graph()
+
+    async def main():
+        return await asyncio.gather(autodx.asyncgrad.value_and_grad(g, [2.0, 5.0]),
+                                    autodx.asyncgrad.value_and_grad(g, [2.0, 5.0, 1.0]),
+                                    autodx.asyncgrad.value_and_grad(g, [3.0, 4.0]),
+                                    return_exceptions=True)
+
+    good, bad, good2 = asyncio.run(asyncio.wait_for(main(), 5))
+    assert isinstance(bad, ValueError)
+    assert np.allclose(good[1], backward_ast_eval([2.0, 5.0])[1])
+    assert np.allclose(good2[1], backward_ast_eval([3.0, 4.0])[1])
+
+
+def test_cache_does_not_keep_graphs_alive():
+    g = graph()
+    asyncio.run(autodx.asyncgrad.agrad(g, [2.0, 5.0]))
+    ref = weakref.ref(g)
+    del g
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,14 @@
+import numpy as np
+
+import autodx.backward_ast
+
+
+def test_backward_ast_same_operand_twice():
+    # found by fuzzing: x - x and x / x visited x twice with the left operand's partial
+    x1, x2 = autodx.backward_ast.Var(0.5), autodx.backward_ast.Var(1.5)
+    for y, expected in [((x2 - x2) * x1, [0, 0]), (x2 / x2 + x1, [1, 0]),
+                        (x2 * x2, [0, 3.0]), (x2 + x2, [0, 2]), (x2 ** x2, [0, 1.5**1.5 * (np.log(1.5) + 1)])]:
+        x1.dydv = x2.dydv = 0
+        y.forward()
+        y.backward()
+        assert np.allclose([x1.dydv, x2.dydv], expected)
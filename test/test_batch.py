@@ -0,0 +1,33 @@
+import pickle
+
+import numpy as np
+
+import autodx.backward_ast
+import autodx.batch
+import autodx.flat
+from test.test_flat import f5, backward_ast_eval
+
+
+def graph():
+    X_ = [autodx.backward_ast.Var(x) for x in [1.0, 1.0]]
+    return autodx.flat.flatten(f5(*X_, autodx.backward_ast.sin, autodx.backward_ast.ln), X_)
+
+
+def test_pickle_is_compact():
+    g = graph()
+    g.gradient([2.0, 5.0])
+    g2 = pickle.loads(pickle.dumps(g))
+    assert g2.v is None
+    assert np.allclose(g2.gradient([2.0, 5.0]), g.backward())
+
+
+def test_gradients():
+    np.random.seed(3)
+    X = np.random.uniform(0.5, 10, size=(50, 2))
+    for workers in [1, 2]:
+        y, dX = autodx.batch.gradients(graph(), X, workers=workers, chunksize=16)
+        assert y.shape == (50,) and dX.shape == (50, 2)
+        for row, yi, di in zip(X, y, dX):
+            expected_y, expected_dX = backward_ast_eval(row)
+            assert np.isclose(yi, expected_y)
+            assert np.allclose(di, expected_dX)
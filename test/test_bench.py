@@ -0,0 +1,26 @@
+import numpy as np
+
+import autodx.bench
+
+tiny = {'chain': [3], 'wide': [3], 'shared': [3], 'inputs': [4], 'vectors': [10]}
+
+
+def test_engines_agree_on_families():
+    for family in ['chain', 'wide', 'shared', 'inputs']:
+        fn, X = autodx.bench.families[family][0](5)
+        expected = autodx.bench.backward_ast(fn, X)()
+        for engine in ['forward', 'forward_ast', 'finite_diff']:
+            dX = autodx.bench.engines[engine](fn, X)()
+            assert np.allclose(dX, expected, rtol=1e-4), (family, engine)
+
+
+def test_bench_save_and_compare(tmp_path):
+    results = autodx.bench.bench(sizes=tiny, repeat=1)
+    assert {r['engine'] for r in results} == set(autodx.bench.engines)
+    assert all('error' in r or r['seconds'] > 0 for r in results)
+    filename = str(tmp_path / "baseline.json")
+    autodx.bench.save(results, filename)
+    baseline = autodx.bench.load(filename)
+    assert autodx.bench.compare(baseline, baseline) == []
+    slower = [dict(r, seconds=r['seconds'] * 10) for r in baseline if 'error' not in r]
+    assert len(autodx.bench.compare(slower, baseline)) == len(slower)
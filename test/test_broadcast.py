@@ -0,0 +1,34 @@
+import numpy as np
+
+from autodx.forward_vec_ast import *
+
+
+def test_all_binary_ops_broadcast_scalars():
+    a, k = Var(np.array([1.0, 3.0, 5.0])), Var(9.0)
+    cases = [(sum(a + k), [1, 1, 1], 3),
+             (sum(a - k), [1, 1, 1], -3),
+             (sum(k - a), [-1, -1, -1], 3),
+             (sum(a * k), [9, 9, 9], 9),
+             (sum(a / k), [1/9] * 3, -9/81),
+             (sum(k * a * a), [18, 54, 90], 35),
+             (sum(a ** k / 1e6), 9 * np.array([1, 3**8, 5**8]) / 1e6, np.sum(np.array([1, 3, 5])**9 * np.log([1, 3, 5])) / 1e6)]
+    for y, da, dk in cases:
+        dX = y.gradient([a, k])
+        assert np.allclose(dX[0], da)
+        assert np.allclose(dX[1], dk)
+
+
+def test_expand_is_a_view():
+    k = Var(2.5)
+    e = Expand(k, 1_000_000)
+    v = e.value()
+    assert v.shape == (1_000_000,) and v.strides == (0,)
+    assert np.shares_memory(v, k.x)
+
+
+def test_operators_on_operator_nodes():
+    a, b = Var(np.array([0.5, 1.5])), Var(np.array([2.0, 3.0]))
+    y = sum(sin(a) * b + ln(b) - a / b)
+    dX = y.gradient([a, b])
+    assert np.allclose(dX[0], np.cos([0.5, 1.5]) * [2.0, 3.0] - 1 / np.array([2.0, 3.0]))
+    assert np.allclose(dX[1], np.sin([0.5, 1.5]) + 1 / np.array([2.0, 3.0]) + np.array([0.5, 1.5]) / np.array([2.0, 3.0])**2)
@@ -0,0 +1,56 @@
+import numpy as np
+
+import autodx.forward_vec_ast as vec
+from autodx import flat, memplan
+from autodx.backward_ast import Var as BVar, sin as bsin
+
+
+def f(a, b):
+    return vec.sum(vec.sin(a * b) + vec.ln(b) * 2.0)
+
+
+def test_default_is_float64():
+    a = vec.Var([1, 2, 3])
+    assert a.x.dtype == np.float64
+    assert a.dvdx(a).dtype == np.float64
+
+
+def test_float32_values_and_derivatives_stay_float32():
+    x = np.array([0.5, 1.0, 1.5])
+    with vec.precision(np.float32):
+        a, b = vec.Var(x), vec.Var(x + 1)
+        y = f(a, b)
+    assert vec.dtype is np.float64 # policy restored after the block
+    assert y.value().dtype == np.float32
+    for d in y.gradient([a, b]):
+        assert d.dtype == np.float32
+    a64, b64 = vec.Var(x), vec.Var(x + 1)
+    y64 = f(a64, b64)
+    assert np.allclose(y.value(), y64.value(), rtol=1e-6)
+    assert np.allclose(y.dvdx(a), y64.dvdx(a64), rtol=1e-6)
+
+
+def test_float16_storage_computes_in_float32():
+    x = np.linspace(0.5, 2.0, 100)
+    with vec.precision(np.float32, np.float16):
+        a = vec.Var(x)
+        y = vec.sum(a * a)
+    assert a.x.dtype == np.float16
+    assert a.value().dtype == np.float32
+    assert y.value().dtype == np.float32
+    assert np.allclose(y.dvdx(a), 2 * x, rtol=1e-3)
+    assert memplan.value(y).dtype == np.float32
+
+
+def test_per_leaf_dtype():
+    a = vec.Var([1.0, 2.0], dt=np.float32)
+    assert (a * a).value().dtype == np.float32
+
+
+def test_flatten_float32():
+    x1, x2 = BVar(0.5), BVar(1.5)
+    y = bsin(x1 * x2) + x1
+    g = flat.flatten(y, [x1, x2], dtype=np.float32)
+    dX = g.gradient(np.array([[0.5, 1.5], [1.0, 2.0]]))
+    assert dX.dtype == np.float32
+    assert np.allclose(dX[0], [1.5 * np.cos(0.75) + 1, 0.5 * np.cos(0.75)], rtol=1e-6)
@@ -0,0 +1,95 @@
+import numpy as np
+
+import autodx.backward_ast
+import autodx.flat
+import autodx.forward
+import autodx.forward_ast
+import autodx.forward_vec_ast
+
+
+def f(x1, x2, m):
+    return m.exp(x1) * m.cos(x2) + m.tanh(x1 * x2) + m.sqrt(x2) / m.log1p(x1) + \
+           abs(x1 - x2) + m.maximum(x1, x2 * 0.5) + x1 ** 3 + x2 ** x1
+
+
+def numerical_gradient(X, h=1e-6):
+    dX = []
+    for i in range(len(X)):
+        up, down = list(X), list(X)
+        up[i] += h
+        down[i] -= h
+        dX.append((f(*up, np) - f(*down, np)) / (2 * h))
+    return dX
+
+
+points = [[0.7, 1.9], [2.5, 1.2], [1.3, 0.4]]
+
+
+def test_forward():
+    for X in points:
+        dX = autodx.forward.gradient(lambda *a: f(*a, autodx.forward), X)
+        assert np.allclose(dX, numerical_gradient(X), rtol=1e-5)
+
+
+def test_forward_ast():
+    m = autodx.forward_ast
+    for X in points:
+        X_ = [m.Var(x) for x in X]
+        y = f(*X_, m)
+        assert np.isclose(y.value(), f(*X, np))
+        assert np.allclose(y.gradient(X_), numerical_gradient(X), rtol=1e-5)
+
+
+def test_backward_ast_and_flat():
+    m = autodx.backward_ast
+    for X in points:
+        X_ = [m.Var(x) for x in X]
+        y = f(*X_, m)
+        assert np.isclose(y.forward(), f(*X, np))
+        y.backward()
+        assert np.allclose([x.dydv for x in X_], numerical_gradient(X), rtol=1e-5)
+        g = autodx.flat.flatten(y, X_)
+        assert np.allclose(g.gradient(), numerical_gradient(X), rtol=1e-5)
+
+
+def test_forward_vec_ast():
+    m = autodx.forward_vec_ast
+    a, b = np.array([0.5, -1.5, 2.0]), np.array([1.0, 0.25, 3.0])
+    A, B = m.Var(a), m.Var(b)
+    cases = [(m.Exp(A), A, np.exp(a)), (m.Cos(A), A, -np.sin(a)), (m.Tanh(A), A, 1 - np.tanh(a)**2),
+             (m.Sqrt(B), B, 0.5 / np.sqrt(b)), (m.Log1p(B), B, 1 / (1 + b)), (abs(A), A, np.sign(a)),
+             (A ** 2, A, 2 * a), (m.maximum(A, B), A, a >= b), (m.maximum(A, B), B, a < b)]
+    for y, wrt, expected in cases:
+        assert np.allclose(y.dvdx(wrt), expected)
+    y = B ** A
+    assert np.allclose(y.value(), b ** a)
+    assert np.allclose(y.dvdx(A), b ** a * np.log(b))
+    assert np.allclose(y.dvdx(B), a * b ** (a - 1))
+
+
+def test_hessian_of_new_functions():
+    m = autodx.forward
+    X = [0.7, 1.9]
+    H = m.hessian(lambda x1, x2: m.exp(x1) * m.tanh(x2) + m.sqrt(x1 * x2) + x1 ** x2, X)
+    h = 1e-5
+    g = lambda X: np.array(m.gradient(lambda x1, x2: m.exp(x1) * m.tanh(x2) + m.sqrt(x1 * x2) + x1 ** x2, X))
+    for i in range(2):
+        up = list(X)
+        up[i] += h
+        assert np.allclose(H[i], (g(up) - g(X)) / h, atol=1e-3)
+
+
+def test_viz():
+    import autodx.viz.backward
+    import autodx.viz.forward
+    m = autodx.viz.forward
+    X_ = [m.Var(x) for x in points[0]]
+    assert "max(" in m.astviz(f(*X_, m), X_).source
+    m = autodx.viz.backward
+    X_ = [m.Var(x) for x in points[0]]
+    y = f(*X_, m)
+    y.forward()
+    y.backward()
+    g = m.astviz(y).source
+    assert "sign(" in g
+    assert "&lt; " in g # max's partial wrt its larger right operand: [left < right]
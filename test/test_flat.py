@@ -0,0 +1,71 @@
+import numpy as np
+
+import autodx.backward_ast
+import autodx.forward_ast
+import autodx.flat
+
+
+def f5(x1, x2, sin, ln): return ln(x1) + x1 * x2 - sin(x2)
+
+
+def backward_ast_eval(X):
+    X_ = [autodx.backward_ast.Var(x) for x in X]
+    ast = f5(*X_, autodx.backward_ast.sin, autodx.backward_ast.ln)
+    y = ast.forward()
+    ast.backward()
+    return y, [x.dydv for x in X_]
+
+
+def test_matches_backward_ast():
+    for X in [[2.0, 5.0], [0.5, 3.0], [40.0, -1.25]]:
+        X_ = [autodx.backward_ast.Var(x) for x in X]
+        g = autodx.flat.flatten(f5(*X_, autodx.backward_ast.sin, autodx.backward_ast.ln), X_)
+        y, dX = backward_ast_eval(X)
+        assert np.isclose(g.forward(), y)
+        assert np.allclose(g.backward(), dX)
+
+
+def test_matches_forward_ast():
+    X_ = [autodx.forward_ast.Var(x) for x in [3.0, 7.0]]
+    ast = f5(*X_, autodx.forward_ast.sin, autodx.forward_ast.ln)
+    g = autodx.flat.flatten(ast, X_)
+    assert np.isclose(g.forward(), ast.value())
+    assert np.allclose(g.backward(), ast.gradient(X_))
+
+
+def test_shared_subexpressions():
+    x = autodx.forward_ast.Var(1.5)
+    u = x * x
+    y = u * u + u / x  # x^4 + x
+    g = autodx.flat.flatten(y, [x])
+    assert len(g) == 5  # x, u, u*u, u/x, +
+    assert np.isclose(g.forward(), 1.5**4 + 1.5)
+    assert np.allclose(g.backward(), [4 * 1.5**3 + 1])
+
+
+def test_wide_sum_of_products():
+    n = 300
+    X_ = [autodx.forward_ast.Var(float(i + 1)) for i in range(2 * n)]
+    y = X_[0] * X_[1]
+    for i in range(1, n):
+        y = y + X_[2 * i] * X_[2 * i + 1]
+    g = autodx.flat.flatten(y, X_)
+    # all the Muls land in one group, computed with a single NumPy call
+    assert g.schedule[0][0] == autodx.flat.MUL and len(g.schedule[0][1]) == n
+    X = np.array([x.x for x in X_])
+    assert np.isclose(g.forward(), np.sum(X[0::2] * X[1::2]))
+    expected = np.empty(2 * n)
+    expected[0::2], expected[1::2] = X[1::2], X[0::2]
+    assert np.allclose(g.backward(), expected)
+
+
+def test_batch():
+    X_ = [autodx.backward_ast.Var(x) for x in [1.0, 1.0]]
+    g = autodx.flat.flatten(f5(*X_, autodx.backward_ast.sin, autodx.backward_ast.ln), X_)
+    batch = np.array([[2.0, 5.0], [0.5, 3.0], [4.0, 1.0]])
+    dX = g.gradient(batch)
+    assert dX.shape == (3, 2)
+    for X, d in zip(batch, dX):
+        y, expected = backward_ast_eval(X)
+        assert np.allclose(d, expected)
+    assert np.allclose(g.forward(batch), [backward_ast_eval(X)[0] for X in batch])
@@ -0,0 +1,66 @@
+import numpy as np
+
+from autodx.forward_vec_ast import *
+
+
+def numerical_gradient(f, a, h=1e-6):
+    g = np.zeros_like(a)
+    for i in range(len(a)):
+        up, down = a.copy(), a.copy()
+        up[i] += h
+        down[i] -= h
+        g[i] = (f(up) - f(down)) / (2 * h)
+    return g
+
+
+def test_sigmoid():
+    a = np.array([-800.0, -2.0, 0.0, 3.0, 800.0])
+    A = Var(a)
+    y = sigmoid(A)
+    with np.errstate(over='ignore'):
+        assert np.allclose(y.value(), 1 / (1 + np.exp(-a)))
+    assert np.all(np.isfinite(y.dvdx(A)))
+    b = np.array([-2.0, 0.5, 3.0])
+    B = Var(b)
+    s = 1 / (1 + np.exp(-b))
+    assert np.allclose(VecSum(sigmoid(B)).dvdx(B), s * (1 - s))
+
+
+def test_logsumexp_is_stable():
+    a = np.array([1000.0, 1001.0, 999.0])
+    A = Var(a)
+    y = logsumexp(A)
+    assert np.isclose(y.value(), 1000 + np.log(np.exp(0) + np.exp(1) + np.exp(-1)))
+    assert np.allclose(y.dvdx(A), np.exp(a - 1001) / np.sum(np.exp(a - 1001)))
+    b = np.array([0.3, -1.2, 2.0])
+    assert np.allclose(logsumexp(Var(b)).dvdx(Var(b)), 0)  # different Var
+    B = Var(b)
+    assert np.allclose(logsumexp(B).dvdx(B), numerical_gradient(lambda v: np.log(np.sum(np.exp(v))), b))
+
+
+def test_softmax_xent():
+    z = np.array([2.0, -1.0, 0.5, 4.0])
+    y = np.array([0.0, 0.0, 1.0, 0.0])
+    Z = Var(z)
+    loss = softmax_xent(Z, y)
+    xent = lambda v: -np.sum(y * (v - np.log(np.sum(np.exp(v)))))
+    assert np.isclose(loss.value(), xent(z))
+    assert np.allclose(loss.dvdx(Z), numerical_gradient(xent, z))
+    Y = Var(np.array([0.1, 0.2, 0.3, 0.4]))
+    loss = softmax_xent(Z, Y)
+    xent_y = lambda v: -np.sum(v * (z - np.log(np.sum(np.exp(z)))))
+    assert np.allclose(loss.dvdx(Y), numerical_gradient(xent_y, Y.x))
+    assert np.isfinite(softmax_xent(Var(z * 1000), y).value())
+
+
+def test_affine():
+    w, x = np.array([1.0, -2.0, 3.0]), np.array([0.5, 0.25, 2.0])
+    W, X, b = Var(w), Var(x), Var(0.75)
+    y = affine(W, X, b)
+    assert np.isclose(y.value(), np.dot(w, x) + 0.75)
+    assert np.allclose(y.dvdx(W), x)
+    assert np.allclose(y.dvdx(X), w)
+    assert np.allclose(y.dvdx(b), 1)
+    logistic = sigmoid(affine(W, X, 0.0))
+    s = 1 / (1 + np.exp(-np.dot(w, x)))
+    assert np.allclose(logistic.dvdx(W), s * (1 - s) * x)
@@ -0,0 +1,45 @@
+import pytest
+
+from autodx.fuzz import *
+
+
+def test_dag_limits():
+    for seed in range(20):
+        r = random_dag(3, 50, depth=6, fanout=2, seed=seed)
+        depths, uses = [0] * 3, [0] * 3
+        for op, operands in r.ops:
+            assert op in RULES
+            for i in operands:
+                uses[i] += 1
+            depths.append(1 + max(depths[i] for i in operands))
+            uses.append(0)
+        joins = [op for op, _ in r.ops].count('add')
+        assert max(depths) <= 6 + joins
+
+
+def test_op_mix():
+    r = random_dag(2, 40, ops={'mul': 1, 'sin': 1}, seed=1)
+    assert {op for op, _ in r.ops} <= {'mul', 'sin', 'add'}
+
+
+def test_engines_agree_with_reference():
+    results = run([15], seeds=4, ninputs=3, repeat=1)
+    assert len(results) == 4 * len(autodx.bench.engines)
+    assert all('error' not in r and r['seconds'] > 0 for r in results)
+    assert mismatches(results) == []
+    assert 'max error' in report(results)
+
+
+def test_reference_rejects_maximum():
+    r = random_dag(2, 10, ops={'maximum': 1}, seed=0)
+    with pytest.raises(ValueError):
+        reference(r, [0.5, 1.5])
+    with pytest.raises(ValueError):
+        run([10], seeds=1, ninputs=2, repeat=1, ops={'maximum': 1})
+
+
+def test_main(tmp_path):
+    baseline = str(tmp_path / "base.json")
+    assert main(['--sizes', '5', '--seeds', '1', '--repeat', '1', '--save', baseline]) == 0
+    assert main(['--sizes', '5', '--seeds', '1', '--repeat', '1', '--engines', 'backward_ast',
+                 '--compare', baseline, '--tolerance', '1000']) == 0
@@ -0,0 +1,71 @@
+import numpy as np
+
+import autodx.finite_diff
+from autodx.gradcheck import check_grad, random_inputs, relative_error
+
+
+def f(x1, x2, sin, ln):
+    return ln(x1) + x1 * x2 - sin(x2) / x1
+
+
+def test_central_and_complex_step():
+    g = lambda x1, x2: np.log(x1) + x1 * x2 - np.sin(x2) / x1
+    expected = [1/2 + 5 + np.sin(5)/4, 2 - np.cos(5)/2]
+    assert np.allclose(autodx.finite_diff.central(g, 1e-6, [2.0, 5.0]), expected, rtol=1e-8)
+    assert np.allclose(autodx.finite_diff.complex_step(g, 1e-20, [2.0+0j, 5.0+0j]), expected, rtol=1e-14)
+    X = np.array([2.0, 5.0])
+    autodx.finite_diff.central(g, 1e-6, X)
+    autodx.finite_diff.complex_step(g, 1e-20, X)
+    assert np.array_equal(X, [2.0, 5.0]) and X.dtype == np.float64 # caller's X untouched
+
+
+def test_engines_pass():
+    X = random_inputs(2, 40)
+    for engine in ['forward', 'forward_ast', 'backward_ast', 'forward_vec_ast']:
+        report = check_grad(engine, f, X, workers=1, chunksize=16)
+        assert report.errors.shape == (40, 2)
+        assert report.ok(1e-12), str(report)
+    assert check_grad('backward_ast', f, X, method='central', workers=1).ok(1e-6)
+
+
+def test_parallel_matches_serial():
+    X = random_inputs(2, 20, seed=1)
+    serial = check_grad('forward_ast', f, X, workers=1, chunksize=5)
+    parallel = check_grad('forward_ast', f, X, workers=2, chunksize=5)
+    assert np.allclose(serial.errors, parallel.errors)
+
+
+def test_detects_inaccurate_engine():
+    X = random_inputs(2, 10)
+    report = check_grad('finite_diff', f, X, method='central', workers=1)
+    assert not report.ok(1e-9) # forward differences aren't that accurate
+    assert report.worst.shape == (2,)
+    assert "x2: max rel error" in str(report)
+
+
+def test_relative_error_floor():
+    assert relative_error(1e-12, 0.0) < 1e-11
+    assert np.isclose(relative_error(110.0, 100.0), 10/110)
+
+
+def smooth(x1, x2, m):
+    return m.exp(x1) * m.cos(x2) + m.tanh(x1 * x2) + m.sqrt(x2) / m.log1p(x1) + x2 ** x1
+
+
+def kinked(x1, x2, m):
+    return abs(x1 - x2) + m.maximum(x1, x2 * 0.5)
+
+
+def fused(x1, x2, m):
+    return m.sigmoid(x1 * x2) + m.sigmoid(x1)
+
+
+def test_new_op_rules():
+    X = random_inputs(2, 20)
+    for engine in ['forward', 'forward_ast', 'backward_ast', 'forward_vec_ast']:
+        report = check_grad(engine, smooth, X, workers=1, ops=True)
+        assert report.ok(1e-12), str(report)
+        report = check_grad(engine, kinked, X, method='central', workers=1, ops=True)
+        assert report.ok(1e-6), str(report)
+    assert check_grad('forward_vec_ast', fused, X, workers=1, ops=True).ok(1e-12)
+    assert check_grad('forward_ast', smooth, X, workers=2, chunksize=5, ops=True).ok(1e-12)
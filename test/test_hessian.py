@@ -0,0 +1,31 @@
+import numpy as np
+
+from autodx.forward import *
+
+
+def f(x1, x2): return ln(x1) + x1 * x2 - sin(x2) / x1
+
+
+def test_hessian_closed_form():
+    x1, x2 = 2.0, 5.0
+    H = hessian(f, [x1, x2])
+    expected = [[-1/x1**2 - 2*np.sin(x2)/x1**3, 1 + np.cos(x2)/x1**2],
+                [1 + np.cos(x2)/x1**2,          np.sin(x2)/x1]]
+    assert np.allclose(H, expected)
+    assert np.allclose(H, H.T)
+
+
+def test_hessian_matches_gradient_differences():
+    def g(x1, x2, x3): return x1 * x1 * x3 / (x2 + 2) - 3 / x3 + sin(x1 * x2)
+    X = [0.7, 1.3, 2.1]
+    H = hessian(g, X)
+    h = 1e-6
+    for i in range(3):
+        Xh = list(X)
+        Xh[i] += h
+        row = (np.array(gradient(g, Xh)) - np.array(gradient(g, X))) / h
+        assert np.allclose(H[i], row, atol=1e-4)
+
+
+def test_hessian_of_linear():
+    assert np.allclose(hessian(lambda x1, x2: 3 * x1 - x2 + 1, [1.0, 2.0]), np.zeros((2, 2)))
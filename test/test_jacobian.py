@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from autodx.forward_vec_ast import *
+from autodx.jacobian import jacobian, blocks, choose
+
+
+def numeric(f, X, h=1e-6):
+    "Central-difference Jacobian of f(*arrays) wrt the concatenated arrays"
+    X = [np.array(x, dtype=float).reshape(-1) for x in X]
+    cols = []
+    for j, x in enumerate(X):
+        for e in range(len(x)):
+            up = [x.copy() for x in X]
+            down = [x.copy() for x in X]
+            up[j][e] += h
+            down[j][e] -= h
+            cols.append((np.atleast_1d(f(*up)) - np.atleast_1d(f(*down))) / (2 * h))
+    return np.array(cols).T
+
+
+def expr(a, b, k):
+    "A vector output mixing elementwise ops, broadcast scalars and reductions"
+    return sin(a * b) * k + a * sum(b * b) + logsumexp(a) - dot(a, b) / k
+
+
+def npexpr(a, b, k):
+    lse = np.log(np.sum(np.exp(a)))
+    return np.sin(a * b) * k + a * np.sum(b * b) + lse - np.dot(a, b) / k
+
+
+def test_forward_and_reverse_match_numeric():
+    a0, b0, k0 = np.array([0.5, 1.0, 1.5]), np.array([2.0, -1.0, 0.3]), 1.7
+    a, b, k = Var(a0), Var(b0), Var(k0)
+    y = expr(a, b, k)
+    expected = numeric(lambda a, b, k: npexpr(a, b, k[0]), [a0, b0, [k0]])
+    for mode in ['forward', 'reverse']:
+        for block in [None, 1, 2]:
+            J = jacobian(y, [a, b, k], block=block, mode=mode)
+            assert J.shape == (3, 7)
+            assert np.allclose(J, expected, atol=1e-6)
+
+
+def test_scalar_output_is_gradient_row():
+    a, b = Var(np.array([0.5, 1.0])), Var(np.array([2.0, 3.0]))
+    y = sum(sin(a) * b) + softmax_xent(a, np.array([0.25, 0.75]))
+    J = jacobian(y, [a, b])
+    assert J.shape == (1, 4)
+    assert np.allclose(J[0], np.hstack(y.gradient([a, b])))
+    assert choose(1, 4) == 'reverse'
+
+
+def test_shared_operand():
+    a = Var(np.array([1.0, 2.0, 3.0]))
+    J = jacobian(a * a, [a])
+    assert np.allclose(J, np.diag([2.0, 4.0, 6.0]))
+
+
+def test_blocks_fill_memmap(tmp_path):
+    n = 40
+    a = Var(np.linspace(0.1, 1, n))
+    y = a * sum(a)
+    out = np.lib.format.open_memmap(tmp_path / "J.npy", mode='w+', shape=(n, n))
+    jacobian(y, [a], block=7, out=out)
+    assert np.allclose(out, np.diag(np.full(n, np.sum(a.x))) + a.x[:, np.newaxis])
+    assert len(list(blocks(y, [a], block=7, mode='reverse'))) == 6
+
+
+def test_bad_mode():
+    a = Var(np.array([1.0, 2.0]))
+    with pytest.raises(ValueError):
+        jacobian(a * a, [a], mode='sideways')
@@ -0,0 +1,75 @@
+import re
+
+import numpy as np
+
+import autodx.backward_ast
+import autodx.forward_ast
+import autodx.viz.backward
+import autodx.viz.forward
+
+
+def drawn(g):
+    "Return names of nodes drawn in full and of summary nodes"
+    full = re.findall(r'^\s*(v\d+) \[', g.source, re.M)
+    summaries = re.findall(r'^\s*(s\d+) \[', g.source, re.M)
+    return full, summaries
+
+
+def big_backward_ast():
+    bk = autodx.backward_ast
+    X = [bk.Var(float(i % 7 + 1)) for i in range(400)]
+    terms = [bk.sin(X[i]) * X[i + 1] for i in range(0, 400, 2)]
+    y = terms[0]
+    for term in terms[1:]:
+        y = y + term
+    y = y * 1000 * X[0]  # heavy weight on x0 so hot path goes through it
+    c = X[1]
+    for i in range(20):  # a deep chain
+        c = bk.sin(c)
+    y = y + c
+    y.forward()
+    y.backward()
+    return y, X
+
+
+def test_backward_budget():
+    y, X = big_backward_ast()
+    g = autodx.viz.backward.astviz(y, budget=60)
+    full, summaries = drawn(g)
+    assert len(full) + len(summaries) <= 60 + 5
+    assert len(summaries) > 0
+    assert f"v{X[0].vi}" in full  # hot path is drawn in full
+    assert 'penwidth="2", color="#D62728"' in g.source
+
+
+def test_chain_is_elided():
+    bk = autodx.backward_ast
+    x = bk.Var(0.5)
+    c = x
+    for i in range(30):
+        c = bk.sin(c)
+    y = c * 2
+    y.forward()
+    y.backward()
+    g = autodx.viz.backward.astviz(y, budget=1000)
+    full, summaries = drawn(g)
+    # hot path runs down the chain so nothing is elided
+    assert len(full) == 33
+    z = bk.Var(3.0)
+    y = z * 100 + c
+    y.forward()
+    y.backward()
+    g = autodx.viz.backward.astviz(y, budget=1000)
+    full, summaries = drawn(g)
+    assert len(full) < 10
+    assert "&hellip; 28 ops (sin &times;28)" in g.source
+
+
+def test_repeated_subgraphs_collapse():
+    fw = autodx.forward_ast
+    x1, x2 = fw.Var(1.5), fw.Var(2.0)
+    y = fw.sin(x1 * x2) + fw.sin(x1 * x2)  # same structure, distinct nodes
+    g = autodx.viz.forward.astviz(y, x1, budget=100)
+    assert "same as" in g.source
+    full, summaries = drawn(g)
+    assert len(summaries) == 1
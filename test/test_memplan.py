@@ -0,0 +1,59 @@
+import tracemalloc
+
+import numpy as np
+
+from autodx.forward_vec_ast import *
+from autodx.memplan import Plan
+import autodx.memplan
+
+
+def chain(a, b, n):
+    y = Mul(a, b)
+    for i in range(n):
+        y = Add(Sin(y), Mul(y, b))
+    return VecSum(Exp(Div(y, Add(b, Const(10.0)))))
+
+
+def test_matches_value_and_reuses_buffers():
+    rng = np.random.RandomState(1)
+    a, b = Var(rng.uniform(0, 1, 1000)), Var(rng.uniform(0, 1, 1000))
+    y = chain(a, b, 8)
+    plan = Plan(y)
+    assert np.isclose(plan.evaluate(), y.value())
+    ops = [node for node in postorder(y) if not node.isleaf()]
+    assert len(plan.buffers) <= 4 < len(ops)
+    a.x[:] = rng.uniform(0, 1, 1000)  # update input in place and re-evaluate
+    assert np.isclose(plan.evaluate(), y.value())
+    assert np.isclose(autodx.memplan.value(y), y.value())
+
+
+def test_repeated_evaluation_does_not_allocate():
+    a, b = Var(np.linspace(0.1, 1, 200_000)), Var(np.linspace(1, 2, 200_000))
+    plan = Plan(chain(a, b, 5))
+    plan.evaluate()
+    tracemalloc.start()
+    try:
+        plan.evaluate()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < a.x.nbytes / 10
+
+
+def test_fallback_and_shape_change():
+    a = Var(np.array([1.0, 2.0, 3.0]))
+    w = Var(np.array([0.5, -1.0, 2.0]))
+    y = Expand(sigmoid(dot(a, w)), 3)
+    plan = Plan(y)
+    assert np.allclose(plan.evaluate(), y.value())
+    a.x = np.array([1.0, 2.0])  # new shape means a new plan
+    w.x = np.array([3.0, 1.0])
+    assert np.allclose(plan.evaluate(), y.value())
+
+
+def test_buffer_outlives_expand_view():
+    # sum(a) is expanded to a view of its buffer; the next sum must not reuse it
+    a, b = Var(np.array([1.0, 2.0, 3.0])), Var(np.array([4.0, 5.0, 6.0]))
+    y = sum(sum(a) * (b * sum(b)))
+    assert np.isclose(autodx.memplan.value(y), y.value())
+    assert np.isclose(y.value(), 1350.0)
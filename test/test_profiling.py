@@ -0,0 +1,43 @@
+import numpy as np
+
+import autodx.backward_ast
+import autodx.forward_ast
+import autodx.forward_vec_ast
+from autodx.profiling import profiled
+from test.test_flat import f5
+
+
+def test_counts_and_repeats():
+    m = autodx.forward_ast
+    x = m.Var(1.5)
+    u = m.sin(x)
+    y = u * u  # u is visited twice per sweep
+    with profiled() as p:
+        y.dvdx(x)
+    sin = p.stats[('forward_ast', 'Sin', 'dvdx')]
+    assert sin.calls == 2 and sin.nodes == 1 and sin.repeats == 1
+    assert p.stats[('forward_ast', 'Mul', 'dvdx')].calls == 1
+    assert p.redundant()[0][0][1] in {'Sin', 'Var'}
+    assert 'forward_ast.Sin.dvdx' in p.report()
+
+
+def test_disabled_restores_methods():
+    original = autodx.backward_ast.Mul.forward
+    with profiled() as p:
+        X_ = [autodx.backward_ast.Var(x) for x in [2.0, 5.0]]
+        y = f5(*X_, autodx.backward_ast.sin, autodx.backward_ast.ln)
+        y.forward()
+        y.backward()
+    assert autodx.backward_ast.Mul.forward is original
+    assert p.stats[('backward_ast', 'Mul', 'backward_')].calls == 1
+    n = sum(s.calls for s in p.stats.values())
+    y.forward()
+    assert sum(s.calls for s in p.stats.values()) == n
+
+
+def test_array_bytes():
+    m = autodx.forward_vec_ast
+    a = m.Var(np.ones(100))
+    with profiled([m]) as p:
+        m.Sin(a).value()
+    assert p.stats[('forward_vec_ast', 'Sin', 'value')].bytes == 800
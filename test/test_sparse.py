@@ -0,0 +1,55 @@
+import numpy as np
+
+from autodx.forward_vec_ast import *
+from autodx.sparse import SparseVec
+
+
+def vectors(n=50, seed=0):
+    rng = np.random.RandomState(seed)
+    dense = np.zeros(n)
+    dense[rng.choice(n, 5, replace=False)] = rng.uniform(0.5, 2.0, 5)
+    return dense, rng.uniform(0.5, 2.0, n)
+
+
+def test_sparse_ops_match_dense():
+    x, w = vectors()
+    s = SparseVec.fromdense(x)
+    t = SparseVec.fromdense(vectors(seed=1)[0])
+    for result, expected in [(s * w, x * w), (w * s, w * x), (s * 3.0, x * 3), (s / w, x / w),
+                             (s + t, x + t.todense()), (s - t, x - t.todense()), (s * t, x * t.todense()),
+                             (np.sin(s), np.sin(x)), (-s, -x)]:
+        assert isinstance(result, SparseVec)
+        assert np.allclose(result.todense(), expected)
+    assert np.allclose(s + w, x + w) and not isinstance(s + w, SparseVec)
+    assert np.allclose(np.cos(s), np.cos(x))
+    assert np.isclose(np.dot(s, w), np.dot(x, w))
+    assert np.isclose(np.dot(w, s), np.dot(x, w))
+    assert np.isclose(np.sum(s), np.sum(x))
+
+
+def test_gradient_wrt_dense_weights_stays_sparse():
+    x, w0 = vectors()
+    fx, w = Var(SparseVec.fromdense(x)), Var(w0)
+    y = sigmoid(dot(w, fx)) + sum(sin(fx * w) + fx * fx)
+    dx_dense, w_dense = Var(x), Var(w0)
+    yd = sigmoid(dot(w_dense, dx_dense)) + sum(sin(dx_dense * w_dense) + dx_dense * dx_dense)
+    assert np.isclose(y.value(), yd.value())
+    d = y.dvdx(w)
+    assert isinstance(d, SparseVec) and d.nnz == 5
+    assert np.allclose(d.todense(), yd.dvdx(w_dense))
+    assert np.allclose(y.dvdx(fx), yd.dvdx(dx_dense))
+
+
+def test_scalar_param_with_sparse_data():
+    x, _ = vectors()
+    fx, k = Var(SparseVec.fromdense(x)), Var(2.0)
+    y = sum(fx * k)
+    assert np.isclose(y.value(), 2 * np.sum(x))
+    assert np.allclose(y.dvdx(k), [np.sum(x)])
+
+
+def test_float32_sparse():
+    x, _ = vectors()
+    fx = Var(SparseVec.fromdense(x), dt=np.float32)
+    assert fx.x.dtype == np.float32
+    assert (fx * fx).value().dtype == np.float32
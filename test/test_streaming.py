@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+import pytest
+
+from autodx.forward_vec_ast import *
+from autodx.streaming import gradient, rows, prefetched
+
+
+def loss(x, y, w, b):
+    return sum((w * x + b - y) ** 2)
+
+
+def data(n=1000):
+    rng = np.random.RandomState(1)
+    X = rng.uniform(-1, 1, n)
+    return X, 3 * X + 0.5 + rng.normal(0, 0.1, n)
+
+
+def test_chunked_matches_whole():
+    X, Y = data()
+    w, b = Var(1.0), Var(0.0)
+    whole = loss(Var(X), Var(Y), w, b)
+    for prefetch in [0, 1, 3]:
+        value, (dw, db) = gradient(loss, [w, b], rows((X, Y), 128), prefetch)
+        assert np.isclose(value, whole.value())
+        assert np.allclose(dw, whole.dvdx(w))
+        assert np.allclose(db, whole.dvdx(b))
+
+
+def test_memmap(tmp_path):
+    X, Y = data()
+    XY = np.lib.format.open_memmap(tmp_path / "xy.npy", mode='w+', shape=(2, len(X)))
+    XY[0], XY[1] = X, Y
+    XY.flush()
+    XY = np.load(tmp_path / "xy.npy", mmap_mode='r')
+    w, b = Var(1.0), Var(0.0)
+    value, _ = gradient(loss, [w, b], rows((XY[0], XY[1]), 300))
+    assert np.isclose(value, loss(Var(X), Var(Y), w, b).value())
+
+
+def test_single_array_chunks():
+    X = np.arange(10.0)
+    w = Var(2.0)
+    value, (dw,) = gradient(lambda x, w: sum(w * x * x), [w], rows(X, 3))
+    assert np.isclose(value, 2 * np.sum(X**2))
+    assert np.isclose(dw, np.sum(X**2))
+
+
+def test_producer_errors_reach_consumer():
+    def chunks():
+        yield np.ones(3)
+        raise IOError("disk gone")
+    with pytest.raises(IOError):
+        list(prefetched(chunks()))
+
+
+def test_consumer_can_stop_early():
+    it = prefetched(rows(np.arange(100.0), 10))
+    assert np.array_equal(next(it), np.arange(10.0))
+    it.close() # producer thread must not hang
+
+
+def test_close_with_full_queue_does_not_hang():
+    it = prefetched(rows(np.arange(20.0), 10), prefetch=1)
+    next(it) # producer then fills the queue with chunk 2 and waits to put _done
+    t = threading.Thread(target=it.close, daemon=True)
+    t.start()
+    t.join(timeout=5)
+    assert not t.is_alive()
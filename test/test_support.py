@@ -0,0 +1,26 @@
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import autodx.support
+
+needs_dot = pytest.mark.skipif(shutil.which('dot') is None, reason="graphviz dot not installed")
+
+
+@needs_dot
+def test_render_all_matches_render():
+    graphs = [f"digraph G{i} {{ a{i} -> b{i} }}" for i in range(3)]
+    images = autodx.support.render_all(graphs)
+    assert len(images) == 3
+    for g, image in zip(graphs, images):
+        assert image.rstrip().endswith(b'</svg>')
+        assert image == autodx.support.render(g)
+
+
+def test_engines_dont_import_viz_dependencies():
+    code = ("import sys, autodx.forward, autodx.forward_ast, autodx.backward_ast, autodx.forward_vec_ast, autodx.flat; "
+            "print([m for m in ('graphviz', 'IPython') if m in sys.modules])")
+    out = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, check=True).stdout
+    assert out.strip() == b'[]'
@@ -0,0 +1,35 @@
+import math
+
+import numpy as np
+
+import autodx.forward
+from autodx.taylor import *
+
+
+def test_closed_forms():
+    x, K = 1.7, 6
+    k = np.arange(K + 1)
+    assert np.allclose(derivatives(lambda x: x * x * x, [x], 0, K), [x**3, 3*x**2, 6*x, 6, 0, 0, 0])
+    assert np.allclose(derivatives(lambda x: sin(x), [x], 0, K), np.sin(x + k * np.pi / 2))
+    assert np.allclose(derivatives(lambda x: cos(x), [x], 0, K), np.cos(x + k * np.pi / 2))
+    recip = [(-1)**k * math.factorial(k) / x**(k+1) for k in range(K + 1)]
+    assert np.allclose(derivatives(lambda x: 1 / x, [x], 0, K), recip)
+    logs = [np.log(x)] + [(-1)**(k-1) * math.factorial(k-1) / x**k for k in range(1, K + 1)]
+    assert np.allclose(derivatives(lambda x: ln(x), [x], 0, K), logs)
+
+
+def test_composition_matches_forward():
+    def f(x1, x2, sin, ln): return ln(x1) + x1 * x2 - sin(x2) / x1
+    X = [2.0, 5.0]
+    dX = autodx.forward.gradient(lambda *a: f(*a, autodx.forward.sin, autodx.forward.ln), X)
+    for i in range(2):
+        d = derivatives(lambda *a: f(*a, sin, ln), X, i, 4)
+        assert np.isclose(d[1], dX[i])
+    # second derivative wrt x2: sin(x2) / x1
+    assert np.isclose(derivatives(lambda *a: f(*a, sin, ln), X, 1, 2)[2], np.sin(5.0) / 2.0)
+
+
+def test_directional():
+    # f(x1 + t, x2 + t) = (x1 + t)(x2 + t) has second derivative 2
+    d = directional(lambda x1, x2: x1 * x2, [2.0, 3.0], [1.0, 1.0], 3)
+    assert np.allclose(d, [6, 5, 2, 0])
@@ -0,0 +1,42 @@
+import numpy as np
+
+from autodx.forward_vec_ast import Var, Add, sin, ln, dot
+import autodx.forward_vec_ast
+import autodx.threaded
+
+
+def wide(a, b, c):
+    # independent branches that only meet at the root
+    return Add(Add(dot(sin(a), ln(b)), dot(a * c, sin(b))), dot(ln(c), c / a))
+
+
+def test_value_matches():
+    np.random.seed(1)
+    X = [Var(np.random.uniform(1, 2, 10000)) for i in range(3)]
+    y = wide(*X)
+    for workers in [1, 4]:
+        assert np.isclose(autodx.threaded.value(y, workers=workers), y.value())
+        assert np.isclose(autodx.threaded.value(y, workers=workers, grain=0), y.value())
+
+
+def test_gradient_matches():
+    np.random.seed(2)
+    X = [Var(np.random.uniform(1, 2, 50)) for i in range(3)]
+    y = autodx.forward_vec_ast.sum(autodx.forward_vec_ast.Mul(wide(*X), X[0]))
+    expected = y.gradient(X)
+    assert np.allclose(autodx.threaded.gradient(y, X, workers=4, grain=0), expected)
+
+
+def test_shared_subexpressions_computed_once():
+    a = Var(np.arange(1.0, 5.0))
+    calls = []
+
+    class CountingSin(autodx.forward_vec_ast.Sin):
+        def value(self):
+            calls.append(self)
+            return super().value()
+
+    s = CountingSin(a)
+    y = Add(dot(s, s), dot(s, a))
+    assert np.isclose(autodx.threaded.value(y, workers=2, grain=0), y.value())
+    assert len(calls) == 1 + 3  # once in the scheduler, three times in y.value()
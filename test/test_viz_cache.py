@@ -0,0 +1,76 @@
+import re
+
+import autodx.viz.backward as vb
+import autodx.viz.forward as vf
+
+
+def test_forward_rerender_only_changed_labels():
+    x1, x2, x3 = vf.Var(2.0), vf.Var(5.0), vf.Var(1.5)
+    y = vf.ln(x1) + x1 * x2 - vf.sin(x3) / x3
+    first = vf.astviz(y, x2).source
+    misses = vf.rendered.misses
+    assert vf.astviz(y, x2).source == first
+    assert vf.rendered.misses == misses
+    x3.x = 2.5  # only sin(x3) / x3 branch and nodes above it change
+    changed = vf.astviz(y, x2).source
+    assert changed != first
+    assert vf.rendered.misses - misses == 4  # x3, sin, /, root -
+
+
+def test_backward_labels_and_cache():
+    x1, x2 = vb.Var(2.0), vb.Var(5.0)
+    y = vb.ln(x1) + x1 * x2 - vb.sin(x2) / x1
+    y.forward()
+    y.backward()
+    first = vb.astviz(y).source
+    misses = vb.rendered.misses
+    assert vb.astviz(y).source == first
+    assert vb.rendered.misses == misses
+    assert "1 &frasl; " in first  # Div_viz.eqndvdv for sin(x2)
+
+
+def test_dispatch_table():
+    x = vf.Var(1.0)
+    y = vf.sin(x)
+    vf.eqn(y)
+    assert vf.vizclasses[vf.Sin] is vf.Sin_viz
+
+
+def test_forward_all_inputs_in_one_render():
+    x1, x2 = vf.Var(2.0), vf.Var(5.0)
+    y = vf.ln(x1) + x1 * x2 - vf.sin(x2)
+    both = vf.astviz(y, [x1, x2]).source
+    rows = lambda g: re.findall(r'<tr>.*?</tr>', g, re.S)
+    for x in [x1, x2]:
+        one = vf.astviz(y, x).source
+        assert all(row in both for row in rows(one))
+        assert len(rows(one)) < len(rows(both))
+    assert vf.swept is None
+    g = vf.astviz(y, [x1, x2], budget=50)
+    assert f"∂v/∂({x1.varname}, {x2.varname})" in g.source
+
+
+def test_backward_parent_partials_computed_once_per_edge(monkeypatch):
+    x1, x2 = vb.Var(2.0), vb.Var(5.0)
+    y = x1 * x2 + x1 * x1
+    y.forward()
+    y.backward()
+    calls = []
+    dvdv = vb.Mul.dvdv
+    monkeypatch.setattr(vb.Mul, 'dvdv', lambda self, wrt: calls.append(1) or dvdv(self, wrt))
+    vb.astviz(y)
+    assert len(calls) == 3 # x1*x2 -> x1, x1*x2 -> x2, x1*x1 -> x1
+    # x1 * x1 contributes 2 x1 once, not twice: x1's label sums two parents' terms
+    parents = vb.parents(y)[x1]
+    partials = {(id(p), id(x1)): p.dvdv(x1) for p in parents}
+    assert vb.Var_viz.eqndx(x1, parents, partials)[2].count(" + ") == 1
+
+
+def test_forward_vec_fused_ops_render():
+    import numpy as np
+    import autodx.viz.forward_vec as vv
+    W, X, b = vv.Var(np.array([1.0, -2.0])), vv.Var(np.array([0.5, 0.25])), vv.Var(0.75)
+    Z = vv.Var(np.array([2.0, -1.0]))
+    y = vv.softmax_xent(Z, np.array([0.0, 1.0])) + vv.sigmoid(vv.affine(W, X, b)) + vv.logsumexp(Z)
+    g = vv.astviz(y, [W, Z]).source
+    assert "xent(" in g and "sigmoid(" in g and "softmax(" in g and "&middot;" in g
@@ -0,0 +1,39 @@
+import numpy as np
+
+from autodx.backward_ast import Var, sin
+from autodx.vmap import vmap
+
+
+def model():
+    x, y, w, b = Var(0.0), Var(0.0), Var(0.5), Var(-1.0)
+    r = sin(w * x) + b - y
+    return r * r, [x, y], [w, b]
+
+
+def test_per_example_gradients():
+    loss, data, params = model()
+    rng = np.random.RandomState(0)
+    D = rng.uniform(-2, 2, size=(100, 2))
+    values, dP = vmap(loss, data, params)(D)
+    assert values.shape == (100,) and dP.shape == (100, 2)
+    for (x, y), v, (dw, db) in zip(D, values, dP):
+        r = np.sin(0.5 * x) - 1.0 - y
+        assert np.isclose(v, r * r)
+        assert np.isclose(dw, 2 * r * np.cos(0.5 * x) * x)
+        assert np.isclose(db, 2 * r)
+
+
+def test_params_per_example():
+    loss, data, params = model()
+    f = vmap(loss, data, params)
+    D = np.array([[1.0, 0.0], [1.0, 0.0]])
+    _, dP = f(D, [[0.5, -1.0], [1.0, 0.0]])
+    _, dP0 = f(D[:1])
+    _, dP1 = f(D[:1], [1.0, 0.0])
+    assert np.allclose(dP, np.vstack([dP0, dP1]))
+
+
+def test_one_data_var():
+    x, w = Var(0.0), Var(3.0)
+    _, dP = vmap(w * x * x, [x], [w])(np.array([1.0, 2.0, 3.0]))
+    assert np.allclose(dP[:, 0], [1, 4, 9])